@@ -7,26 +7,30 @@ from flask import (
     url_for,
     session,
     g,
-    send_file,
     flash,
     redirect,
+    Response,
+    stream_with_context,
 )
 import psycopg2
+import psycopg2.pool
 from dotenv import load_dotenv
-from io import BytesIO
 
 from . import db_utils
-from .datatypes import Document, Query
+from .datatypes import Query, SearchPage
 from .blueprints.account import account as bp_account
+from .blueprints.api import api as bp_api
 from .blueprints.document import document as bp_document
 from .blueprints.history import history as bp_history
 from .blueprints.manager import manager as bp_manager
 
 
 def _search_signature_from_args() -> str:
-    """Stable signature of active filters, excluding page number."""
+    """Stable signature of active filters, excluding page number and cursor."""
     keys: list[str] = sorted(
-        k for k in request.args.keys() if k not in {"page", "replay_search_id", "genre"}
+        k
+        for k in request.args.keys()
+        if k not in {"page", "after", "replay_search_id", "genre"}
     )
     return "&".join(
         f"{key}={(request.args.get(key) or '').strip()}"
@@ -51,7 +55,36 @@ def create_app(flask_constructor_options: dict = None, **kwargs) -> Flask:
         app.config["FLASK_SECRET"] if "FLASK_SECRET" in app.config else None
     )
 
+    db_utils.headline_cache.configure(
+        maxsize=app.config.get("HEADLINE_CACHE_SIZE"),
+        ttl=app.config.get("HEADLINE_CACHE_TTL"),
+    )
+
+    db_utils.fragment_cache.configure(
+        maxsize=app.config.get("FRAGMENT_CACHE_SIZE"),
+        ttl=app.config.get("FRAGMENT_CACHE_TTL"),
+    )
+
+    db_utils.configure_result_cache(
+        backend=app.config.get("RESULT_CACHE_BACKEND", "memory"),
+        maxsize=app.config.get("RESULT_CACHE_SIZE"),
+        ttl=app.config.get("RESULT_CACHE_TTL"),
+        path=app.config.get("RESULT_CACHE_PATH"),
+        poll_interval=app.config.get("GENERATION_POLL_INTERVAL"),
+    )
+
+    db_utils.configure_slow_query_log(
+        threshold_ms=app.config.get("SLOW_QUERY_MS"),
+        path=app.config.get("SLOW_QUERY_LOG", "slow_queries.log"),
+        max_bytes=app.config.get("SLOW_QUERY_LOG_BYTES", 1 << 20),
+        backup_count=app.config.get("SLOW_QUERY_LOG_BACKUPS", 3),
+    )
+
+    if app.config.get("SEARCH_BACKEND", "postgres") not in db_utils.SEARCH_BACKENDS:
+        raise ValueError(f"Unknown search backend: {app.config['SEARCH_BACKEND']}")
+
     app.register_blueprint(bp_account)
+    app.register_blueprint(bp_api)
     app.register_blueprint(bp_document)
     app.register_blueprint(bp_history)
     app.register_blueprint(bp_manager)
@@ -84,7 +117,16 @@ def create_app(flask_constructor_options: dict = None, **kwargs) -> Flask:
     def teardown_db_connection(exception):
         db_connection: psycopg2.extensions.connection = g.pop("db_connection", None)
         if db_connection:
-            db_connection.close()
+            db_utils.release_db_connection(db_connection)
+
+    @app.errorhandler(psycopg2.pool.PoolError)
+    def pool_exhausted(exception):
+        # every connection stayed checked out for `DB_POOL_TIMEOUT` seconds
+        return Response(
+            "The server is busy, please try again shortly",
+            status=503,
+            headers={"Retry-After": "5"},
+        )
 
     @app.route("/")
     def index():
@@ -94,6 +136,8 @@ def create_app(flask_constructor_options: dict = None, **kwargs) -> Flask:
         reel_min: int = request.args.get("reel_min", None, type=int)
         reel_max: int = request.args.get("reel_max", None, type=int)
         page: int = request.args.get("page", 1, type=int)
+        # an opaque cursor is preferred over `page`, which remains as a fallback
+        after: str | None = request.args.get("after", None)
 
         query: Query = Query(
             actors=[],  # TODO
@@ -106,21 +150,50 @@ def create_app(flask_constructor_options: dict = None, **kwargs) -> Flask:
             reel_range=(reel_min, reel_max),
         )
 
-        num_results = db_utils.get_num_results(
-            db_utils.get_db_connection(),
-            query,
-        )
+        if app.config.get("SEARCH_BACKEND", "postgres") == "memory":
+            results: SearchPage = db_utils.memory_search_page(
+                db_utils.get_db_connection(),
+                query,
+                page,
+                resultsPerPage=app.config["RESULTS_PER_PAGE"],
+                after=db_utils.decode_search_cursor(after) if after else None,
+                rank_mode=app.config.get("RANK_MODE", "ts_rank_cd"),
+            )
+        else:
+            results: SearchPage = db_utils.search_page(
+                db_utils.get_db_connection(),
+                query,
+                page,
+                resultsPerPage=app.config["RESULTS_PER_PAGE"],
+                after=db_utils.decode_search_cursor(after) if after else None,
+                count_mode=app.config.get("COUNT_MODE", "exact"),
+                count_cap=app.config.get("COUNT_CAP", 10000),
+                rank_mode=app.config.get("RANK_MODE", "ts_rank_cd"),
+                bm25_candidates=app.config.get("BM25_CANDIDATES", 1000),
+            )
 
-        results: list[Document] = db_utils.search_results(
-            db_utils.get_db_connection(),
-            query,
-            page,
-            resultsPerPage=app.config["RESULTS_PER_PAGE"],
+        facets: dict[str, dict] = db_utils.get_facets(
+            db_utils.get_db_connection(), query
         )
 
-        headlines: dict[str, str] = db_utils.get_headlines(
-            db_utils.get_db_connection(), results, query
-        )
+        # offer a respelling of keywords that matched nothing
+        suggestion: list[str] | None = None
+        if query.keywords and not results.num_results:
+            suggestion = db_utils.suggest_keywords(db_utils.get_db_connection(), query)
+
+        # the best few pages of each result, which its detail link jumps to
+        matching_pages: dict[str, list[int]] = {}
+        if query.keywords and results.documents:
+            pages_per_result: int = app.config.get("MATCHING_PAGES_PER_RESULT", 3)
+            for doc_id, page_number, _ in db_utils.search_page_hits(
+                db_utils.get_db_connection(),
+                query,
+                doc_ids=[doc.id for doc in results.documents],
+                per_document=pages_per_result,
+                limit=pages_per_result * len(results.documents),
+            ):
+                matching_pages.setdefault(doc_id, []).append(page_number)
+
         current_search_id: int | None = None
         viewed_doc_ids: set[str] = set()
 
@@ -187,15 +260,20 @@ def create_app(flask_constructor_options: dict = None, **kwargs) -> Flask:
 
         return render_template(
             "index.html",
-            documents=results,
-            headlines=headlines,
+            documents=results.documents,
+            headlines=results.headlines,
+            matching_pages=matching_pages,
+            suggestion=" ".join(suggestion) if suggestion else None,
             search=search,
             year_min=year_min,
             year_max=year_max,
             reel_min=reel_min,
             reel_max=reel_max,
             page=page,
-            num_results=num_results,
+            next_cursor=results.next_cursor,
+            num_results=results.num_results,
+            count_precision=results.count_precision,
+            facets=facets,
             results_per_page=app.config["RESULTS_PER_PAGE"],
             viewed_doc_ids=viewed_doc_ids,
             current_search_id=current_search_id,
@@ -235,15 +313,36 @@ def create_app(flask_constructor_options: dict = None, **kwargs) -> Flask:
             )
             return redirect(url_for("index", **request.args))
 
-        csv_body: str = db_utils.get_documents_as_csv(db_utils.get_db_connection(), ids)
-
-        return send_file(
-            BytesIO(csv_body.encode("utf-8")),
+        # rows are sent as they are read, so the whole export is never held at once;
+        # `text=false` leaves out the transcripts, which are most of the file
+        return Response(
+            stream_with_context(
+                db_utils.iter_documents_as_csv(
+                    db_utils.get_db_connection(),
+                    ids,
+                    include_text=request.args.get("text", "true").lower() != "false",
+                    itersize=app.config.get("CSV_ITERSIZE", 100),
+                )
+            ),
             mimetype="text/csv",
-            as_attachment=True,
-            download_name="query.csv",
+            headers={"Content-Disposition": "attachment; filename=query.csv"},
         )
 
+    # build the autocomplete indexes now rather than on the first keystroke
+    if app.config.get("AUTOCOMPLETE_PRELOAD", False):
+        with app.app_context():
+            db_utils.build_autocomplete_indexes(db_utils.get_db_connection())
+
+    # load the spelling index now rather than on the first search without results
+    if app.config.get("SPELLING_PRELOAD", False):
+        with app.app_context():
+            db_utils.build_spelling_index(db_utils.get_db_connection())
+
+    # build the search index now rather than on the first search
+    if app.config.get("SEARCH_BACKEND", "postgres") == "memory":
+        with app.app_context():
+            db_utils.build_search_index(db_utils.get_db_connection())
+
     return app
 
 
@@ -261,10 +360,76 @@ if __name__ == "__main__":
         POPPLER_PATH=(
             os.environ["POPPLER_PATH"] if "POPPLER_PATH" in os.environ else None
         ),
+        DB_POOL_MAX=(
+            int(os.environ["DB_POOL_MAX"]) if "DB_POOL_MAX" in os.environ else 10
+        ),
+        DB_POOL_TIMEOUT=(
+            float(os.environ["DB_POOL_TIMEOUT"])
+            if "DB_POOL_TIMEOUT" in os.environ
+            else 30
+        ),
+        PREPARED_STATEMENTS=os.environ.get("PREPARED_STATEMENTS", "1") != "0",
+        RANK_MODE=os.environ.get("RANK_MODE", "ts_rank_cd"),
+        BM25_CANDIDATES=(
+            int(os.environ["BM25_CANDIDATES"])
+            if "BM25_CANDIDATES" in os.environ
+            else 1000
+        ),
+        SEARCH_BACKEND=os.environ.get("SEARCH_BACKEND", "postgres"),
+        SLOW_QUERY_MS=(
+            float(os.environ["SLOW_QUERY_MS"])
+            if "SLOW_QUERY_MS" in os.environ
+            else None
+        ),
+        SLOW_QUERY_LOG=os.environ.get("SLOW_QUERY_LOG", "slow_queries.log"),
+        AUTOCOMPLETE_PRELOAD=True,
+        SPELLING_PRELOAD=True,
+        SPELLING_MIN_COUNT=(
+            int(os.environ["SPELLING_MIN_COUNT"])
+            if "SPELLING_MIN_COUNT" in os.environ
+            else 2
+        ),
         RESULTS_PER_PAGE=20,
         MAX_CSV_ROWS=(
             int(os.environ["MAX_CSV_ROWS"]) if "MAX_CSV_ROWS" in os.environ else 500
         ),
+        CSV_ITERSIZE=(
+            int(os.environ["CSV_ITERSIZE"]) if "CSV_ITERSIZE" in os.environ else 100
+        ),
+        COUNT_MODE=os.environ.get("COUNT_MODE", "estimate"),
+        COUNT_CAP=int(os.environ["COUNT_CAP"]) if "COUNT_CAP" in os.environ else 10000,
+        HEADLINE_CACHE_SIZE=(
+            int(os.environ["HEADLINE_CACHE_SIZE"])
+            if "HEADLINE_CACHE_SIZE" in os.environ
+            else 4096
+        ),
+        HEADLINE_CACHE_TTL=(
+            float(os.environ["HEADLINE_CACHE_TTL"])
+            if "HEADLINE_CACHE_TTL" in os.environ
+            else 3600
+        ),
+        FRAGMENT_CACHE_SIZE=(
+            int(os.environ["FRAGMENT_CACHE_SIZE"])
+            if "FRAGMENT_CACHE_SIZE" in os.environ
+            else 256
+        ),
+        FRAGMENT_CACHE_TTL=(
+            float(os.environ["FRAGMENT_CACHE_TTL"])
+            if "FRAGMENT_CACHE_TTL" in os.environ
+            else 3600
+        ),
+        RESULT_CACHE_BACKEND=os.environ.get("RESULT_CACHE_BACKEND", "memory"),
+        RESULT_CACHE_PATH=os.environ.get("RESULT_CACHE_PATH", None),
+        RESULT_CACHE_SIZE=(
+            int(os.environ["RESULT_CACHE_SIZE"])
+            if "RESULT_CACHE_SIZE" in os.environ
+            else 1024
+        ),
+        RESULT_CACHE_TTL=(
+            float(os.environ["RESULT_CACHE_TTL"])
+            if "RESULT_CACHE_TTL" in os.environ
+            else 3600
+        ),
     )
 
     app.run(debug=True, port=5000)
@@ -0,0 +1,97 @@
+import json
+
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+
+from ... import db_utils
+from ...datatypes import Document, Query
+
+api = Blueprint("api", __name__, url_prefix="/api")
+
+
+@api.route("/autocomplete")
+def autocomplete():
+    field: str = request.args.get("field", "")
+    prefix: str = request.args.get("q", "")
+    limit: int = min(max(request.args.get("limit", 10, type=int), 1), 50)
+
+    if field not in db_utils.AUTOCOMPLETE_SOURCES:
+        return (
+            jsonify(
+                {
+                    "error": f"Unknown field: {field}",
+                    "fields": list(db_utils.AUTOCOMPLETE_SOURCES),
+                }
+            ),
+            400,
+        )
+
+    suggestions: list[str] = db_utils.autocomplete(
+        db_utils.get_db_connection(), field, prefix, limit
+    )
+
+    return jsonify({"field": field, "q": prefix, "suggestions": suggestions})
+
+
+def _document_json(document: Document) -> dict:
+    return {
+        "id": document.id,
+        "title": document.title,
+        "studio": document.studio,
+        "copyright_year": document.copyright_year,
+        "document_type": document.document_type,
+        "actors": document.actors,
+        "transcripts": [
+            {"page": page, "content": content} for page, content in document.transcripts
+        ],
+    }
+
+
+@api.route("/search")
+def search():
+    """Stream the results of a search as newline-delimited JSON.
+
+    Accepts the search parameters of the index page, plus an optional ``limit``. The first
+    line is ``{"type": "count", ...}``; then each batch of results is sent as
+    ``{"type": "document", ...}`` lines followed by a ``{"type": "headline", ...}`` line per
+    document, so clients can show the first results before the last ones are read.
+    """
+    search: str = request.args.get("search", "")
+    limit: int | None = request.args.get("limit", None, type=int)
+
+    # the same defaults as the index page
+    query: Query = Query(
+        keywords=[keyword for keyword in search.split(" ") if keyword],
+        copyright_year_range=(
+            request.args.get("year_min", 1912, type=int),
+            request.args.get("year_max", 1928, type=int),
+        ),
+        reel_range=(
+            request.args.get("reel_min", None, type=int),
+            request.args.get("reel_max", None, type=int),
+        ),
+    )
+
+    def generate():
+        for kind, value in db_utils.stream_search(
+            db_utils.get_db_connection(), query, limit=limit
+        ):
+            if kind == "count":
+                yield json.dumps({"type": "count", "count": value}) + "\n"
+            elif kind == "documents":
+                for document in value:
+                    line: dict = {
+                        "type": "document",
+                        "document": _document_json(document),
+                    }
+                    yield json.dumps(line) + "\n"
+            else:
+                for doc_id, headline in value.items():
+                    line: dict = {
+                        "type": "headline",
+                        "id": doc_id,
+                        "headline": headline,
+                    }
+                    yield json.dumps(line) + "\n"
+
+    # the request context (and its database connection) stays open while streaming
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
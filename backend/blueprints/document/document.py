@@ -1,3 +1,4 @@
+import hashlib
 import pdf2image.pdf2image
 import psycopg2
 import PIL
@@ -13,11 +14,16 @@ from flask import (
     send_file,
     current_app,
     render_template,
+    make_response,
+    Response,
 )
+from markupsafe import Markup
 from pathlib import Path
+from werkzeug.http import is_resource_modified
 from io import BytesIO
 
 from ... import db_utils
+from ...datatypes import Query
 
 document = Blueprint("document", __name__, url_prefix="/document")
 
@@ -36,8 +42,10 @@ def _bool_string(s: str) -> bool:
 
 @document.route("/<doc_id>")
 def document_detail(doc_id):
-    document = db_utils.get_document(db_utils.get_db_connection(), doc_id)
-    if not document:
+    version: dict | None = db_utils.get_document_version(
+        db_utils.get_db_connection(), doc_id
+    )
+    if not version:
         flash("Document not found", "error")
         return redirect(url_for("index"))
 
@@ -59,6 +67,43 @@ def document_detail(doc_id):
             search_id=valid_search_id,
         )
 
+    # besides the document, the page depends on who is logged in and the link followed
+    etag: str = hashlib.md5(
+        f"{version['etag']}|{user_name}|{request.full_path}".encode("utf-8")
+    ).hexdigest()
+
+    # pending flashes are shown on the page, so it must be rendered again; only the ETag
+    # is compared, since reindexing changes the page without changing `last_modified`
+    if "_flashes" not in session and not is_resource_modified(
+        request.environ, etag=etag
+    ):
+        response: Response = make_response("", 304)
+    else:
+        response = make_response(_render_document_detail(doc_id, version))
+
+    response.set_etag(etag)
+    response.last_modified = version["last_modified"]
+    # browsers revalidate every visit, so that new flags are shown at once
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add("Cookie")
+
+    return response
+
+
+def _render_document_detail(doc_id: str, version: dict) -> str:
+    # the part of the page that only depends on the document is rendered once per version
+    cacheKey: tuple[str, str] = (version["id"], version["etag"])
+    document_content: Markup | None = db_utils.fragment_cache.get(cacheKey)
+    if document_content is None:
+        document = db_utils.get_document(
+            db_utils.get_db_connection(), doc_id, preload_transcripts=True
+        )
+        document_content = Markup(
+            render_template("document_detail_content.html", document=document)
+        )
+        db_utils.fragment_cache.put(cacheKey, document_content)
+
     back_url = url_for("index")
     return_to = request.args.get("return_to", "")
     safe_return_to = ""
@@ -67,11 +112,28 @@ def document_detail(doc_id):
         back_url = return_to
         safe_return_to = return_to
 
+    # the pages matching the search the user came from, best first
+    search: str = request.args.get("search", "").strip()
+    matching_pages: list[int] = []
+    if search:
+        matching_pages = [
+            page_number
+            for _, page_number, _ in db_utils.search_page_hits(
+                db_utils.get_db_connection(),
+                Query(keywords=search.split()),
+                doc_ids=[doc_id],
+                limit=None,
+            )
+        ]
+
     return render_template(
         "document_detail.html",
-        document=document,
+        version=version,
+        document_content=document_content,
         back_url=back_url,
         safe_return_to=safe_return_to,
+        search=search,
+        matching_pages=matching_pages,
     )
 
 
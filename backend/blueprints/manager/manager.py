@@ -1,4 +1,4 @@
-from flask import Blueprint, request, render_template
+from flask import Blueprint, request, render_template, jsonify
 
 from ... import db_utils
 from ...datatypes import Query
@@ -40,3 +40,25 @@ def remove_documents():
 @manager.route("/upload", methods=["POST"])
 def upload_documents():
     return "Not yet implemented", 404
+
+
+@manager.route("/cache")
+def cache_stats():
+    return jsonify(
+        {
+            "headlines": db_utils.headline_cache.stats(),
+            "results": db_utils.result_cache.stats(),
+            "fragments": db_utils.fragment_cache.stats(),
+        }
+    )
+
+
+@manager.route("/statements")
+def statement_stats():
+    return jsonify(db_utils.statement_stats())
+
+
+@manager.route("/slow-queries")
+def slow_queries():
+    limit: int = min(max(request.args.get("limit", 50, type=int), 1), 1000)
+    return jsonify(db_utils.slow_queries(limit))
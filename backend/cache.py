@@ -0,0 +1,492 @@
+"""A collection of in-process caches for data derived from the PostgreSQL database."""
+
+import itertools
+import pickle
+import sqlite3
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Hashable, Iterable
+
+
+class LRUCache:
+    """
+    A thread-safe, size-bounded cache with least-recently-used eviction and expiry
+
+    Parameters
+    ----------
+    maxsize: int, default = 1024
+        The maximum number of entries held at once
+
+    ttl: float, default = 3600
+        The number of seconds an entry remains valid after it is stored
+
+    Attributes
+    ----------
+    maxsize: int
+        The maximum number of entries held at once
+
+    ttl: float
+        The number of seconds an entry remains valid after it is stored
+
+    generation: int
+        The data generation the stored entries were computed from (see `set_generation`)
+
+    hits: int
+        The number of lookups that returned a stored entry
+
+    misses: int
+        The number of lookups that found no valid entry
+
+    evictions: int
+        The number of entries removed to make room for newer ones
+
+    Methods
+    -------
+    get(key: Hashable, default: Any = None)
+        Returns the entry stored under `key`, or `default`
+
+    put(key: Hashable, value: Any)
+        Stores `value` under `key`
+
+    clear()
+        Removes every entry
+
+    configure(maxsize: int = None, ttl: float = None)
+        Changes the size and expiry of the cache, removing every entry
+
+    set_generation(generation: int)
+        Removes every entry if `generation` differs from the current one
+
+    stats()
+        Returns the size and hit/miss counters of the cache
+    """
+
+    maxsize: int = 1024
+    ttl: float = 3600
+    generation: int = None
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.generation = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # key -> (expiry time, value), least recently used first
+        self._entries: OrderedDict = OrderedDict()
+        self._lock: Lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _insert(self, key: Hashable, value: Any):
+        """Stores a single entry; the lock must already be held"""
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def _remove(self, key: Hashable):
+        """Removes a single entry; the lock must already be held"""
+        del self._entries[key]
+
+    def _valid(self, key: Hashable) -> bool:
+        """Whether `key` holds an unexpired entry; the lock must already be held"""
+        if key not in self._entries:
+            return False
+
+        if self._entries[key][0] < time.monotonic():
+            self._remove(key)
+            return False
+
+        return True
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Returns the entry stored under `key`, or `default`"""
+        with self._lock:
+            if not self._valid(key):
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][1]
+
+    def put(self, key: Hashable, value: Any):
+        """Stores `value` under `key`"""
+        if self.maxsize <= 0:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            while len(self._entries) >= self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+            self._insert(key, value)
+
+    def clear(self):
+        """Removes every entry"""
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def configure(self, maxsize: int = None, ttl: float = None):
+        """Changes the size and expiry of the cache, removing every entry"""
+        self.clear()
+
+        if maxsize is not None:
+            self.maxsize = maxsize
+        if ttl is not None:
+            self.ttl = ttl
+
+    def set_generation(self, generation: int):
+        """Removes every entry if `generation` differs from the current one"""
+        if generation is None or generation == self.generation:
+            return
+
+        self.clear()
+        self.generation = generation
+
+    def stats(self) -> dict[str, int]:
+        """Returns the size and hit/miss counters of the cache"""
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "generation": self.generation,
+        }
+
+
+class HeadlineCache(LRUCache):
+    """
+    An `LRUCache` of search result headlines
+
+    Entries are keyed by `(document_id, keywords, max_length)`, where `keywords` is the
+    normalized keyword string of a `Query` (see `Query.normalized_keywords`).
+
+    Methods
+    -------
+    cached_ids(keywords: str, max_length: int)
+        Returns the ids of all documents with a valid headline for a keyword string
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 3600):
+        # (keywords, max_length) -> ids of documents with a stored headline
+        self._ids_by_query: dict[tuple[str, int], set[str]] = {}
+
+        super().__init__(maxsize, ttl)
+
+    def _remove(self, key: tuple[str, str, int]):
+        super()._remove(key)
+
+        ids: set[str] = self._ids_by_query.get(key[1:], set())
+        ids.discard(key[0])
+        if not ids:
+            self._ids_by_query.pop(key[1:], None)
+
+    def _insert(self, key: tuple[str, str, int], value: str):
+        super()._insert(key, value)
+        self._ids_by_query.setdefault(key[1:], set()).add(key[0])
+
+    def cached_ids(self, keywords: str, max_length: int) -> set[str]:
+        """Returns the ids of all documents with a valid headline for a keyword string
+
+        This does not count towards the hit/miss counters.
+        """
+        with self._lock:
+            return {
+                doc_id
+                for doc_id in list(self._ids_by_query.get((keywords, max_length), ()))
+                if self._valid((doc_id, keywords, max_length))
+            }
+
+
+class SQLiteCache:
+    """
+    A size-bounded cache with least-recently-used eviction and expiry, stored in a SQLite
+    file so that it can be shared between worker processes
+
+    It has the same interface as `LRUCache`. Values are pickled, so the file must only be
+    writable by the app itself.
+
+    Parameters
+    ----------
+    path: str
+        The path of the SQLite database file (created if it does not exist)
+
+    maxsize: int, default = 1024
+        The maximum number of entries held at once
+
+    ttl: float, default = 3600
+        The number of seconds an entry remains valid after it is stored
+
+    Attributes
+    ----------
+    path: str
+        The path of the SQLite database file
+
+    maxsize: int
+        The maximum number of entries held at once
+
+    ttl: float
+        The number of seconds an entry remains valid after it is stored
+
+    generation: int
+        The data generation the stored entries were computed from, shared by every
+        process using the file (see `set_generation`)
+
+    hits: int
+        The number of lookups by this process that returned a stored entry
+
+    misses: int
+        The number of lookups by this process that found no valid entry
+
+    evictions: int
+        The number of entries removed by this process to make room for newer ones
+    """
+
+    path: str = None
+    maxsize: int = 1024
+    ttl: float = 3600
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    def __init__(self, path: str, maxsize: int = 1024, ttl: float = 3600):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock: Lock = Lock()
+
+        # autocommit, since every operation is a single statement
+        self._conn: sqlite3.Connection = sqlite3.connect(
+            path, timeout=10, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL;")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ( \
+                key TEXT PRIMARY KEY, \
+                value BLOB, \
+                expires REAL, \
+                used REAL \
+            );"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_used ON entries (used);")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER);"
+        )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries;").fetchone()[0]
+
+    @property
+    def generation(self) -> int:
+        with self._lock:
+            row: tuple = self._conn.execute(
+                "SELECT value FROM meta WHERE name = 'generation';"
+            ).fetchone()
+
+        return row[0] if row else None
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Returns the entry stored under `key`, or `default`"""
+        # wall-clock time, since monotonic clocks are not comparable between processes
+        now: float = time.time()
+
+        with self._lock:
+            row: tuple = self._conn.execute(
+                "SELECT value FROM entries WHERE key = ? AND expires >= ?;",
+                (repr(key), now),
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return default
+
+            self._conn.execute(
+                "UPDATE entries SET used = ? WHERE key = ?;", (now, repr(key))
+            )
+            self.hits += 1
+
+        return pickle.loads(row[0])
+
+    def put(self, key: Hashable, value: Any):
+        """Stores `value` under `key`"""
+        if self.maxsize <= 0:
+            return
+
+        now: float = time.time()
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires, used) \
+                VALUES (?, ?, ?, ?);",
+                (repr(key), pickle.dumps(value), now + self.ttl, now),
+            )
+
+            evicted: sqlite3.Cursor = self._conn.execute(
+                "DELETE FROM entries WHERE key IN ( \
+                    SELECT key FROM entries ORDER BY used DESC LIMIT -1 OFFSET ? \
+                );",
+                (self.maxsize,),
+            )
+            self.evictions += max(evicted.rowcount, 0)
+
+    def clear(self):
+        """Removes every entry"""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries;")
+
+    def configure(self, maxsize: int = None, ttl: float = None):
+        """Changes the size and expiry of the cache, removing every entry"""
+        self.clear()
+
+        if maxsize is not None:
+            self.maxsize = maxsize
+        if ttl is not None:
+            self.ttl = ttl
+
+    def set_generation(self, generation: int):
+        """Removes every entry if `generation` differs from the current one"""
+        if generation is None or generation == self.generation:
+            return
+
+        with self._lock:
+            self._conn.execute("DELETE FROM entries;")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (name, value) VALUES ('generation', ?);",
+                (generation,),
+            )
+
+    def stats(self) -> dict[str, int]:
+        """Returns the size and hit/miss counters of the cache"""
+        return {
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "generation": self.generation,
+        }
+
+
+def _normalize(value: str) -> str:
+    """Casefold `value` and collapse its whitespace, for case-insensitive matching"""
+    return " ".join(value.casefold().split())
+
+
+class PrefixIndex:
+    """
+    An immutable, sorted index of strings supporting fast prefix lookups
+
+    Every word of a value can start a match, so `"chap"` finds `"Charlie Chaplin"`.
+
+    A prefix of one or two characters matches a large share of the entries, so the best
+    `SHORT_PREFIX_RESULTS` values for every such prefix are ranked once, when the index is
+    built, rather than on every keystroke.
+
+    Parameters
+    ----------
+    values: Iterable[str], default = ()
+        The strings to index (empty values are skipped)
+
+    generation: int, default = None
+        The data generation the values were read from
+
+    Attributes
+    ----------
+    generation: int
+        The data generation the values were read from
+
+    Methods
+    -------
+    search(prefix: str, limit: int = 10)
+        Returns up to `limit` values with a word starting with `prefix`
+    """
+
+    generation: int = None
+
+    # prefixes up to this length are answered from precomputed rankings
+    SHORT_PREFIX_LENGTH: int = 2
+    SHORT_PREFIX_RESULTS: int = 50
+
+    def __init__(self, values: Iterable[str] = (), generation: int = None):
+        self.generation = generation
+
+        # (normalized text from one word onwards, word position, value)
+        entries: set[tuple[str, int, str]] = set()
+        for value in values:
+            if not value:
+                continue
+
+            words: list[str] = _normalize(value).split(" ")
+            for position in range(len(words)):
+                entries.add((" ".join(words[position:]), position, value))
+
+        self._entries: list[tuple[str, int, str]] = sorted(entries)
+        self._keys: list[str] = [entry[0] for entry in self._entries]
+        self._size: int = len({entry[2] for entry in self._entries})
+
+        # short prefix -> value -> earliest matching word position
+        shortMatches: dict[str, dict[str, int]] = {}
+        for key, position, value in self._entries:
+            for length in range(1, min(len(key), self.SHORT_PREFIX_LENGTH) + 1):
+                matches: dict[str, int] = shortMatches.setdefault(key[:length], {})
+                matches[value] = min(matches.get(value, position), position)
+
+        self._short: dict[str, list[str]] = {
+            prefix: self._rank(matches)[: self.SHORT_PREFIX_RESULTS]
+            for prefix, matches in shortMatches.items()
+        }
+
+    def __len__(self) -> int:
+        return self._size
+
+    @staticmethod
+    def _rank(matches: dict[str, int]) -> list[str]:
+        """Order matching values by their earliest matching word, then alphabetically"""
+        return sorted(matches, key=lambda value: (matches[value], value.casefold()))
+
+    def search(self, prefix: str, limit: int = 10) -> list[str]:
+        """Returns up to `limit` values with a word starting with `prefix`
+
+        Values matching from their first word come first, then values are ordered
+        alphabetically.
+        """
+        prefix = _normalize(prefix)
+        if not prefix:
+            return []
+
+        if (
+            len(prefix) <= self.SHORT_PREFIX_LENGTH
+            and limit <= self.SHORT_PREFIX_RESULTS
+        ):
+            return self._short.get(prefix, [])[:limit]
+
+        # value -> earliest matching word position
+        matches: dict[str, int] = {}
+        start: int = bisect_left(self._keys, prefix)
+        for key, position, value in itertools.islice(self._entries, start, None):
+            if not key.startswith(prefix):
+                break
+
+            matches[value] = min(matches.get(value, position), position)
+
+        return self._rank(matches)[:limit]
@@ -1,15 +1,17 @@
 """A collection of classes and types for storing document, query, and user data"""
 
 import datetime
-from typing import Self, Union
+from typing import Callable, Self, Union
 
 
 class Flag:
     """Struct for flags"""
 
-    reporterName: str = None
-    errorLocation: str = None
-    errorDescription: str = None
+    __slots__ = ("reporterName", "errorLocation", "errorDescription")
+
+    reporterName: str
+    errorLocation: str
+    errorDescription: str
 
     def __init__(
         self,
@@ -97,21 +99,36 @@ class Metadata:
         The list of genres associated with this document
     """
 
-    id: str = None
-    studio: str = None
-    title: str = None
-    document_type: str = None
+    # without a per-instance `__dict__`, thousands of documents can be held at once cheaply
+    __slots__ = (
+        "id",
+        "studio",
+        "title",
+        "document_type",
+        "copyright_year",
+        "reel_count",
+        "uploaded_time",
+        "uploaded_by",
+        "actors",
+        "locations",
+        "genres",
+    )
+
+    id: str
+    studio: str
+    title: str
+    document_type: str
 
-    copyright_year: int = None
-    reel_count: int = None
+    copyright_year: int
+    reel_count: int
 
-    uploaded_time: datetime.datetime = None
+    uploaded_time: datetime.datetime
 
-    uploaded_by: str = None
+    uploaded_by: str
 
-    actors: list[dict[str, str]] = []
-    locations: list[str] = []
-    genres: list[str] = []
+    actors: list[dict[str, str]]
+    locations: list[str]
+    genres: list[str]
 
     def __init__(
         self,
@@ -135,12 +152,13 @@ class Metadata:
         self.reel_count = reel_count
         self.uploaded_time = uploaded_time
         self.uploaded_by = uploaded_by
-        self.actors = actors
-        self.locations = locations
-        self.genres = genres
+        # a new list for each instance, rather than the shared default
+        self.actors = actors if actors else []
+        self.locations = locations if locations else []
+        self.genres = genres if genres else []
 
 
-class Document:
+class Document(Metadata):
     """
     Class containing in-memory document data
 
@@ -182,22 +200,30 @@ class Document:
     flags: Union[list[Flag], None], default = None
         A list of all flags on this document, or `None` if they have not yet been fetched
 
+    transcript_loader: Callable[[Document], None], default = None
+        Called with this document the first time `transcripts` is read, if `transcripts` was
+        not given; it must set `transcripts` (and may set those of other documents too)
+
     Attributes
     ----------
     transcripts: list[tuple[int, str]]
-        A list of the text of each page, in order
+        A list of the text of each page, in order, loaded on first access if a
+        `transcript_loader` was given
+
+    transcripts_loaded: bool
+        Whether `transcripts` can be read without calling the `transcript_loader`
 
     flags: Union[list[Flag], None]
         A list of all flags on this document, or `None` if they have not yet been fetched
 
     metadata: Metadata
-        A `Metadata` object containing all additional data associated with this document
+        The metadata of this document, which is the document itself; documents extend
+        `Metadata` rather than wrapping a separate instance of it
     """
 
-    transcripts: list[tuple[int, str]] = []
-    flags: Union[list[Flag], None] = None
+    __slots__ = ("_transcripts", "_transcript_loader", "flags")
 
-    metadata: Metadata = Metadata()
+    flags: Union[list[Flag], None]
 
     def __init__(
         self,
@@ -214,8 +240,9 @@ class Document:
         genres: list[str] = [],
         transcripts: list[tuple[int, str]] = [],
         flags: list[Flag] = [],
+        transcript_loader: Callable[["Document"], None] = None,
     ):
-        self.metadata = Metadata(
+        super().__init__(
             id,
             studio,
             title,
@@ -229,100 +256,80 @@ class Document:
             genres,
         )
 
-        self.transcripts = transcripts if transcripts else []
+        self._transcript_loader = None if transcripts else transcript_loader
+        self._transcripts = (
+            transcripts if transcripts else None if transcript_loader else []
+        )
         self.flags = flags if flags else []
 
     @property
-    def id(self) -> str:
-        return self.metadata.id if self.metadata else None
-
-    @id.setter
-    def id(self, value: str):
-        self.metadata.id = value
-
-    @property
-    def studio(self) -> str:
-        return self.metadata.studio if self.metadata else None
-
-    @studio.setter
-    def studio(self, value: str):
-        self.metadata.studio = value
-
-    @property
-    def title(self) -> str:
-        return self.metadata.title if self.metadata else None
-
-    @title.setter
-    def title(self, value: str):
-        self.metadata.title = value
+    def metadata(self) -> Metadata:
+        return self
 
     @property
-    def document_type(self) -> str:
-        return self.metadata.document_type if self.metadata else None
+    def transcripts(self) -> list[tuple[int, str]]:
+        if self._transcripts is None:
+            self._transcript_loader(self)
 
-    @document_type.setter
-    def document_type(self, value: str):
-        self.metadata.document_type = value
-
-    @property
-    def copyright_year(self) -> str:
-        return self.metadata.copyright_year if self.metadata else None
+        return self._transcripts
 
-    @copyright_year.setter
-    def copyright_year(self, value: str):
-        self.metadata.copyright_year = value
+    @transcripts.setter
+    def transcripts(self, value: list[tuple[int, str]]):
+        self._transcripts = value
+        self._transcript_loader = None
 
     @property
-    def reel_count(self) -> str:
-        return self.metadata.reel_count if self.metadata else None
-
-    @reel_count.setter
-    def reel_count(self, value: str):
-        self.metadata.reel_count = value
+    def transcripts_loaded(self) -> bool:
+        return self._transcripts is not None
 
     @property
-    def uploaded_time(self) -> str:
-        return self.metadata.uploaded_time if self.metadata else None
-
-    @uploaded_time.setter
-    def uploaded_time(self, value: str):
-        self.metadata.uploaded_time = value
+    def content(self):
+        return "\n".join(tup[1] for tup in self.transcripts)
 
-    @property
-    def uploaded_by(self) -> str:
-        return self.metadata.uploaded_by if self.metadata else None
 
-    @uploaded_by.setter
-    def uploaded_by(self, value: str):
-        self.metadata.uploaded_by = value
+class SearchPage:
+    """
+    Struct for a single page of search results
 
-    @property
-    def actors(self) -> list[dict[str, str]]:
-        return self.metadata.actors if self.metadata else None
+    Parameters
+    ----------
+    num_results: int, default = 0
+        The total number of documents matching the query (not just those on this page)
 
-    @actors.setter
-    def actors(self, value: list[dict[str, str]]):
-        self.metadata.actors = value
+    documents: list[Document], default = []
+        The documents on this page, in rank order
 
-    @property
-    def locations(self) -> list[str]:
-        return self.metadata.locations if self.metadata else None
+    headlines: dict[str, str], default = {}
+        The snippet of each document most relevant to the query, keyed by document id
 
-    @locations.setter
-    def locations(self, value: list[str]):
-        self.metadata.locations = value
+    next_cursor: str, default = None
+        An opaque token marking the last document on this page, used to seek to the next
+        page (`None` if this is the last page)
 
-    @property
-    def genres(self) -> list[str]:
-        return self.metadata.genres if self.metadata else None
+    count_precision: str, default = "exact"
+        How `num_results` was found: `"exact"`, `"capped"` (there are more than
+        `num_results` matches), or `"estimated"` (from the query planner)
+    """
 
-    @genres.setter
-    def genres(self, value: list[str]):
-        self.metadata.genres = value
+    num_results: int = 0
+    documents: list[Document] = None
+    headlines: dict[str, str] = None
+    next_cursor: str = None
+    count_precision: str = "exact"
 
-    @property
-    def content(self):
-        return "\n".join(tup[1] for tup in self.transcripts)
+    def __init__(
+        self,
+        num_results: int = 0,
+        documents: list[Document] = None,
+        headlines: dict[str, str] = None,
+        next_cursor: str = None,
+        count_precision: str = "exact",
+    ):
+        self.num_results = num_results
+        self.documents = documents if documents else []
+        self.headlines = headlines if headlines else {}
+        self.next_cursor = next_cursor
+        self.count_precision = count_precision
 
 
 class Query:
@@ -413,6 +420,12 @@ class Query:
 
     set_studio(studio: str)
         Sets the studio that the copyrighted film must be from
+
+    normalized_keywords()
+        Returns the keywords as a single lowercase, whitespace-normalized string
+
+    cache_key()
+        Returns a hashable form of the query, equal for queries matching the same documents
     """
 
     viewed_documents: list[str] = []
@@ -498,3 +511,25 @@ class Query:
         """Sets the studio that the copyrighted film must be from"""
         self.studio = studio
         return self
+
+    def normalized_keywords(self) -> str:
+        """Returns the keywords as a single lowercase, whitespace-normalized string"""
+        return " ".join(" ".join(self.keywords).lower().split())
+
+    def cache_key(self) -> tuple:
+        """Returns a hashable form of the query, equal for queries matching the same documents
+
+        The order of actors and genres is ignored and whitespace between keywords is
+        normalized. `query_time` and `viewed_documents` are not included: documents are
+        only added by uploads, which advance the data generation that cached results are
+        invalidated by.
+        """
+        return (
+            tuple(sorted(set(self.actors))),
+            tuple(sorted(set(self.genres))),
+            " ".join(" ".join(self.keywords).split()),
+            self.document_type,
+            self.studio,
+            tuple(self.copyright_year_range),
+            tuple(self.reel_range),
+        )
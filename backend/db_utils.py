@@ -1,36 +1,545 @@
 """A collection of helpers for sending and recieving data to/from the PostgreSQL database."""
 
+import base64
+import binascii
+import datetime
+import hashlib
+import json
+import logging
+import re
+import time
+from logging.handlers import RotatingFileHandler
+from threading import BoundedSemaphore, Lock
+from typing import Callable, Iterator
+import numpy as np
 import psycopg2
+import psycopg2.pool
 import psycopg2.sql as sql
 from psycopg2.extensions import connection, cursor
-from flask import current_app, g
-from .datatypes import Document, Query, Flag
+from flask import current_app, g, has_app_context
+from .cache import HeadlineCache, LRUCache, PrefixIndex, SQLiteCache
+from .datatypes import Document, Query, Flag, SearchPage
+from .search_index import InvertedIndex, UnsupportedQuery, parse_tsquery
+from .spelling import SpellingIndex
 
+# options passed to `ts_headline` when building search result snippets
+HEADLINE_OPTIONS: str = (
+    "MaxFragments=3, MaxWords=40, MinWords=20, FragmentDelimiter=...<br><br>..."
+)
 
-def get_db_connection() -> psycopg2.extensions.connection:
-    """Creates a new ``psycopg2.extensions.connection`` or returns the current one
+# keyword headlines, keyed by (document id, normalized keywords, max length)
+headline_cache: HeadlineCache = HeadlineCache()
 
-    Returns
-    -------
-    db_connection : :obj:`psycopg2.extensions.connection`
-        The active ``psycopg2`` connection
+# the rendered, non-personalized part of each document's page, keyed by its id and
+# `get_document_version`, so stale entries are never read and simply age out
+fragment_cache: LRUCache = LRUCache(maxsize=256)
+
+# the ways `search_page` can find the total number of results
+COUNT_MODES: tuple[str, ...] = ("exact", "capped", "estimate")
+
+# the ways `search_page` can rank keyword matches
+RANK_MODES: tuple[str, ...] = ("ts_rank_cd", "bm25")
+
+# pages of search results, keyed by canonical query and page (see `configure_result_cache`)
+result_cache: LRUCache | SQLiteCache = LRUCache()
+
+# how often (in seconds) a cache hit checks whether ingestion has happened since
+GENERATION_POLL_INTERVAL: float = 5
+_generation_checked: float = 0
+
+
+def configure_result_cache(
+    backend: str = "memory",
+    maxsize: int = None,
+    ttl: float = None,
+    path: str = None,
+    poll_interval: float = None,
+):
+    """Replace ``result_cache`` with an empty cache.
+
+    Parameters
+    ----------
+    backend : {"memory", "sqlite"}, default = "memory"
+        Whether results are cached in this process only, or in a SQLite file shared
+        between every worker process
+    maxsize : int, default = None
+        The maximum number of cached pages (the backend's default if ``None``)
+    ttl : float, default = None
+        The number of seconds a page remains cached (the backend's default if ``None``)
+    path : str, default = None
+        The path of the SQLite file, required by the ``"sqlite"`` backend
+    poll_interval : float, default = None
+        How often (in seconds) cache hits check the data generation
     """
-    if "db_connection" not in g:
-        g.db_connection = psycopg2.connect(
+    global result_cache, GENERATION_POLL_INTERVAL, _generation_checked
+
+    # a shared store is not cleared, since other workers may still be using it
+    options: dict = {
+        name: value
+        for name, value in {"maxsize": maxsize, "ttl": ttl}.items()
+        if value is not None
+    }
+
+    if backend == "memory":
+        result_cache = LRUCache(**options)
+    elif backend == "sqlite":
+        if not path:
+            raise ValueError("The sqlite result cache requires a path")
+        result_cache = SQLiteCache(path, **options)
+    else:
+        raise ValueError(f"Unknown result cache backend: {backend}")
+
+    if poll_interval is not None:
+        GENERATION_POLL_INTERVAL = poll_interval
+    _generation_checked = 0
+
+
+def _generation_changed(conn: connection) -> bool:
+    """Whether ingestion has happened since the caches were filled.
+
+    The database is only asked once every ``GENERATION_POLL_INTERVAL`` seconds, so most
+    cache hits do not touch it. Stale caches are cleared.
+    """
+    global _generation_checked
+
+    if time.monotonic() - _generation_checked < GENERATION_POLL_INTERVAL:
+        return False
+
+    try:
+        cur: cursor = None
+        with conn.cursor() as cur:
+            cur.execute("SELECT last_value FROM data_generation;")
+            row: tuple = cur.fetchone()
+
+        conn.commit()
+    except psycopg2.errors.UndefinedTable as e:
+        print(e)
+        conn.rollback()
+        return False
+
+    _generation_checked = time.monotonic()
+
+    if not row or row[0] == result_cache.generation:
+        return False
+
+    result_cache.set_generation(row[0])
+    headline_cache.set_generation(row[0])
+    return True
+
+
+class PreparingConnection(psycopg2.extensions.connection):
+    """A ``psycopg2`` connection which remembers the statements ``PREPARE``d on it
+
+    Prepared statements only exist for the lifetime of a session, so they are tracked per
+    connection (see ``execute_prepared``).
+
+    Attributes
+    ----------
+    prepared_statements : dict[str, tuple[str, list[str]]]
+        The name and parameter names of each prepared statement, keyed by its SQL text
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.prepared_statements: dict[str, tuple[str, list[str]]] = {}
+
+
+class BlockingConnectionPool(psycopg2.pool.ThreadedConnectionPool):
+    """A ``ThreadedConnectionPool`` whose ``getconn`` waits for a free connection
+
+    ``ThreadedConnectionPool.getconn`` raises ``PoolError`` as soon as ``maxconn``
+    connections are checked out. Here it waits up to ``timeout`` seconds for one to be
+    returned first, and only raises ``PoolError`` if none is.
+
+    Each request (and each streamed response, for as long as it streams) holds one
+    connection, so ``maxconn`` should be at least the number of worker threads serving
+    the app; otherwise requests queue here for up to ``timeout`` seconds.
+
+    Parameters
+    ----------
+    minconn : int
+        The number of connections opened when the pool is created
+    maxconn : int
+        The most connections checked out at once
+    timeout : float | None, default = 30
+        The most seconds ``getconn`` waits for a connection, or ``None`` to wait forever
+    """
+
+    def __init__(self, minconn: int, maxconn: int, *args, timeout=30, **kwargs):
+        super().__init__(minconn, maxconn, *args, **kwargs)
+
+        self.timeout: float | None = timeout
+        self._slots: BoundedSemaphore = BoundedSemaphore(maxconn)
+
+    def getconn(self, key=None) -> connection:
+        # a key's connection is shared until it is put back, so it holds a single slot
+        with self._lock:
+            if key is not None and key in self._used:
+                return self._used[key]
+
+        if not self._slots.acquire(timeout=self.timeout):
+            raise psycopg2.pool.PoolError(
+                f"no connection became free within {self.timeout} seconds"
+            )
+
+        try:
+            return super().getconn(key)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn: connection = None, key=None, close: bool = False):
+        # only a connection that is checked out frees a slot, so a failed or repeated put
+        # cannot let more than `maxconn` connections out
+        with self._lock:
+            if key is None:
+                key = self._rused.get(id(conn))
+
+            if (
+                key is None
+                or key not in self._used
+                or (conn is not None and self._used[key] is not conn)
+            ):
+                raise psycopg2.pool.PoolError(
+                    "trying to put a connection not checked out"
+                )
+
+            self._putconn(self._used[key], key, close)
+
+        self._slots.release()
+
+
+def _get_db_pool() -> BlockingConnectionPool:
+    """Return the connection pool of the current app, creating it if needed
+
+    ``DB_POOL_MAX`` must be at least the number of worker threads, and ``DB_POOL_TIMEOUT``
+    is how many seconds a request waits for a connection (see ``BlockingConnectionPool``).
+    """
+    if "db_pool" not in current_app.extensions:
+        current_app.extensions["db_pool"] = BlockingConnectionPool(
+            current_app.config.get("DB_POOL_MIN", 1),
+            current_app.config.get("DB_POOL_MAX", 10),
+            timeout=current_app.config.get("DB_POOL_TIMEOUT", 30),
             host=current_app.config["SQL_HOST"],
             port=current_app.config["SQL_PORT"],
             dbname=current_app.config["SQL_DBNAME"],
             user=current_app.config["SQL_USER"],
             password=current_app.config["SQL_PASSWORD"],
+            connection_factory=(
+                PreparingConnection
+                if current_app.config.get("PREPARED_STATEMENTS", True)
+                else None
+            ),
         )
 
+    return current_app.extensions["db_pool"]
+
+
+def get_db_connection() -> psycopg2.extensions.connection:
+    """Takes a ``psycopg2.extensions.connection`` from the pool or returns the current one
+
+    Connections are kept open between requests so that the statements prepared on them
+    can be reused (see ``release_db_connection``).
+
+    Returns
+    -------
+    db_connection : :obj:`psycopg2.extensions.connection`
+        The active ``psycopg2`` connection
+
+    Raises
+    ------
+    psycopg2.pool.PoolError
+        If no connection is returned to the pool within ``DB_POOL_TIMEOUT`` seconds
+    """
+    if "db_connection" not in g:
+        g.db_connection = _get_db_pool().getconn()
+
     return g.db_connection
 
 
+def release_db_connection(db_connection: connection):
+    """Returns a connection taken by ``get_db_connection`` to the pool
+
+    Parameters
+    ----------
+    db_connection : :obj:`psycopg2.extensions.connection`
+        The connection to return; any open transaction is rolled back
+    """
+    _get_db_pool().putconn(db_connection)
+
+
+# per-shape timings of `execute_prepared`, keyed by label
+_statement_stats: dict[str, dict] = {}
+_statement_stats_lock: Lock = Lock()
+
+# a named placeholder, or an escaped percent sign
+_PLACEHOLDER_PATTERN: re.Pattern = re.compile(r"%\((\w+)\)s|%%")
+
+
+def _to_positional(text: str) -> tuple[str, list[str]]:
+    """Replace the named placeholders of ``text`` with ``PREPARE``'s ``$n`` parameters
+
+    Returns the new SQL and the name of each parameter, in order.
+    """
+    names: list[str] = []
+
+    def replace(match: re.Match) -> str:
+        if match.group(1) is None:
+            return "%"
+
+        if match.group(1) not in names:
+            names.append(match.group(1))
+        return f"${names.index(match.group(1)) + 1}"
+
+    return _PLACEHOLDER_PATTERN.sub(replace, text), names
+
+
+def _record_statement(label: str, stage: str, seconds: float, prepared: bool):
+    """Add a timing to the ``_statement_stats`` of ``label``"""
+    with _statement_stats_lock:
+        stats: dict = _statement_stats.setdefault(
+            label,
+            {
+                "prepared": prepared,
+                "prepares": 0,
+                "prepare_ms": 0.0,
+                "executions": 0,
+                "execute_ms": 0.0,
+            },
+        )
+        stats["prepared"] = prepared
+        stats[f"{stage}s" if stage == "prepare" else "executions"] += 1
+        stats[f"{stage}_ms"] += seconds * 1000
+
+
+def statement_stats() -> dict[str, dict]:
+    """Return the prepare and execute timings of each statement shape.
+
+    Returns
+    -------
+    stats : dict[str, dict]
+        For each label passed to ``execute_prepared``: whether it was prepared, the number
+        of times it was prepared and executed, and the total time (in milliseconds) spent
+        on each, as seen by the client
+    """
+    with _statement_stats_lock:
+        return {
+            label: {
+                **stats,
+                "mean_execute_ms": (
+                    stats["execute_ms"] / stats["executions"]
+                    if stats["executions"]
+                    else 0.0
+                ),
+            }
+            for label, stats in _statement_stats.items()
+        }
+
+
+# searches slower than this (in milliseconds) are logged with their plan; `None` disables it
+SLOW_QUERY_MS: float | None = None
+_slow_query_logger: logging.Logger = logging.getLogger("backend.slow_queries")
+_slow_query_logger.propagate = False
+
+
+def configure_slow_query_log(
+    threshold_ms: float | None = None,
+    path: str = "slow_queries.log",
+    max_bytes: int = 1 << 20,
+    backup_count: int = 3,
+):
+    """Start (or stop) logging searches slower than a threshold.
+
+    Each entry is one line of JSON holding the composed SQL, its parameters, the wall time
+    and an ``EXPLAIN (ANALYZE, BUFFERS)`` plan, written to a file rotated by size.
+
+    Parameters
+    ----------
+    threshold_ms : float, default = None
+        The wall time (in milliseconds) above which a search is logged (``None`` to stop)
+    path : str, default = "slow_queries.log"
+        The path of the log file
+    max_bytes : int, default = 1 MiB
+        The size at which the log file is rotated
+    backup_count : int, default = 3
+        The number of rotated files kept, as ``path.1``, ``path.2``, ...
+    """
+    global SLOW_QUERY_MS
+
+    for handler in list(_slow_query_logger.handlers):
+        _slow_query_logger.removeHandler(handler)
+        handler.close()
+
+    SLOW_QUERY_MS = threshold_ms
+    if threshold_ms is None:
+        return
+
+    handler: logging.Handler = RotatingFileHandler(
+        path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+    )
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    _slow_query_logger.addHandler(handler)
+    _slow_query_logger.setLevel(logging.INFO)
+
+
+def _log_slow_query(
+    cur: cursor, SQLQuery: sql.Composed, params: dict, label: str, seconds: float
+):
+    """Re-run a slow query under ``EXPLAIN (ANALYZE, BUFFERS)`` and log it with its plan"""
+    # a separate cursor, so the caller can still fetch the original results
+    with cur.connection.cursor() as explainCursor:
+        explainCursor.execute(
+            sql.SQL("EXPLAIN (ANALYZE, BUFFERS) {}").format(SQLQuery), params
+        )
+        plan: str = "\n".join(row[0] for row in explainCursor.fetchall())
+
+    _slow_query_logger.info(
+        json.dumps(
+            {
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "label": label,
+                "ms": round(seconds * 1000, 3),
+                "sql": SQLQuery.as_string(cur.connection),
+                "params": params,
+                "plan": plan,
+            },
+            # e.g. `query_time` is a datetime
+            default=str,
+        )
+    )
+
+
+def slow_queries(limit: int = 100) -> list[dict]:
+    """Return the most recent entries of the slow query log, newest first.
+
+    Parameters
+    ----------
+    limit : int, default = 100
+        The maximum number of entries returned
+
+    Returns
+    -------
+    entries : list[dict]
+        The label, wall time (``ms``), SQL, parameters and plan of each logged search
+    """
+    entries: list[dict] = []
+    for handler in _slow_query_logger.handlers:
+        if not isinstance(handler, RotatingFileHandler):
+            continue
+
+        handler.flush()
+        # the current file, then its backups from newest to oldest
+        paths: list[str] = [handler.baseFilename] + [
+            f"{handler.baseFilename}.{i}" for i in range(1, handler.backupCount + 1)
+        ]
+        for path in paths:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    lines: list[str] = f.read().splitlines()
+            except FileNotFoundError:
+                break
+
+            for line in reversed(lines):
+                entries.append(json.loads(line))
+                if len(entries) >= limit:
+                    return entries
+
+    return entries
+
+
+def execute_prepared(cur: cursor, SQLQuery: sql.Composed, params: dict, label: str):
+    """Execute SQL with named placeholders as a server-side prepared statement.
+
+    On a ``PreparingConnection``, each distinct SQL text is ``PREPARE``d once per connection
+    and run with ``EXECUTE`` afterwards, so repeated queries of the same shape skip parsing
+    and planning. On any other connection it is executed normally.
+
+    Parameters
+    ----------
+    cur : :obj:`psycopg2.extensions.cursor`
+        The cursor upon which the query will be executed
+    SQLQuery : :obj:`psycopg2.sql.Composed`
+        The SQL to execute, with a named placeholder for each value
+    params : dict
+        The value of each named placeholder
+    label : str
+        The name under which timings are recorded (see ``statement_stats``)
+
+    See Also
+    --------
+    configure_slow_query_log : Logs the plans of executions slower than a threshold
+    """
+    conn: connection = cur.connection
+
+    if not isinstance(conn, PreparingConnection):
+        start: float = time.perf_counter()
+        cur.execute(SQLQuery, params)
+        seconds: float = time.perf_counter() - start
+        _record_statement(label, "execute", seconds, False)
+
+        if SLOW_QUERY_MS is not None and seconds * 1000 > SLOW_QUERY_MS:
+            _log_slow_query(cur, SQLQuery, params, label, seconds)
+        return
+
+    text: str = SQLQuery.as_string(conn)
+
+    if text not in conn.prepared_statements:
+        positional, names = _to_positional(text)
+        name: str = "stmt_" + hashlib.md5(text.encode("utf-8")).hexdigest()[:16]
+
+        start: float = time.perf_counter()
+        # without parameters, psycopg2 sends the SQL as-is
+        cur.execute(f"PREPARE {name} AS {positional}")
+        _record_statement(label, "prepare", time.perf_counter() - start, True)
+
+        conn.prepared_statements[text] = (name, names)
+
+    name, names = conn.prepared_statements[text]
+
+    start: float = time.perf_counter()
+    if names:
+        cur.execute(
+            f"EXECUTE {name} ({', '.join(f'%({n})s' for n in names)});",
+            params,
+        )
+    else:
+        cur.execute(f"EXECUTE {name};")
+    seconds: float = time.perf_counter() - start
+    _record_statement(label, "execute", seconds, True)
+
+    if SLOW_QUERY_MS is not None and seconds * 1000 > SLOW_QUERY_MS:
+        _log_slow_query(cur, SQLQuery, params, label, seconds)
+
+
+def query_shape(query: Query) -> str:
+    """Return which filters of ``query`` are present, e.g. ``"keywords+actors"``
+
+    Queries with the same shape are composed into the same SQL text.
+    """
+    filters: dict[str, bool] = {
+        "keywords": bool(query.keywords),
+        "year_min": query.copyright_year_range[0] is not None,
+        "year_max": query.copyright_year_range[1] is not None,
+        "reel_min": query.reel_range[0] is not None,
+        "reel_max": query.reel_range[1] is not None,
+        "studio": bool(query.studio),
+        "query_time": bool(query.query_time),
+        "actors": bool(query.actors),
+        "genres": bool(query.genres),
+    }
+
+    return "+".join(name for name, present in filters.items() if present) or "all"
+
+
 def relation_from_id_to_all_values(
-    idColumn: str, valueColumn: str, relation: str, values: list
-) -> sql.SQL:
-    """Generates SQL for a table containing rows from ``columnName`` relating to each of ``values``
+    idColumn: str, valueColumn: str, relation: str, placeholder: str
+) -> sql.Composed:
+    """Generates SQL for a table containing the ``id``s related to every value in an array
+
+    The values are bound as a single array parameter rather than written into the SQL, so
+    the statement text is the same for every list of values. With an index on
+    ``(valueColumn, idColumn)``, only the rows for the requested values are read.
 
     Parameters
     ----------
@@ -45,12 +554,13 @@ def relation_from_id_to_all_values(
     relation : str
         The name of the relation containing both ``idColumn`` and ``valueColumn``
 
-    values : list
-        The list of ``value``s that each ``id`` must relate to to appear in the resulting relation
+    placeholder : str
+        The name of the parameter holding the array of ``value``s that each ``id`` must relate
+        to to appear in the resulting relation. The array must not contain duplicates
 
     Returns
     -------
-    tableSQL: psycopg2.sql.SQL
+    tableSQL: psycopg2.sql.Composed
         The SQL query for a relation containing only those ``id``s which are related to each
         ``value``
 
@@ -69,57 +579,68 @@ def relation_from_id_to_all_values(
 
 
     >>> # To find all documents with both genres "comedy" and "drama":
-    >>> relation_from_id_to_all_values("document_id", "genre", "has_genre", ["comedy", "drama"])
-        psycopg2.sql.SQL("SELECT document_id \
-FROM has_genre \
-WHERE genre = 'comedy' OR genre = 'drama' \
-GROUP BY genre \
-HAVING COUNT(distinct document_id) >= 2")
+    >>> tableSQL = relation_from_id_to_all_values("document_id", "genre", "has_genre", "genres")
+    >>> cursor.execute(tableSQL, {"genres": ["comedy", "drama"]})
+    >>> cursor.fetchall()
+    [("s0000l11111",)]
     """
 
-    tableSQL: sql.SQL = sql.SQL(
+    # every row matches one of the values, so an id related to all of them has one row
+    # for each (before the HAVING clause)
+    tableSQL: sql.Composed = sql.SQL(
         "SELECT {column_name} \
         FROM {relation} \
-        WHERE {value_conditions} \
+        WHERE {value_column_name} = ANY({values}) \
         GROUP BY {column_name} \
-        HAVING COUNT(distinct {value_column_name}) >= {num_actors}"
+        HAVING COUNT(DISTINCT {value_column_name}) = cardinality({values}::text[])"
     ).format(
         column_name=sql.Identifier(idColumn),
         value_column_name=sql.Identifier(valueColumn),
         relation=sql.Identifier(relation),
-        # OR since we are matching all rows containing any value.
-        # those ids that contain more than 1 value will have more than 1 row in the resulting table
-        # (before the HAVING clause)
-        value_conditions=sql.SQL(" OR ").join(
-            [
-                sql.SQL("{} = {}").format(
-                    sql.Identifier(valueColumn), sql.Literal(value)
-                )
-                for value in set(values)
-            ]
-        ),
-        num_actors=sql.Literal(len(values)),
+        values=sql.Placeholder(placeholder),
     )
 
     return tableSQL
 
 
-def execute_document_query(
-    cursor: cursor,
+def document_query_params(query: Query) -> dict:
+    """Returns the values bound to the placeholders of ``compose_document_query``'s SQL
+
+    Parameters
+    ----------
+    query : :obj:`Query`
+        The ``Query`` object the SQL was composed from
+
+    Returns
+    -------
+    params : dict
+        The value of each named placeholder
+    """
+    return {
+        "title": " ".join(query.keywords) if query.keywords else None,
+        "year_min": query.copyright_year_range[0],
+        "year_max": query.copyright_year_range[1],
+        "reel_min": query.reel_range[0],
+        "reel_max": query.reel_range[1],
+        "studio": query.studio,
+        "query_time": query.query_time,
+        "actors": sorted(set(query.actors)),
+        "genres": sorted(set(query.genres)),
+    }
+
+
+def compose_document_query(
     query: Query,
     prefix: sql.SQL = sql.SQL(
         "SELECT id, copyright_year, studio, title, document_type"
     ),
     suffix: sql.SQL = sql.SQL(";"),
     rankPages: bool = False,
-):
+) -> sql.Composed:
     """Create a SQL query from a ``Query`` object.
 
     Parameters
     ----------
-    cursor : :obj:`psycopg2.extensions.cursor`
-        The cursor upon which the query will be executed
-
     query : :obj:`Query`
         A ``Query`` object containing all relevant information for the SQL query
 
@@ -131,14 +652,23 @@ def execute_document_query(
 
     rankPages : bool, default = False
         Whether results should be ordered by relevance
+
+    Returns
+    -------
+    SQLQuery : :obj:`psycopg2.sql.Composed`
+        The composed SQL query, with a named placeholder for each value from ``query``
+
+    See Also
+    --------
+    document_query_params : The values to execute the composed SQL with
     """
-    # manual SQL composition since binding variables in `execute()`
-    # does not allow for a variable number of variables
+    # only the filters present in `query` are composed, and their values are bound when
+    # the SQL is executed, so queries of the same shape share the same SQL text
     sqlLines: list[sql.SQL] = []
 
     sqlLines.append(prefix)
     sqlLines.append(
-        sql.SQL("FROM documents INNER JOIN text_search_view ON id = document_id")
+        sql.SQL("FROM documents INNER JOIN text_search_index ON id = document_id")
     )
     sqlLines.append(sql.SQL("WHERE TRUE"))
 
@@ -147,46 +677,47 @@ def execute_document_query(
     if titleQuery:
         sqlLines.append(
             sql.SQL("AND text_vector @@ websearch_to_tsquery({title})").format(
-                title=sql.Literal(titleQuery)
+                title=sql.Placeholder("title")
             )
         )
 
-    # handle filtering by minimum year
+    # handle filtering by minimum year; the text search index holds a copy of the year, so
+    # that when both tables are partitioned by year, neither reads the other years
     if query.copyright_year_range[0] is not None:
         sqlLines.append(
-            sql.SQL("AND copyright_year >= {}").format(
-                sql.Literal(query.copyright_year_range[0])
+            sql.SQL("AND copyright_year >= {year} AND document_year >= {year}").format(
+                year=sql.Placeholder("year_min")
             )
         )
 
     # handle filtering by maximum year
     if query.copyright_year_range[1] is not None:
         sqlLines.append(
-            sql.SQL("AND copyright_year <= {}").format(
-                sql.Literal(query.copyright_year_range[1])
+            sql.SQL("AND copyright_year <= {year} AND document_year <= {year}").format(
+                year=sql.Placeholder("year_max")
             )
         )
 
     # handle filtering by minimum reel count
     if query.reel_range[0] is not None:
         sqlLines.append(
-            sql.SQL("AND reel_count >= {}").format(sql.Literal(query.reel_range[0]))
+            sql.SQL("AND reel_count >= {}").format(sql.Placeholder("reel_min"))
         )
 
     # handle filtering by maximum reel count
     if query.reel_range[1] is not None:
         sqlLines.append(
-            sql.SQL("AND reel_count <= {}").format(sql.Literal(query.reel_range[1]))
+            sql.SQL("AND reel_count <= {}").format(sql.Placeholder("reel_max"))
         )
 
     # handle filtering by studio/copyright holder
     if query.studio:
-        sqlLines.append(sql.SQL("AND studio = {}").format(sql.Literal(query.studio)))
+        sqlLines.append(sql.SQL("AND studio = {}").format(sql.Placeholder("studio")))
 
     # handle filtering by document upload time
     if query.query_time:
         sqlLines.append(
-            sql.SQL("AND uploaded_time <= {}").format(sql.Literal(query.query_time))
+            sql.SQL("AND uploaded_time <= {}").format(sql.Placeholder("query_time"))
         )
 
     # handle filtering by actors (list of required actors)
@@ -194,7 +725,7 @@ def execute_document_query(
         sqlLines.append(
             sql.SQL("AND id in ( {} )").format(
                 relation_from_id_to_all_values(
-                    "document_id", "actor_name", "has_character", query.actors
+                    "document_id", "actor_name", "has_character", "actors"
                 )
             )
         )
@@ -204,7 +735,7 @@ def execute_document_query(
         sqlLines.append(
             sql.SQL("AND id in ( {} )").format(
                 relation_from_id_to_all_values(
-                    "document_id", "genre", "has_genre", query.genres
+                    "document_id", "genre", "has_genre", "genres"
                 )
             )
         )
@@ -217,105 +748,485 @@ def execute_document_query(
         sqlLines.append(
             sql.SQL(
                 "ORDER BY ts_rank_cd( \
-                    text_search_view.text_vector, \
+                    text_search_index.text_vector, \
                     websearch_to_tsquery({title}) \
                 ) DESC"
-            ).format(title=sql.Literal(titleQuery))
+            ).format(title=sql.Placeholder("title"))
         )
 
     sqlLines.append(suffix)
 
     # finally compose the query
-    SQLQuery: sql.SQL = sql.SQL("\n").join(sqlLines)
-    # print(SQLQuery.as_string(cursor.connection))
-
-    # execute the query, with replacement variables already in-place
-    cursor.execute(SQLQuery)
+    return sql.SQL("\n").join(sqlLines)
 
 
-def search_results(
-    conn: connection, query: Query, page: int = 1, resultsPerPage: int = 50
-) -> list[Document]:
-    """Return a page of search results.
+def execute_document_query(
+    cursor: cursor,
+    query: Query,
+    prefix: sql.SQL = sql.SQL(
+        "SELECT id, copyright_year, studio, title, document_type"
+    ),
+    suffix: sql.SQL = sql.SQL(";"),
+    rankPages: bool = False,
+    params: dict = None,
+    label: str = "document_query",
+):
+    """Execute the SQL query for a ``Query`` object as a prepared statement.
 
     Parameters
     ----------
-    conn : :obj:`psycopg2.extensions.connection`
-        A ``psycopg2`` connection to perform queries with
-    page : int, default = 1
-        The index of the page of results to return
+    cursor : :obj:`psycopg2.extensions.cursor`
+        The cursor upon which the query will be executed
+
     query : :obj:`Query`
-        A ``Query`` object specifying the search parameters
-    resultsPerPage : int, default = 50
-        The number of results displayed on each page
+        A ``Query`` object containing all relevant information for the SQL query
 
-    Returns
-    -------
-    results : list[Document]
-        A list of ``Document``s
+    prefix : :obj:`psycopg2.sql.SQL`, default = SQL("SELECT id, copyright_year, studio, title")
+        Optional SQL to be inserted before the "FROM" clause
+
+    suffix : :obj:`psycopg2.sql.SQL`, default = SQL(";")
+        Optional SQL to be inserted after the "WHERE" clause(s)
+
+    rankPages : bool, default = False
+        Whether results should be ordered by relevance
+
+    params : dict, default = None
+        Values for any named placeholders in ``prefix`` or ``suffix``
+
+    label : str, default = "document_query"
+        The name under which timings are recorded, followed by the shape of ``query``
 
     See Also
     --------
-    formatDocument : The function used to format returned ``Document``s
+    compose_document_query : The function used to build the executed SQL
+    document_query_params : The function used to build the executed SQL's parameters
+    execute_prepared : The function used to execute the SQL
     """
-    if not conn:
-        # TODO make this exception more specific
-        raise Exception("No SQL connection found")
+    SQLQuery: sql.Composed = compose_document_query(query, prefix, suffix, rankPages)
 
-    documents: list = []
+    execute_prepared(
+        cursor,
+        SQLQuery,
+        {**document_query_params(query), **(params if params else {})},
+        f"{label}[{query_shape(query)}]",
+    )
 
-    try:
-        cur: cursor = None
-        with conn.cursor() as cur:
-            # gather only the attributes needed for the results page
 
-            execute_document_query(
-                cur,
-                query,
-                suffix=sql.Composed(
-                    [
-                        sql.SQL("LIMIT "),
-                        sql.Literal(resultsPerPage),
-                        sql.SQL("\nOFFSET "),
-                        sql.Literal(resultsPerPage * (page - 1)),
-                        sql.SQL(";"),
-                    ]
-                ),
-                rankPages=True,
-            )
+def encode_search_cursor(rank: float, doc_id: str) -> str:
+    """Encode the position of a search result as an opaque, URL-safe token.
 
-            documents: list[Document] = [
-                Document(
-                    id=documentQuery[0],
-                    studio=documentQuery[2],
-                    title=documentQuery[3],
-                    copyright_year=documentQuery[1],
-                    document_type=documentQuery[4],
-                )
-                for documentQuery in cur.fetchall()
-            ]
+    Parameters
+    ----------
+    rank : float
+        The relevance rank of the result
+    doc_id : str
+        The id of the result, used to break ties between equal ranks
 
-            for document in documents:
-                cur.execute(
-                    "SELECT actor_name \
-                    FROM has_character \
-                    WHERE document_id=%s;",
-                    [document.id],
-                )
+    Returns
+    -------
+    token : str
+        A token which can be passed to ``decode_search_cursor``
+    """
+    encoded: bytes = base64.urlsafe_b64encode(json.dumps([rank, doc_id]).encode())
+    return encoded.decode().rstrip("=")
 
-                actorQuery = cur.fetchall()
 
-                document.actors = [result[0] for result in actorQuery]
+def decode_search_cursor(token: str) -> tuple[float, str] | None:
+    """Decode a token created by ``encode_search_cursor``.
 
-                cur.execute(
-                    "SELECT page_number, content \
-                    FROM transcripts \
-                    WHERE document_id=%s \
-                    ORDER BY page_number;",
-                    [document.id],
-                )
+    Parameters
+    ----------
+    token : str
+        The token to decode
+
+    Returns
+    -------
+    position : tuple[float, str] or None
+        The ``(rank, id)`` pair held by the token, or ``None`` if the token is malformed
+    """
+    try:
+        padded: str = token + "=" * (-len(token) % 4)
+        rank, doc_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (float(rank), str(doc_id))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        return None
+
+
+def reindex_documents(conn: connection, doc_ids: list[str]):
+    """Recompute the full-text search data of some documents.
+
+    Only the given documents have their complete text and weighted (title A, content B)
+    search vector rebuilt, so small batches can be indexed without touching the rest of
+    the corpus.
+
+    Parameters
+    ----------
+    conn : :obj:`psycopg2.extensions.connection`
+        A ``psycopg2`` connection to perform queries with
+    doc_ids : list[str]
+        The ids of the documents whose title or transcripts have changed
+    """
+    if not conn:
+        raise Exception("No SQL connection found")
+
+    if not doc_ids:
+        return
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT reindex_documents(%s);", [list(doc_ids)])
+
+    conn.commit()
+
+    # sequences are not transactional, so the generation is only advanced once the new
+    # index is visible; otherwise the old results could be cached under it
+    with conn.cursor() as cur:
+        cur.execute("SELECT nextval('data_generation');")
+
+    conn.commit()
+
+
+def _compose_capped_count(query: Query) -> sql.Composed:
+    """Compose a count of the documents matching ``query`` that stops after ``count_limit``.
+
+    With ``count_limit`` bound to ``cap + 1``, a result of ``cap + 1`` means there are more
+    than ``cap`` matches, without the rest of them being visited.
+    """
+    return sql.SQL("SELECT COUNT(*) AS num_results FROM ({matches}) AS capped").format(
+        matches=compose_document_query(
+            query,
+            prefix=sql.SQL("SELECT 1"),
+            suffix=sql.SQL("LIMIT {}").format(sql.Placeholder("count_limit")),
+        )
+    )
+
+
+def _is_estimable(query: Query) -> bool:
+    """Whether the planner's row estimate for ``query`` can stand in for its count.
+
+    Only queries which filter on plain columns of ``documents`` are estimated well; the
+    selectivity of full-text and actor/genre filters is mostly guessed.
+    """
+    return not (query.keywords or query.actors or query.genres)
+
+
+def _estimate_num_results(cur: cursor, query: Query) -> int:
+    """Return the planner's estimate of the number of documents matching ``query``.
+
+    Only the query plan is computed; no documents are read.
+    """
+    cur.execute(
+        sql.SQL("EXPLAIN (FORMAT JSON) {}").format(
+            compose_document_query(
+                query, prefix=sql.SQL("SELECT 1"), suffix=sql.SQL("")
+            )
+        ),
+        document_query_params(query),
+    )
+    plan: tuple = cur.fetchone()
+
+    return int(plan[0][0]["Plan"]["Plan Rows"]) if plan else 0
+
+
+# matches the rows of a per-document table (`transcripts`, `document_text`) with the year of
+# the page's document, so that only its year's partition is read if the table is partitioned
+_SAME_YEAR: sql.SQL = sql.SQL(
+    "(document_year = page.copyright_year \
+    OR (document_year IS NULL AND page.copyright_year IS NULL))"
+)
+
+# the distinct lexemes of the keywords that can match a document, for BM25: `querytree`
+# drops the negated (`-word`) branches of the query, and each of the quoted lexemes it
+# prints (with `''` escaping a quote) is extracted
+_QUERY_LEXEMES: sql.Composed = sql.SQL(
+    "ARRAY( \
+        SELECT DISTINCT replace(lexeme[1], '''''', '''') \
+        FROM regexp_matches( \
+            querytree(websearch_to_tsquery({title})), '''((?:[^'']|'''')+)''', 'g' \
+        ) AS lexeme \
+    )"
+).format(title=sql.Placeholder("title"))
+
+
+def search_page(
+    conn: connection,
+    query: Query,
+    page: int = 1,
+    resultsPerPage: int = 50,
+    max_length: int = 400,
+    after: tuple[float, str] | None = None,
+    count_mode: str = "exact",
+    count_cap: int = 10000,
+    rank_mode: str = "ts_rank_cd",
+    bm25_candidates: int = 1000,
+) -> SearchPage:
+    """Return a page of search results, their total count, and their headlines at once.
+
+    The count, the ranked page of ``Document``s (with actors), and the headline of each
+    document are all produced by a single SQL statement, so the full-text query is only
+    evaluated once per search. Headlines already held by ``headline_cache`` are not
+    recomputed.
+
+    Whole pages are kept in ``result_cache``, keyed by the canonical form of ``query``
+    (see ``Query.cache_key``) and the other arguments, so repeated searches do not touch
+    the database. The returned ``SearchPage`` may be shared and must not be modified.
+
+    Broad queries (such as the default landing page, which matches the whole corpus) can
+    avoid counting every match with ``count_mode``:
+
+    * ``"exact"`` counts every match
+    * ``"capped"`` stops counting after ``count_cap`` matches
+    * ``"estimate"`` uses the planner's row estimate for queries without keyword, actor,
+      or genre filters, and a capped count for all others
+
+    Keyword matches are ranked by ``rank_mode``:
+
+    * ``"ts_rank_cd"`` ranks every match by cover density
+    * ``"bm25"`` pre-ranks every match by ``ts_rank``, then reranks the
+      ``bm25_candidates`` best of them with Okapi BM25 using the document frequencies in
+      ``lexeme_stats``, so rare terms (rather than common OCR noise) dominate. The pre-rank
+      still visits every match, but it is cheaper per match than BM25, which is only
+      computed for the candidates. Only the candidates can be paged through, and only the
+      keywords that are not negated add to their scores
+
+    Parameters
+    ----------
+    conn : :obj:`psycopg2.extensions.connection`
+        A ``psycopg2`` connection to perform queries with
+    query : :obj:`Query`
+        A ``Query`` object specifying the search parameters
+    page : int, default = 1
+        The index of the page of results to return
+    resultsPerPage : int, default = 50
+        The number of results displayed on each page
+    max_length : int, default = 400
+        The maximum length of a headline when ``query`` has no keywords
+    after : tuple[float, str], default = None
+        The ``(rank, id)`` of the last result on the previous page (see
+        ``decode_search_cursor``). When given, the page starts directly after that result
+        instead of skipping ``resultsPerPage * (page - 1)`` results, so later pages cost the
+        same as the first
+    count_mode : {"exact", "capped", "estimate"}, default = "exact"
+        How the total number of matching documents is found
+    count_cap : int, default = 10000
+        The number of matches after which ``"capped"`` and ``"estimate"`` stop counting
+    rank_mode : {"ts_rank_cd", "bm25"}, default = "ts_rank_cd"
+        How keyword matches are ranked
+    bm25_candidates : int, default = 1000
+        The number of matches reranked by ``"bm25"``
+
+    Returns
+    -------
+    results : :obj:`SearchPage`
+        The total number of matching documents (see ``SearchPage.count_precision``), the
+        ``Document``s on the requested page, a headline for each of them, and a cursor for
+        the following page
+
+    See Also
+    --------
+    search_results : Fetch only the ``Document``s on a page
+    get_num_results : Fetch only the number of matching documents
+    get_headlines : Fetch only the headlines of some ``Document``s
+    """
+    if not conn:
+        raise Exception("No SQL connection found")
+
+    if count_mode not in COUNT_MODES:
+        raise ValueError(f"Unknown count mode: {count_mode}")
+
+    if rank_mode not in RANK_MODES:
+        raise ValueError(f"Unknown rank mode: {rank_mode}")
+
+    cacheKey: tuple = (
+        query.cache_key(),
+        page,
+        resultsPerPage,
+        max_length,
+        after,
+        count_mode,
+        count_cap,
+        rank_mode,
+        bm25_candidates,
+    )
+    cached: SearchPage = result_cache.get(cacheKey)
+    if cached is not None and not _generation_changed(conn):
+        return cached
+
+    titleQuery = " ".join(query.keywords) if query.keywords else None
+    keywords: str = query.normalized_keywords()
+
+    # documents whose headline is already cached are skipped by `ts_headline`
+    cached_ids: set[str] = (
+        headline_cache.cached_ids(keywords, max_length) if titleQuery else set()
+    )
+
+    if titleQuery:
+        rank: sql.Composable = sql.SQL(
+            "ts_rank_cd(text_search_index.text_vector, websearch_to_tsquery({title}))"
+        ).format(title=sql.Placeholder("title"))
+
+        # most of the work is handled by `ts_headline`:
+        # https://www.postgresql.org/docs/current/textsearch-controls.html
+        headline_source: sql.Composable = sql.SQL(
+            "SELECT content FROM document_text \
+            WHERE document_id = page.id AND {same_year} AND page.id <> ALL({cached_ids})"
+        ).format(same_year=_SAME_YEAR, cached_ids=sql.Placeholder("cached_ids"))
+        headline: sql.Composable = sql.SQL(
+            "ts_headline(page_text.content, websearch_to_tsquery({title}), {options})"
+        ).format(
+            title=sql.Placeholder("title"), options=sql.Placeholder("headline_options")
+        )
+    else:
+        rank: sql.Composable = sql.SQL("0::real")
+
+        # without keywords, the headline is the start of the first page
+        headline_source: sql.Composable = sql.SQL(
+            "SELECT content FROM transcripts \
+            WHERE document_id = page.id AND {same_year} \
+            ORDER BY page_number \
+            LIMIT 1"
+        ).format(same_year=_SAME_YEAR)
+        headline: sql.Composable = sql.SQL(
+            "LEFT(page_text.content, {max_length}) \
+            || CASE WHEN LENGTH(page_text.content) > {max_length} THEN '...' ELSE '' END"
+        ).format(max_length=sql.Placeholder("max_length"))
+
+    if titleQuery and rank_mode == "bm25":
+        # every match is pre-ranked by `ts_rank`, which is cheaper than `bm25_score`; the
+        # candidates carry their vectors so the rerank does not read the index again
+        matchesSQL: sql.Composed = sql.SQL(
+            "SELECT \
+                id, \
+                copyright_year, \
+                studio, \
+                title, \
+                document_type, \
+                bm25_score(text_vector, vector_length, {lexemes}) AS rank \
+            FROM ({candidates}) AS candidates"
+        ).format(
+            lexemes=_QUERY_LEXEMES,
+            candidates=compose_document_query(
+                query,
+                prefix=sql.SQL(
+                    "SELECT id, copyright_year, studio, title, document_type, \
+                    text_search_index.text_vector, text_search_index.vector_length"
+                ),
+                suffix=sql.SQL(
+                    "ORDER BY ts_rank(text_search_index.text_vector, \
+                    websearch_to_tsquery({title})) DESC \
+                    LIMIT {candidates}"
+                ).format(
+                    title=sql.Placeholder("title"),
+                    candidates=sql.Placeholder("bm25_candidates"),
+                ),
+            ),
+        )
+    else:
+        matchesSQL: sql.Composed = compose_document_query(
+            query,
+            prefix=sql.SQL(
+                "SELECT id, copyright_year, studio, title, document_type, {rank} AS rank"
+            ).format(rank=rank),
+            suffix=sql.SQL(""),
+        )
+
+    if after:
+        # seek past the previous page; `rank` is a `real`, so the token's value must be
+        # compared as one too
+        seek: sql.Composable = sql.SQL(
+            "WHERE rank < {rank}::real OR (rank = {rank}::real AND id > {id}) \
+            ORDER BY rank DESC, id \
+            LIMIT {limit}"
+        ).format(
+            rank=sql.Placeholder("after_rank"),
+            id=sql.Placeholder("after_id"),
+            limit=sql.Placeholder("limit"),
+        )
+    else:
+        seek: sql.Composable = sql.SQL(
+            "ORDER BY rank DESC, id \
+            LIMIT {limit} OFFSET {offset}"
+        ).format(
+            limit=sql.Placeholder("limit"),
+            offset=sql.Placeholder("offset"),
+        )
 
-                document.transcripts = cur.fetchall()
+    params: dict = {
+        **document_query_params(query),
+        "cached_ids": sorted(cached_ids),
+        "headline_options": HEADLINE_OPTIONS,
+        "max_length": max_length,
+        "after_rank": after[0] if after else None,
+        "after_id": after[1] if after else None,
+        "limit": resultsPerPage + 1,
+        "offset": resultsPerPage * (page - 1),
+        "count_limit": count_cap + 1,
+        "bm25_candidates": bm25_candidates,
+    }
+
+    results: SearchPage = SearchPage()
+
+    # an exact count shares the matches with the page, while a capped count is separate
+    # so that it can stop early
+    if count_mode == "exact" and titleQuery and rank_mode == "bm25":
+        # only the candidates are in `matches`
+        total: sql.Composable = sql.SQL(
+            "SELECT COUNT(*) AS num_results FROM ({matches}) AS everything"
+        ).format(
+            matches=compose_document_query(
+                query, prefix=sql.SQL("SELECT 1"), suffix=sql.SQL("")
+            )
+        )
+    elif count_mode == "exact":
+        total: sql.Composable = sql.SQL("SELECT COUNT(*) AS num_results FROM matches")
+    elif count_mode == "estimate" and _is_estimable(query):
+        total: sql.Composable = sql.SQL("SELECT NULL::bigint AS num_results")
+    else:
+        total: sql.Composable = _compose_capped_count(query)
+
+    # the outer LEFT JOIN keeps the count even when the requested page is past the last
+    # result; one more result than fits on the page is fetched to tell whether there is
+    # a next page
+    SQLQuery: sql.Composed = sql.SQL(
+        "WITH matches AS ( \
+            {matches} \
+        ), page AS ( \
+            SELECT * FROM matches \
+            {seek} \
+        ) \
+        SELECT \
+            total.num_results, \
+            page.id, \
+            page.copyright_year, \
+            page.studio, \
+            page.title, \
+            page.document_type, \
+            ARRAY(SELECT actor_name FROM has_character WHERE document_id = page.id), \
+            {headline}, \
+            page.rank, \
+            (SELECT last_value FROM data_generation) \
+        FROM ({total}) AS total \
+        LEFT JOIN page ON TRUE \
+        LEFT JOIN LATERAL ({headline_source}) AS page_text ON TRUE \
+        ORDER BY page.rank DESC, page.id;"
+    ).format(
+        matches=matchesSQL,
+        seek=seek,
+        total=total,
+        headline=headline,
+        headline_source=headline_source,
+    )
+
+    try:
+        cur: cursor = None
+        with conn.cursor() as cur:
+            if count_mode == "estimate" and _is_estimable(query):
+                results.num_results = _estimate_num_results(cur, query)
+                results.count_precision = "estimated"
+
+            execute_prepared(
+                cur, SQLQuery, params, f"search_page[{query_shape(query)}]"
+            )
+            rows: list[tuple] = cur.fetchall()
 
         conn.commit()
     except (
@@ -323,13 +1234,82 @@ def search_results(
         psycopg2.errors.InFailedSqlTransaction,
     ) as e:
         print(e)
+        return results
 
-    return documents
+    # forget results computed before the last ingestion
+    if rows:
+        result_cache.set_generation(rows[0][9])
+        headline_cache.set_generation(rows[0][9])
 
+    if rows and rows[0][0] is not None:
+        results.num_results = rows[0][0]
 
-# TODO combine with `search_results` instead of performing 2 queries
-def get_num_results(conn: connection, query: Query):
-    """Fetch the number of results for a given query.
+        if count_mode != "exact" and results.num_results > count_cap:
+            results.num_results = count_cap
+            results.count_precision = "capped"
+
+    # the extra result only shows that there is a next page
+    hasNextPage: bool = len(rows) > resultsPerPage
+    extraRow: tuple = rows[resultsPerPage] if hasNextPage else None
+    rows = rows[:resultsPerPage]
+
+    uncached: list[Document] = []
+    for row in rows:
+        # a row without an id only carries the count (the page is empty)
+        if row[1] is None:
+            continue
+
+        document: Document = Document(
+            id=row[1],
+            copyright_year=row[2],
+            studio=row[3],
+            title=row[4],
+            document_type=row[5],
+            actors=list(row[6]) if row[6] else [],
+        )
+        results.documents.append(document)
+
+        if not titleQuery:
+            results.headlines[document.id] = row[7] if row[7] else ""
+            continue
+
+        headline: str = headline_cache.get((document.id, keywords, max_length))
+        if headline is not None:
+            results.headlines[document.id] = headline
+        elif document.id in cached_ids:
+            # expired (or invalidated) since the statement was built
+            uncached.append(document)
+        else:
+            results.headlines[document.id] = row[7] if row[7] else ""
+            headline_cache.put(
+                (document.id, keywords, max_length), results.headlines[document.id]
+            )
+
+    # the headline of the extra result is kept for when the next page is requested
+    if hasNextPage and titleQuery and extraRow[7] is not None:
+        if extraRow[1] not in cached_ids:
+            headline_cache.put((extraRow[1], keywords, max_length), extraRow[7])
+
+    if uncached:
+        results.headlines.update(get_headlines(conn, uncached, query, max_length))
+
+    if hasNextPage:
+        results.next_cursor = encode_search_cursor(rows[-1][8], rows[-1][1])
+
+    result_cache.put(cacheKey, results)
+
+    return results
+
+
+# the facets returned by `get_facets`, in the order of the columns passed to `GROUPING`
+FACETS: tuple[str, ...] = ("genre", "studio", "copyright_year", "reel_count")
+
+
+def get_facets(conn: connection, query: Query) -> dict[str, dict]:
+    """Count the documents matching a query by genre, studio, copyright year and reel count.
+
+    Every histogram is produced by a single ``GROUPING SETS`` statement, and the result is
+    kept in ``result_cache`` under the canonical form of ``query``.
 
     Parameters
     ----------
@@ -340,22 +1320,680 @@ def get_num_results(conn: connection, query: Query):
 
     Returns
     -------
-    count : int
-        The number of relevant results
+    facets : dict[str, dict]
+        For each name in ``FACETS``, the number of matching documents with each value
+        (documents without a value are not counted), ordered by value
+
+    Examples
+    --------
+    >>> get_facets(conn, Query(keywords=["comedy"]))
+    {
+        "genre": {"comedy": 12, "drama": 3},
+        "studio": {"Fox": 7, "MGM": 8},
+        "copyright_year": {1920: 9, 1921: 6},
+        "reel_count": {1: 4, 2: 11},
+    }
+    """
+    if not conn:
+        raise Exception("No SQL connection found")
+
+    cacheKey: tuple = ("facets", query.cache_key())
+    cached: dict[str, dict] = result_cache.get(cacheKey)
+    if cached is not None and not _generation_changed(conn):
+        return cached
+
+    # a document has one row per genre, so the other facets count distinct ids
+    SQLQuery: sql.Composed = sql.SQL(
+        "WITH matches AS ( \
+            {matches} \
+        ) \
+        SELECT \
+            GROUPING(genre, studio, copyright_year, reel_count), \
+            genre, \
+            studio, \
+            copyright_year, \
+            reel_count, \
+            COUNT(DISTINCT matches.id) \
+        FROM matches LEFT JOIN has_genre ON has_genre.document_id = matches.id \
+        GROUP BY GROUPING SETS ((genre), (studio), (copyright_year), (reel_count)) \
+        ORDER BY 1, 2, 3, 4, 5;"
+    ).format(
+        matches=compose_document_query(
+            query,
+            prefix=sql.SQL("SELECT id, studio, copyright_year, reel_count"),
+            suffix=sql.SQL(""),
+        )
+    )
+
+    facets: dict[str, dict] = {facet: {} for facet in FACETS}
+
+    try:
+        cur: cursor = None
+        with conn.cursor() as cur:
+            execute_prepared(
+                cur,
+                SQLQuery,
+                document_query_params(query),
+                f"get_facets[{query_shape(query)}]",
+            )
+            rows: list[tuple] = cur.fetchall()
+
+        conn.commit()
+    except psycopg2.errors.ObjectNotInPrerequisiteState as e:
+        print(e)
+        return facets
+
+    # `GROUPING` sets a bit for every column that is *not* grouped, so the only clear
+    # bit identifies the facet of a row
+    groupings: dict[int, int] = {
+        (2 ** len(FACETS) - 1) ^ (1 << (len(FACETS) - 1 - i)): i
+        for i in range(len(FACETS))
+    }
+
+    for row in rows:
+        index: int = groupings[row[0]]
+        value = row[1 + index]
+
+        if value is not None:
+            facets[FACETS[index]][value] = row[-1]
+
+    result_cache.put(cacheKey, facets)
+
+    return facets
+
+
+# the values offered by `autocomplete` for each field, and the column they are read from
+AUTOCOMPLETE_SOURCES: dict[str, tuple[str, str]] = {
+    "actor": ("actors", "name"),
+    "genre": ("genres", "genre"),
+    "studio": ("documents", "studio"),
+    "title": ("documents", "title"),
+}
+
+# prefix indexes of the values of each field, rebuilt when the data generation changes
+_autocomplete_indexes: dict[str, PrefixIndex] = {}
+_autocomplete_lock: Lock = Lock()
+
+
+def build_autocomplete_indexes(conn: connection):
+    """Read every autocomplete value from the database into in-memory prefix indexes.
+
+    Only the small entity tables and ``documents`` are read; ``has_character`` is not.
+
+    Parameters
+    ----------
+    conn : :obj:`psycopg2.extensions.connection`
+        A ``psycopg2`` connection to perform queries with
+    """
+    global _autocomplete_indexes
+
+    if not conn:
+        raise Exception("No SQL connection found")
+
+    indexes: dict[str, PrefixIndex] = {}
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT last_value FROM data_generation;")
+        row: tuple = cur.fetchone()
+        generation: int = row[0] if row else None
+
+        for field, (table, column) in AUTOCOMPLETE_SOURCES.items():
+            cur.execute(
+                sql.SQL("SELECT DISTINCT {column} FROM {table};").format(
+                    column=sql.Identifier(column), table=sql.Identifier(table)
+                )
+            )
+            indexes[field] = PrefixIndex(
+                (value for (value,) in cur.fetchall()), generation
+            )
+
+    conn.commit()
+
+    _autocomplete_indexes = indexes
+
+
+def autocomplete(
+    conn: connection, field: str, prefix: str, limit: int = 10
+) -> list[str]:
+    """Suggest stored values of a field which start with (or resemble) what a user typed.
+
+    Suggestions come from in-memory prefix indexes, which are built on first use and
+    rebuilt when the data generation changes. Only when nothing starts with ``prefix`` is
+    the database asked for similar values with ``pg_trgm``.
+
+    Parameters
+    ----------
+    conn : :obj:`psycopg2.extensions.connection`
+        A ``psycopg2`` connection to perform queries with
+    field : {"actor", "genre", "studio", "title"}
+        The kind of value to suggest
+    prefix : str
+        The text typed so far; any word of a value may start with it
+    limit : int, default = 10
+        The maximum number of suggestions
+
+    Returns
+    -------
+    suggestions : list[str]
+        The stored spellings of the matching values, best matches first
+    """
+    if not conn:
+        raise Exception("No SQL connection found")
+
+    if field not in AUTOCOMPLETE_SOURCES:
+        raise ValueError(f"Unknown autocomplete field: {field}")
+
+    if not prefix.strip():
+        return []
+
+    # `_generation_changed` keeps `result_cache.generation` current
+    _generation_changed(conn)
+    with _autocomplete_lock:
+        if field not in _autocomplete_indexes or (
+            result_cache.generation is not None
+            and _autocomplete_indexes[field].generation != result_cache.generation
+        ):
+            build_autocomplete_indexes(conn)
+
+    suggestions: list[str] = _autocomplete_indexes[field].search(prefix, limit)
+    if suggestions:
+        return suggestions
+
+    # fall back to fuzzy matching, e.g. for misspellings; `<%` is `pg_trgm`'s word
+    # similarity operator (`%%` escapes the `%`)
+    table, column = AUTOCOMPLETE_SOURCES[field]
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                sql.SQL(
+                    "SELECT {column} \
+                    FROM {table} \
+                    WHERE %(prefix)s <%% {column} \
+                    GROUP BY {column} \
+                    ORDER BY word_similarity(%(prefix)s, {column}) DESC, {column} \
+                    LIMIT %(limit)s;"
+                ).format(column=sql.Identifier(column), table=sql.Identifier(table)),
+                {"prefix": prefix, "limit": limit},
+            )
+            suggestions = [value for (value,) in cur.fetchall()]
+
+        conn.commit()
+    except psycopg2.errors.UndefinedFunction as e:
+        # `pg_trgm` is not installed
+        print(e)
+        conn.rollback()
+
+    return suggestions
+
+
+# the spelling index of `term_dictionary`, rebuilt when the data generation changes
+_spelling_index: SpellingIndex | None = None
+_spelling_lock: Lock = Lock()
+
+
+def build_spelling_index(conn: connection, min_count: int | None = None):
+    """Read the term dictionary into an in-memory spelling index.
+
+    Parameters
+    ----------
+    conn : :obj:`psycopg2.extensions.connection`
+        A ``psycopg2`` connection to perform queries with
+    min_count : int, optional
+        The fewest documents a word must appear in to be indexed, since most words seen
+        only once are OCR noise; defaults to the app's ``SPELLING_MIN_COUNT``, or 2
+    """
+    global _spelling_index
+
+    if not conn:
+        raise Exception("No SQL connection found")
+
+    if min_count is None:
+        min_count = (
+            current_app.config.get("SPELLING_MIN_COUNT", 2) if has_app_context() else 2
+        )
+
+    words: list[tuple[str, int]] = []
+    generation: int = None
+    try:
+        cur: cursor = None
+        with conn.cursor() as cur:
+            cur.execute("SELECT last_value FROM data_generation;")
+            row: tuple = cur.fetchone()
+            generation = row[0] if row else None
+
+            cur.execute(
+                "SELECT word, document_count FROM term_dictionary \
+                WHERE document_count >= %s;",
+                [min_count],
+            )
+            words = cur.fetchall()
+
+        conn.commit()
+    except psycopg2.errors.UndefinedTable as e:
+        # the database predates the term dictionary; suggest nothing until it is migrated
+        print(e)
+        conn.rollback()
+
+    _spelling_index = SpellingIndex(words, generation=generation, min_count=min_count)
+
+
+def suggest_keywords(conn: connection, query: Query) -> list[str] | None:
+    """Suggest a respelling of a query's keywords, e.g. for a search without results.
+
+    Suggestions come from an in-memory index of the term dictionary. The database is only
+    read to build the index, when it is first used or the data generation has changed, so
+    a lookup makes no round trips.
+
+    Parameters
+    ----------
+    conn : :obj:`psycopg2.extensions.connection`
+        A ``psycopg2`` connection to (re)build the index with
+    query : :obj:`Query`
+        The query whose keywords are respelled
+
+    Returns
+    -------
+    keywords : list[str]
+        The keywords with each misspelled word replaced by its most frequent close spelling,
+        or ``None`` if every word is already known or has no close spelling
+    """
+    if not query.keywords:
+        return None
+
+    # `result_cache.generation` is kept current by the search that preceded this
+    with _spelling_lock:
+        if _spelling_index is None or (
+            result_cache.generation is not None
+            and _spelling_index.generation != result_cache.generation
+        ):
+            build_spelling_index(conn)
+
+    return _spelling_index.suggest(query.keywords)
+
+
+# the backends `create_app` can answer searches with (see `memory_search_page`)
+SEARCH_BACKENDS: tuple[str, ...] = ("postgres", "memory")
+
+# the index searched by `memory_search_page`, rebuilt when the data generation changes
+_search_index: InvertedIndex = None
+_search_index_lock: Lock = Lock()
+
+# keyword string -> `parse_tsquery` of its `websearch_to_tsquery`
+_tsquery_cache: LRUCache = LRUCache(maxsize=4096)
+
+
+def build_search_index(conn: connection):
+    """Read every searchable document into the in-memory index used by
+    ``memory_search_page``.
+
+    The index is built from the tables ``uploadData.py`` fills: ``documents``, the
+    vectors in ``text_search_index``, ``has_character``, and ``has_genre``.
+
+    Parameters
+    ----------
+    conn : :obj:`psycopg2.extensions.connection`
+        A ``psycopg2`` connection to perform queries with
+    """
+    global _search_index
+
+    if not conn:
+        raise Exception("No SQL connection found")
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT last_value FROM data_generation;")
+        row: tuple = cur.fetchone()
+        generation: int = row[0] if row else None
+
+        cur.execute(
+            "SELECT id, copyright_year, reel_count, studio, uploaded_time \
+            FROM documents INNER JOIN text_search_index ON id = document_id;"
+        )
+        documents: list[tuple] = cur.fetchall()
+
+        # one row per lexeme rather than per (document, lexeme)
+        cur.execute(
+            "SELECT \
+                lexeme, \
+                array_agg(document_id), \
+                array_agg(COALESCE(cardinality(positions), 1)) \
+            FROM text_search_index, unnest(text_vector) \
+            GROUP BY lexeme;"
+        )
+        postings: dict = {
+            lexeme: (ids, counts) for lexeme, ids, counts in cur.fetchall()
+        }
+
+        cur.execute(
+            "SELECT actor_name, array_agg(document_id) FROM has_character GROUP BY actor_name;"
+        )
+        actors: dict = dict(cur.fetchall())
+
+        cur.execute(
+            "SELECT genre, array_agg(document_id) FROM has_genre GROUP BY genre;"
+        )
+        genres: dict = dict(cur.fetchall())
+
+    conn.commit()
+
+    _search_index = InvertedIndex(documents, postings, actors, genres, generation)
+
+    # results cached from older data must not be mixed with the new index
+    result_cache.set_generation(generation)
+    headline_cache.set_generation(generation)
+
+
+def _parse_keywords(conn: connection, titleQuery: str) -> tuple | None:
+    """``parse_tsquery`` of ``websearch_to_tsquery(titleQuery)``.
+
+    PostgreSQL parses the keywords so that stemming and stop words match
+    ``compose_document_query`` exactly; no table is read, and the result is cached.
+    """
+    # entries are wrapped in a tuple, since a query without lexemes parses to `None`
+    cached: tuple = _tsquery_cache.get(titleQuery)
+    if cached is not None:
+        return cached[0]
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT websearch_to_tsquery(%s)::text;", (titleQuery,))
+        row: tuple = cur.fetchone()
+
+    conn.commit()
+
+    tree: tuple = parse_tsquery(row[0]) if row and row[0] else None
+    _tsquery_cache.put(titleQuery, (tree,))
+    return tree
+
+
+def memory_search_page(
+    conn: connection,
+    query: Query,
+    page: int = 1,
+    resultsPerPage: int = 50,
+    max_length: int = 400,
+    after: tuple[float, str] | None = None,
+    rank_mode: str = "ts_rank_cd",
+) -> SearchPage:
+    """Return a page of search results from the in-memory index.
+
+    Matching, ranking (by BM25), counting, and paging all happen in this process, so
+    the database is only asked for the ``Document``s and headlines on the requested page
+    (and, once per keyword string, to parse the keywords). The count is always exact.
+
+    The index holds no term positions, so it can only rank keyword matches by BM25. Keyword
+    searches with any other ``rank_mode``, and phrase searches, are passed to
+    ``search_page``, so that switching backends never changes which documents are on a
+    page. With ``"bm25"``, results are in the order of ``search_page``'s ``"bm25"`` mode
+    when every match is one of its ``bm25_candidates``. Without keywords, results are
+    ordered by id with either backend.
+
+    Parameters
+    ----------
+    conn : :obj:`psycopg2.extensions.connection`
+        A ``psycopg2`` connection to perform queries with
+    query : :obj:`Query`
+        A ``Query`` object specifying the search parameters
+    page : int, default = 1
+        The index of the page of results to return
+    resultsPerPage : int, default = 50
+        The number of results displayed on each page
+    max_length : int, default = 400
+        The maximum length of a headline when ``query`` has no keywords
+    after : tuple[float, str], default = None
+        The ``(rank, id)`` of the last result on the previous page (see
+        ``decode_search_cursor``)
+    rank_mode : {"ts_rank_cd", "bm25"}, default = "ts_rank_cd"
+        How keyword matches are ranked (see ``search_page``)
+
+    Returns
+    -------
+    results : :obj:`SearchPage`
+        The number of matching documents, the ``Document``s on the requested page, a
+        headline for each of them, and a cursor for the following page
+
+    See Also
+    --------
+    build_search_index : Build the index searched by this function
+    search_page : Search with PostgreSQL full-text search
+    """
+    if not conn:
+        raise Exception("No SQL connection found")
+
+    if rank_mode not in RANK_MODES:
+        raise ValueError(f"Unknown rank mode: {rank_mode}")
+
+    if query.keywords and rank_mode != "bm25":
+        return search_page(
+            conn, query, page, resultsPerPage, max_length, after, rank_mode=rank_mode
+        )
+
+    cacheKey: tuple = (
+        "memory",
+        query.cache_key(),
+        page,
+        resultsPerPage,
+        max_length,
+        after,
+    )
+    cached: SearchPage = result_cache.get(cacheKey)
+    if cached is not None and not _generation_changed(conn):
+        return cached
+
+    # `_generation_changed` keeps `result_cache.generation` current
+    _generation_changed(conn)
+    with _search_index_lock:
+        if _search_index is None or (
+            result_cache.generation is not None
+            and _search_index.generation != result_cache.generation
+        ):
+            build_search_index(conn)
+
+    titleQuery = " ".join(query.keywords) if query.keywords else None
+
+    try:
+        numbers, scores = _search_index.search(
+            query, _parse_keywords(conn, titleQuery) if titleQuery else None
+        )
+    except UnsupportedQuery:
+        return search_page(
+            conn, query, page, resultsPerPage, max_length, after, rank_mode=rank_mode
+        )
+
+    results: SearchPage = SearchPage(num_results=len(numbers))
+
+    if after:
+        # scores are `float32`, like the `real` ranks of `search_page`
+        afterRank: np.float32 = np.float32(after[0])
+        remaining: np.ndarray = (scores < afterRank) | (
+            (scores == afterRank) & (_search_index.ids[numbers] > after[1])
+        )
+        numbers, scores = numbers[remaining], scores[remaining]
+    else:
+        offset: int = resultsPerPage * (page - 1)
+        numbers, scores = numbers[offset:], scores[offset:]
+
+    # one more result than fits on the page shows whether there is a next page
+    hasNextPage: bool = len(numbers) > resultsPerPage
+    pageIds: list[str] = [
+        str(doc_id) for doc_id in _search_index.ids[numbers[:resultsPerPage]]
+    ]
+
+    if pageIds:
+        documents: dict[str, Document] = {
+            document.id: document for document in get_documents(conn, pageIds)
+        }
+        results.documents = [
+            documents[doc_id] for doc_id in pageIds if doc_id in documents
+        ]
+        results.headlines = get_headlines(conn, results.documents, query, max_length)
+
+    if hasNextPage:
+        results.next_cursor = encode_search_cursor(
+            float(scores[resultsPerPage - 1]), pageIds[-1]
+        )
+
+    result_cache.put(cacheKey, results)
+
+    return results
+
+
+def _hydrate_search_results(cur: cursor, documents: list[Document]):
+    """Attach actor names and transcripts to a page of search results.
+
+    Each relation is fetched for the whole page with one query, so the number of round
+    trips does not depend on the number of ``documents``.
+
+    Parameters
+    ----------
+    cur : :obj:`psycopg2.extensions.cursor`
+        The cursor upon which the queries will be executed
+    documents : list[Document]
+        The ``Document``s to hydrate, modified in-place
+    """
+    if not documents:
+        return
+
+    documents_by_id: dict[str, Document] = {}
+    for document in documents:
+        document.actors = []
+        document.transcripts = []
+        documents_by_id[document.id] = document
+
+    ids: list[str] = list(documents_by_id.keys())
+
+    cur.execute(
+        "SELECT document_id, actor_name \
+        FROM has_character \
+        WHERE document_id = ANY(%s);",
+        [ids],
+    )
+
+    for document_id, actor_name in cur.fetchall():
+        documents_by_id[document_id].actors.append(actor_name)
+
+    cur.execute(
+        "SELECT document_id, page_number, content \
+        FROM transcripts \
+        WHERE document_id = ANY(%s) \
+        ORDER BY document_id, page_number;",
+        [ids],
+    )
+
+    for document_id, page_number, content in cur.fetchall():
+        documents_by_id[document_id].transcripts.append((page_number, content))
+
+
+def search_results(
+    conn: connection, query: Query, page: int = 1, resultsPerPage: int = 50
+) -> list[Document]:
+    """Return a page of search results.
+
+    Parameters
+    ----------
+    conn : :obj:`psycopg2.extensions.connection`
+        A ``psycopg2`` connection to perform queries with
+    page : int, default = 1
+        The index of the page of results to return
+    query : :obj:`Query`
+        A ``Query`` object specifying the search parameters
+    resultsPerPage : int, default = 50
+        The number of results displayed on each page
+
+    Returns
+    -------
+    results : list[Document]
+        A list of ``Document``s
+
+    See Also
+    --------
+    formatDocument : The function used to format returned ``Document``s
     """
-    count: int = 0
     if not conn:
+        # TODO make this exception more specific
         raise Exception("No SQL connection found")
 
+    documents: list = []
+
     try:
         cur: cursor = None
         with conn.cursor() as cur:
+            # gather only the attributes needed for the results page
+
             execute_document_query(
                 cur,
                 query,
-                prefix=sql.SQL("SELECT COUNT(*)"),
+                suffix=sql.SQL("LIMIT {limit}\nOFFSET {offset};").format(
+                    limit=sql.Placeholder("limit"), offset=sql.Placeholder("offset")
+                ),
+                rankPages=True,
+                params={
+                    "limit": resultsPerPage,
+                    "offset": resultsPerPage * (page - 1),
+                },
+                label="search_results",
             )
 
+            documents: list[Document] = [
+                Document(
+                    id=documentQuery[0],
+                    studio=documentQuery[2],
+                    title=documentQuery[3],
+                    copyright_year=documentQuery[1],
+                    document_type=documentQuery[4],
+                )
+                for documentQuery in cur.fetchall()
+            ]
+
+            _hydrate_search_results(cur, documents)
+
+        conn.commit()
+    except (
+        psycopg2.errors.ObjectNotInPrerequisiteState,
+        psycopg2.errors.InFailedSqlTransaction,
+    ) as e:
+        print(e)
+
+    return documents
+
+
+def get_num_results(conn: connection, query: Query, cap: int | None = None):
+    """Fetch the number of results for a given query.
+
+    Parameters
+    ----------
+    conn : :obj:`psycopg2.extensions.connection`
+        A ``psycopg2`` connection to perform queries with
+    query : :obj:`Query`
+        A ``Query`` object specifying the search parameters
+    cap : int, default = None
+        If given, counting stops after ``cap + 1`` results
+
+    Returns
+    -------
+    count : int
+        The number of relevant results, or ``cap + 1`` if there are more than ``cap``
+    """
+    count: int = 0
+    if not conn:
+        raise Exception("No SQL connection found")
+
+    try:
+        cur: cursor = None
+        with conn.cursor() as cur:
+            if cap is None:
+                execute_document_query(
+                    cur,
+                    query,
+                    prefix=sql.SQL("SELECT COUNT(*)"),
+                    label="get_num_results",
+                )
+            else:
+                execute_prepared(
+                    cur,
+                    _compose_capped_count(query),
+                    {**document_query_params(query), "count_limit": cap + 1},
+                    f"get_num_results_capped[{query_shape(query)}]",
+                )
+
             result: tuple = cur.fetchone()
 
         # set `count` to the number of results if any exist, otherwise 0
@@ -396,6 +2034,7 @@ def get_search_result_ids(conn: connection, query: Query) -> list[str]:
                 cur,
                 query,
                 prefix=sql.SQL("SELECT id"),
+                label="get_search_result_ids",
             )
 
             result: tuple = cur.fetchall()
@@ -411,6 +2050,222 @@ def get_search_result_ids(conn: connection, query: Query) -> list[str]:
     return ids
 
 
+def stream_search(
+    conn: connection,
+    query: Query,
+    limit: int | None = None,
+    batch_size: int = 50,
+    max_length: int = 400,
+) -> Iterator[tuple[str, object]]:
+    """Lazily produce every result of a query, in rank order, a batch at a time.
+
+    Results are read through a server-side (named) cursor, so each batch is fetched,
+    hydrated and handed to the caller before the next one is read from the database.
+
+    Parameters
+    ----------
+    conn : :obj:`psycopg2.extensions.connection`
+        A ``psycopg2`` connection to perform queries with
+    query : :obj:`Query`
+        A ``Query`` object specifying the search parameters
+    limit : int, default = None
+        The maximum number of results (``None`` for every result)
+    batch_size : int, default = 50
+        The number of results fetched from the cursor at once
+    max_length : int, default = 400
+        The maximum length of each headline
+
+    Yields
+    ------
+    event : tuple[str, object]
+        First ``("count", int)``, the total number of results; then, for each batch,
+        ``("documents", list[Document])`` with actors and transcripts attached, followed by
+        ``("headlines", dict[str, str])`` for those documents
+    """
+    if not conn:
+        raise Exception("No SQL connection found")
+
+    yield "count", get_num_results(conn, query)
+
+    SQLQuery: sql.Composed = compose_document_query(
+        query,
+        suffix=sql.SQL("LIMIT {limit};").format(limit=sql.Placeholder("limit")),
+        rankPages=True,
+    )
+
+    try:
+        # a named cursor is declared on the server, which only sends each batch when
+        # it is fetched; it closes when the transaction ends, including if the caller
+        # stops iterating and the connection is returned to the pool
+        with conn.cursor(name="stream_search") as named:
+            named.itersize = batch_size
+            # `LIMIT NULL` does not limit
+            named.execute(SQLQuery, {**document_query_params(query), "limit": limit})
+
+            while True:
+                rows: list[tuple] = named.fetchmany(batch_size)
+                if not rows:
+                    break
+
+                documents: list[Document] = [
+                    Document(
+                        id=row[0],
+                        studio=row[2],
+                        title=row[3],
+                        copyright_year=row[1],
+                        document_type=row[4],
+                    )
+                    for row in rows
+                ]
+
+                with conn.cursor() as cur:
+                    _hydrate_search_results(cur, documents)
+
+                yield "documents", documents
+                yield "headlines", get_headlines(conn, documents, query, max_length)
+
+        conn.commit()
+    except psycopg2.errors.ObjectNotInPrerequisiteState as e:
+        print(e)
+
+
+def search_page_hits(
+    conn: connection,
+    query: Query,
+    doc_ids: list[str] | None = None,
+    per_document: int | None = None,
+    limit: int = 50,
+) -> list[tuple[str, int, float]]:
+    """Return the individual transcript pages matching the keywords of a query, best first.
+
+    Pages are matched and ranked with the GIN-indexed ``transcripts.text_index_col``, so
+    every keyword must appear on the same page. Only pages of documents matching all of
+    ``query``'s filters are returned; given ``doc_ids``, only the keywords and year range
+    are checked, since the ids are expected to come from a search with ``query``.
+
+    Hits are kept in ``result_cache`` alongside the pages of results they annotate.
+
+    Parameters
+    ----------
+    conn : :obj:`psycopg2.extensions.connection`
+        A ``psycopg2`` connection to perform queries with
+    query : :obj:`Query`
+        A ``Query`` object specifying the search parameters
+    doc_ids : list[str], default = None
+        Only return pages of these documents (``None`` for any document)
+    per_document : int, default = None
+        The maximum number of pages returned for each document (``None`` for no limit)
+    limit : int, default = 50
+        The maximum number of pages returned (``None`` for no limit)
+
+    Returns
+    -------
+    hits : list[tuple[str, int, float]]
+        The ``(document_id, page_number, rank)`` of each matching page
+    """
+    if not conn:
+        raise Exception("No SQL connection found")
+
+    if not query.keywords:
+        return []
+
+    cleanedIds: list[str] | None = (
+        sorted(doc_id.lower() for doc_id in doc_ids) if doc_ids is not None else None
+    )
+    cacheKey: tuple = (
+        "page_hits",
+        query.cache_key(),
+        tuple(cleanedIds) if cleanedIds is not None else None,
+        per_document,
+        limit,
+    )
+    cached: list[tuple[str, int, float]] = result_cache.get(cacheKey)
+    if cached is not None and not _generation_changed(conn):
+        return cached
+
+    # `text_index_col` is generated with the english configuration, so the query must be too
+    filters: list[sql.Composable] = [
+        sql.SQL("text_index_col @@ websearch_to_tsquery('english', {title})").format(
+            title=sql.Placeholder("title")
+        ),
+    ]
+
+    if cleanedIds is not None:
+        # the ids already come from a search (or a single document), so matching them
+        # against the whole corpus again would only repeat that work
+        filters.append(
+            sql.SQL("document_id = ANY({})").format(sql.Placeholder("doc_ids"))
+        )
+    else:
+        filters.append(
+            sql.SQL("document_id IN ({documents})").format(
+                documents=compose_document_query(
+                    query, prefix=sql.SQL("SELECT id"), suffix=sql.SQL("")
+                )
+            )
+        )
+
+    # skip the transcript partitions of other years
+    if query.copyright_year_range[0] is not None:
+        filters.append(
+            sql.SQL("document_year >= {}").format(sql.Placeholder("year_min"))
+        )
+    if query.copyright_year_range[1] is not None:
+        filters.append(
+            sql.SQL("document_year <= {}").format(sql.Placeholder("year_max"))
+        )
+
+    SQLQuery: sql.Composed = sql.SQL(
+        "SELECT document_id, page_number, rank \
+        FROM ( \
+            SELECT \
+                document_id, \
+                page_number, \
+                ts_rank_cd(text_index_col, websearch_to_tsquery('english', {title})) AS rank, \
+                ROW_NUMBER() OVER ( \
+                    PARTITION BY document_id \
+                    ORDER BY ts_rank_cd( \
+                        text_index_col, websearch_to_tsquery('english', {title}) \
+                    ) DESC, page_number \
+                ) AS position \
+            FROM transcripts \
+            WHERE {filters} \
+        ) AS hits \
+        WHERE {per_document}::integer IS NULL OR position <= {per_document} \
+        ORDER BY rank DESC, document_id, page_number \
+        LIMIT {limit};"
+    ).format(
+        title=sql.Placeholder("title"),
+        filters=sql.SQL(" AND ").join(filters),
+        per_document=sql.Placeholder("per_document"),
+        limit=sql.Placeholder("limit"),
+    )
+
+    params: dict = {
+        **document_query_params(query),
+        "doc_ids": cleanedIds or [],
+        "per_document": per_document,
+        "limit": limit,
+    }
+
+    name: str = (
+        "page_hits[ids]"
+        if cleanedIds is not None
+        else f"page_hits[{query_shape(query)}]"
+    )
+    with conn.cursor() as cur:
+        execute_prepared(cur, SQLQuery, params, name)
+        hits: list[tuple[str, int, float]] = [
+            (doc_id, page_number, rank) for doc_id, page_number, rank in cur.fetchall()
+        ]
+
+    conn.commit()
+
+    result_cache.put(cacheKey, hits)
+
+    return hits
+
+
 def get_headlines(
     conn: connection, documents: list[Document], query: Query, max_length: int = 400
 ) -> dict[str, str]:
@@ -441,21 +2296,43 @@ def get_headlines(
     titleQuery = " ".join(query.keywords) if query.keywords else None
 
     if titleQuery:
-        with conn.cursor() as cur:
-            # most of the work is handled by `ts_headline`:
-            # https://www.postgresql.org/docs/current/textsearch-controls.html
-            cur.execute(
-                "SELECT document_id, ts_headline( \
-                    content, \
-                    websearch_to_tsquery(%s), \
-                    'MaxFragments=3, MaxWords=40, MinWords=20, FragmentDelimiter=...<br><br>...' \
-                ) \
-                FROM text_content_view \
-                WHERE document_id IN %s;",
-                (titleQuery, tuple(doc.id for doc in documents)),
-            )
+        keywords: str = query.normalized_keywords()
+        headlines: dict[str, str] = {}
+
+        missing_ids: list[str] = []
+        for doc in documents:
+            headline: str = headline_cache.get((doc.id, keywords, max_length))
+            if headline is None:
+                missing_ids.append(doc.id)
+            else:
+                headlines[doc.id] = headline
+
+        if missing_ids:
+            # when every year is known, only the partitions of those years are read
+            years: list[int] | None = [doc.copyright_year for doc in documents]
+            if None in years:
+                years = None
+
+            with conn.cursor() as cur:
+                # most of the work is handled by `ts_headline`:
+                # https://www.postgresql.org/docs/current/textsearch-controls.html
+                cur.execute(
+                    "SELECT document_id, ts_headline( \
+                        content, \
+                        websearch_to_tsquery(%s), \
+                        %s \
+                    ) \
+                    FROM document_text \
+                    WHERE document_id IN %s \
+                    AND (%s::integer[] IS NULL OR document_year = ANY(%s::integer[]));",
+                    (titleQuery, HEADLINE_OPTIONS, tuple(missing_ids), years, years),
+                )
 
-            return dict(cur.fetchall())
+                for doc_id, headline in cur.fetchall():
+                    headline_cache.put((doc_id, keywords, max_length), headline)
+                    headlines[doc_id] = headline
+
+        return headlines
     else:
         return dict(
             (
@@ -936,7 +2813,193 @@ def clear_view_history(conn: connection, user_name: str):
     conn.commit()
 
 
-def get_documents(conn: connection, doc_ids: list[str]) -> str:
+class _TranscriptBatch:
+    """Reads the transcripts of documents returned together, the first time any is read"""
+
+    __slots__ = ("conn", "documents")
+
+    def __init__(self, conn: connection, documents: list[Document] = ()):
+        self.conn = conn
+        self.documents = documents
+
+    def __call__(self, document: Document):
+        # within a request, documents (e.g. cached ones) may outlive the connection which
+        # fetched them, so the request's own connection is used
+        load_transcripts(
+            get_db_connection() if has_app_context() else self.conn,
+            [doc for doc in self.documents if not doc.transcripts_loaded] or [document],
+        )
+
+    def __getstate__(self) -> tuple:
+        # connections cannot be pickled (e.g. by ``SQLiteCache``)
+        return None, {"conn": None, "documents": self.documents}
+
+
+def load_transcripts(conn: connection, documents: list[Document]):
+    """Read the transcripts of some documents with one query.
+
+    Documents returned by ``get_documents`` read their transcripts on first access; callers
+    which know they need the text of many documents can read it up front instead.
+
+    Parameters
+    ----------
+    conn : :obj:`psycopg2.extensions.connection`
+        A ``psycopg2`` connection to perform queries with
+    documents : list[Document]
+        The ``Document``s whose ``transcripts`` are set, modified in-place
+    """
+    if not conn:
+        raise Exception("No SQL connection found")
+
+    pending: dict[str, Document] = {
+        document.id: document
+        for document in documents
+        if not document.transcripts_loaded
+    }
+    if not pending:
+        return
+
+    transcripts: dict[str, list[tuple[int, str]]] = {doc_id: [] for doc_id in pending}
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT document_id, page_number, content \
+            FROM transcripts \
+            WHERE document_id = ANY(%s) \
+            ORDER BY document_id, page_number;",
+            [list(pending)],
+        )
+
+        for document_id, page_number, content in cur.fetchall():
+            transcripts[document_id].append((page_number, content))
+
+    conn.commit()
+
+    for doc_id, document in pending.items():
+        document.transcripts = transcripts[doc_id]
+
+
+# how `get_documents` reads the relations of each document: with one statement aggregating
+# them into JSON, or with one query per relation
+HYDRATION_MODES: tuple[str, ...] = ("statement", "queries")
+
+
+# every document with `id` in `%(ids)s`, with each relation aggregated by a LATERAL
+# subquery (which always returns one row) into a `json` column that psycopg2 decodes into
+# lists; transcripts are only read if `%(transcripts)s`, otherwise the planner skips them
+_HYDRATED_DOCUMENTS: str = (
+    "SELECT \
+        id, \
+        copyright_year, \
+        studio, \
+        title, \
+        reel_count, \
+        document_type, \
+        uploaded_by, \
+        uploaded_time, \
+        transcripts.pages, \
+        characters.actors, \
+        genres.genres, \
+        locations.locations, \
+        flags.flags \
+    FROM documents \
+    CROSS JOIN LATERAL ( \
+        SELECT COALESCE( \
+            json_agg(json_build_array(page_number, content) ORDER BY page_number), \
+            '[]' \
+        ) AS pages \
+        FROM transcripts \
+        WHERE %(transcripts)s AND document_id = documents.id \
+    ) AS transcripts \
+    CROSS JOIN LATERAL ( \
+        SELECT COALESCE(json_agg(json_build_object( \
+            'actor_name', actor_name, \
+            'character_name', character_name, \
+            'character_description', character_description \
+        )), '[]') AS actors \
+        FROM has_character WHERE document_id = documents.id \
+    ) AS characters \
+    CROSS JOIN LATERAL ( \
+        SELECT COALESCE(json_agg(genre), '[]') AS genres \
+        FROM has_genre WHERE document_id = documents.id \
+    ) AS genres \
+    CROSS JOIN LATERAL ( \
+        SELECT COALESCE(json_agg(json_build_object( \
+            'name', location, \
+            'description', description \
+        )), '[]') AS locations \
+        FROM has_location WHERE document_id = documents.id \
+    ) AS locations \
+    CROSS JOIN LATERAL ( \
+        SELECT COALESCE( \
+            json_agg(json_build_array(user_name, error_location, error_description)), \
+            '[]' \
+        ) AS flags \
+        FROM flagged_by WHERE document_id = documents.id \
+    ) AS flags \
+    WHERE id IN %(ids)s"
+)
+
+
+def _document_from_row(
+    row: tuple, transcript_loader: Callable[[Document], None] = None
+) -> Document:
+    """A ``Document`` from a row of ``_HYDRATED_DOCUMENTS``"""
+    return Document(
+        id=row[0],
+        studio=row[2],
+        title=row[3],
+        document_type=row[5],
+        copyright_year=row[1],
+        reel_count=row[4],
+        uploaded_time=row[7],
+        uploaded_by=row[6],
+        transcripts=[(page_number, content) for page_number, content in row[8]],
+        transcript_loader=transcript_loader,
+        actors=row[9],
+        genres=row[10],
+        locations=row[11],
+        flags=[
+            Flag(
+                reporterName=reporter_name,
+                errorLocation=error_location,
+                errorDescription=error_description,
+            )
+            for reporter_name, error_location, error_description in row[12]
+        ],
+    )
+
+
+def _get_documents_in_one_statement(
+    conn: connection, cleaned_ids: tuple, preload_transcripts: bool
+) -> list[Document]:
+    """The ``"statement"`` hydration of ``get_documents``"""
+    with conn.cursor() as cur:
+        cur.execute(
+            _HYDRATED_DOCUMENTS + ";",
+            {"ids": cleaned_ids, "transcripts": preload_transcripts},
+        )
+
+        rows: list[tuple] = cur.fetchall()
+
+    conn.commit()
+
+    batch: _TranscriptBatch | None = (
+        None if preload_transcripts else _TranscriptBatch(conn)
+    )
+    documents: list[Document] = [_document_from_row(row, batch) for row in rows]
+
+    if batch:
+        batch.documents = documents
+
+    return documents
+
+
+def get_documents(
+    conn: connection,
+    doc_ids: list[str],
+    hydration: str = "statement",
+    preload_transcripts: bool = False,
+) -> str:
     """Fetch *all* data pertaining to multiple documents.
 
     Parameters
@@ -947,11 +3010,24 @@ def get_documents(conn: connection, doc_ids: list[str]) -> str:
     doc_ids : list[str]
         The id of the desired document
 
+    hydration : {"statement", "queries"}, default = "statement"
+        Whether every relation is read with one statement, or with one query per relation
+
+    preload_transcripts : bool, default = False
+        Whether the transcripts are read now; otherwise the first access to any returned
+        document's ``transcripts`` reads those of every returned document
+
     Returns
     -------
     docs : list[Document]
         A list of ``Document``s with information from the specified ``doc_ids``
+
+    See Also
+    --------
+    load_transcripts : Reads the transcripts of documents which were returned without them
     """
+    if hydration not in HYDRATION_MODES:
+        raise ValueError(f"Unknown hydration mode: {hydration}")
 
     document_data: list[tuple] = None
     transcript_data: list[tuple] = None
@@ -963,6 +3039,9 @@ def get_documents(conn: connection, doc_ids: list[str]) -> str:
 
     cleaned_ids: tuple = tuple(id.lower() for id in doc_ids)
 
+    if hydration == "statement":
+        return _get_documents_in_one_statement(conn, cleaned_ids, preload_transcripts)
+
     with conn.cursor() as cur:
         cur.execute(
             "SELECT \
@@ -980,15 +3059,17 @@ def get_documents(conn: connection, doc_ids: list[str]) -> str:
 
         document_data = cur.fetchall()
 
-        cur.execute(
-            "SELECT document_id, page_number, content \
-            FROM transcripts \
-            WHERE document_id IN %s \
-            ORDER BY page_number;",
-            [cleaned_ids],
-        )
+        transcript_data = []
+        if preload_transcripts:
+            cur.execute(
+                "SELECT document_id, page_number, content \
+                FROM transcripts \
+                WHERE document_id IN %s \
+                ORDER BY page_number;",
+                [cleaned_ids],
+            )
 
-        transcript_data = cur.fetchall()
+            transcript_data = cur.fetchall()
 
         cur.execute(
             "SELECT document_id, actor_name, character_name, character_description \
@@ -1029,6 +3110,9 @@ def get_documents(conn: connection, doc_ids: list[str]) -> str:
     conn.commit()
 
     documents: dict[str, Document] = {}
+    batch: _TranscriptBatch | None = (
+        None if preload_transcripts else _TranscriptBatch(conn)
+    )
 
     # create document objects
     for document_row in document_data:
@@ -1053,6 +3137,7 @@ def get_documents(conn: connection, doc_ids: list[str]) -> str:
             uploaded_time=uploaded_time,
             uploaded_by=uploaded_by,
             transcripts=[],
+            transcript_loader=batch,
             actors=[],
             genres=[],
             locations=[],
@@ -1113,10 +3198,139 @@ def get_documents(conn: connection, doc_ids: list[str]) -> str:
             )
         )
 
+    if batch:
+        batch.documents = list(documents.values())
+
     return list(documents.values())
 
 
-def get_document(conn: connection, doc_id: str) -> Document:
+def iter_documents(
+    conn: connection,
+    doc_ids: list[str],
+    itersize: int = 100,
+    include_transcripts: bool = True,
+) -> Iterator[list[Document]]:
+    """Lazily produce fully hydrated documents, a chunk at a time.
+
+    Unlike ``get_documents``, rows are read through a server-side (named) cursor, so only
+    ``itersize`` documents (with every page of their text) are held at once, however many
+    are requested. Nothing else may be done with ``conn`` until the iteration ends, since
+    ending its transaction closes the cursor.
+
+    Parameters
+    ----------
+    conn : :obj:`psycopg2.extensions.connection`
+        A ``psycopg2`` connection to perform queries with
+    doc_ids : list[str]
+        The ids of the desired documents
+    itersize : int, default = 100
+        The number of documents fetched from the cursor, and yielded, at once
+    include_transcripts : bool, default = True
+        Whether the transcripts are read, or left empty
+
+    Yields
+    ------
+    documents : list[Document]
+        The next chunk of (at most ``itersize``) documents, in id order
+    """
+    if not conn:
+        raise Exception("No SQL connection found")
+
+    if not doc_ids:
+        return
+
+    cleaned_ids: tuple = tuple(doc_id.lower() for doc_id in doc_ids)
+
+    try:
+        # the cursor closes when the transaction ends, including if the caller stops
+        # iterating and the connection is returned to the pool
+        with conn.cursor(name="iter_documents") as named:
+            named.itersize = itersize
+            named.execute(
+                _HYDRATED_DOCUMENTS + " ORDER BY id;",
+                {"ids": cleaned_ids, "transcripts": include_transcripts},
+            )
+
+            while True:
+                rows: list[tuple] = named.fetchmany(itersize)
+                if not rows:
+                    break
+
+                yield [_document_from_row(row) for row in rows]
+
+        conn.commit()
+    except psycopg2.errors.ObjectNotInPrerequisiteState as e:
+        print(e)
+
+
+def get_document_version(conn: connection, doc_id: str) -> dict | None:
+    """Fetch what identifies the current state of a document, without the document.
+
+    A document's page only changes when it is flagged, or when ingestion (which
+    increments ``data_generation`` once committed, as do ``reindex_documents`` and the
+    classification update) rewrites it, so its upload time, its flags and the data
+    generation are enough to validate a cached copy of the page.
+
+    Parameters
+    ----------
+    conn : :obj:`psycopg2.extensions.connection`
+        A ``psycopg2`` connection to perform queries with
+    doc_id : str
+        The id of the desired document
+
+    Returns
+    -------
+    version : dict
+        The document's ``id`` and ``title``, when it was ``last_modified``, and an
+        ``etag`` which changes whenever it does, or ``None`` if there is no such document
+    """
+    if not conn:
+        raise Exception("No SQL connection found")
+
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT \
+                id, \
+                title, \
+                uploaded_time, \
+                flags.flag_count, \
+                flags.last_flagged, \
+                (SELECT last_value FROM data_generation) \
+            FROM documents \
+            CROSS JOIN LATERAL ( \
+                SELECT COUNT(*) AS flag_count, MAX(flagged_time) AS last_flagged \
+                FROM flagged_by WHERE document_id = documents.id \
+            ) AS flags \
+            WHERE id = %s;",
+            [doc_id.lower()],
+        )
+        row: tuple = cur.fetchone()
+
+    conn.commit()
+
+    if not row:
+        return None
+
+    id, title, uploaded_time, flag_count, last_flagged, generation = row
+    changes: list[datetime.datetime] = [
+        changed for changed in (uploaded_time, last_flagged) if changed is not None
+    ]
+
+    return {
+        "id": id,
+        "title": title,
+        "last_modified": max(changes) if changes else None,
+        "etag": hashlib.md5(
+            f"{id}|{uploaded_time}|{flag_count}|{last_flagged}|{generation}".encode(
+                "utf-8"
+            )
+        ).hexdigest(),
+    }
+
+
+def get_document(
+    conn: connection, doc_id: str, preload_transcripts: bool = False
+) -> Document:
     """Fetch *all* data pertaining to a document.
 
     Parameters
@@ -1125,6 +3339,8 @@ def get_document(conn: connection, doc_id: str) -> Document:
         A ``psycopg2`` connection to perform queries with
     doc_id : str
         The id of the desired document
+    preload_transcripts : bool, default = False
+        Whether the transcripts are read now, rather than on first access
 
     Returns
     -------
@@ -1134,7 +3350,9 @@ def get_document(conn: connection, doc_id: str) -> Document:
     if not conn:
         raise Exception("No SQL connection found")
 
-    documents: list[Document] = get_documents(conn, [doc_id])
+    documents: list[Document] = get_documents(
+        conn, [doc_id], preload_transcripts=preload_transcripts
+    )
     if not documents:
         return None
 
@@ -1155,7 +3373,59 @@ def _format_actor_data(actor: dict) -> str:
     return f"{name} -- {character} ({description})"
 
 
-def get_documents_as_csv(conn: connection, doc_ids: list[str]) -> str:
+# the columns of `get_documents_as_csv` and `iter_documents_as_csv`
+_CSV_COLUMNS: list[str] = [
+    "id",
+    "copyright_year",
+    "studio",
+    "title",
+    "reel_count",
+    "uploaded_by",
+    "uploaded_time",
+    "transcript",
+    "actors",
+    "genres",
+    "locations",
+]
+
+
+def _document_csv_row(doc: Document, include_text: bool) -> str:
+    """One line of a documents csv"""
+    return (
+        _csv(
+            [
+                _clean_csv_value(doc.id),
+                _clean_csv_value(str(doc.copyright_year)),
+                _clean_csv_value(doc.studio),
+                _clean_csv_value(doc.title),
+                _clean_csv_value(str(doc.reel_count)),
+                _clean_csv_value(doc.uploaded_by),
+                _clean_csv_value(str(doc.uploaded_time)),
+                _clean_csv_value(doc.content) if include_text else "",
+                _clean_csv_value(
+                    ";".join(
+                        [_format_actor_data(actor) for actor in doc.actors if actor]
+                    )
+                ),
+                _clean_csv_value(";".join(doc.genres)),
+                _clean_csv_value(
+                    ";".join(
+                        [
+                            location["name"]
+                            for location in doc.locations
+                            if location["name"]
+                        ]
+                    )
+                ),
+            ]
+        )
+        + "\n"
+    )
+
+
+def get_documents_as_csv(
+    conn: connection, doc_ids: list[str], include_text: bool = True
+) -> str:
     """Fetch *all* data pertaining to a document.
 
     Parameters
@@ -1166,67 +3436,68 @@ def get_documents_as_csv(conn: connection, doc_ids: list[str]) -> str:
     doc_ids : list[str]
         The id of the desired document
 
+    include_text : bool, default = True
+        Whether the transcript column is filled in, or left empty without reading any
+        transcripts
+
     Returns
     -------
     csv_body : str
         A ``str`` with information from the specified ``doc_ids``, formatted as a csv
-    """
 
-    documents: list[Document] = get_documents(conn, doc_ids)
+    See Also
+    --------
+    iter_documents_as_csv : Produces the same csv a line at a time, for many documents
+    """
 
-    csv_body: str = (
-        _csv(
-            [
-                "id",
-                "copyright_year",
-                "studio",
-                "title",
-                "reel_count",
-                "uploaded_by",
-                "uploaded_time",
-                "transcript",
-                "actors",
-                "genres",
-                "locations",
-            ]
-        )
-        + "\n"
+    documents: list[Document] = get_documents(
+        conn, doc_ids, preload_transcripts=include_text
     )
 
+    csv_body: str = _csv(_CSV_COLUMNS) + "\n"
+
     for doc in documents:
-        csv_body += (
-            _csv(
-                [
-                    _clean_csv_value(doc.id),
-                    _clean_csv_value(str(doc.copyright_year)),
-                    _clean_csv_value(doc.studio),
-                    _clean_csv_value(doc.title),
-                    _clean_csv_value(str(doc.reel_count)),
-                    _clean_csv_value(doc.uploaded_by),
-                    _clean_csv_value(str(doc.uploaded_time)),
-                    _clean_csv_value(doc.content),
-                    _clean_csv_value(
-                        ";".join(
-                            [_format_actor_data(actor) for actor in doc.actors if actor]
-                        )
-                    ),
-                    _clean_csv_value(";".join(doc.genres)),
-                    _clean_csv_value(
-                        ";".join(
-                            [
-                                location["name"]
-                                for location in doc.locations
-                                if location["name"]
-                            ]
-                        )
-                    ),
-                ]
-            )
-            + "\n"
-        )
+        csv_body += _document_csv_row(doc, include_text)
 
     return csv_body
 
 
+def iter_documents_as_csv(
+    conn: connection,
+    doc_ids: list[str],
+    include_text: bool = True,
+    itersize: int = 100,
+) -> Iterator[str]:
+    """Lazily produce the csv of ``get_documents_as_csv``, a line at a time.
+
+    Documents are read with ``iter_documents``, so however many are exported, only
+    ``itersize`` of them are held at once.
+
+    Parameters
+    ----------
+    conn : :obj:`psycopg2.extensions.connection`
+        A ``psycopg2`` connection to perform queries with
+    doc_ids : list[str]
+        The ids of the desired documents
+    include_text : bool, default = True
+        Whether the transcript column is filled in, or left empty without reading any
+        transcripts
+    itersize : int, default = 100
+        The number of documents read from the database at once
+
+    Yields
+    ------
+    line : str
+        The header, then one line for each document (in id order)
+    """
+    yield _csv(_CSV_COLUMNS) + "\n"
+
+    for documents in iter_documents(
+        conn, doc_ids, itersize=itersize, include_transcripts=include_text
+    ):
+        for doc in documents:
+            yield _document_csv_row(doc, include_text)
+
+
 if __name__ == "__main__":
     pass
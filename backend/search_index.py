@@ -0,0 +1,338 @@
+"""An in-process inverted index which answers ``Query`` objects without the database."""
+
+import datetime
+import re
+
+import numpy as np
+
+from .datatypes import Query
+
+# a lexeme, an operator, or a parenthesis in the text form of a `tsquery`
+_TSQUERY_TOKEN: re.Pattern = re.compile(
+    r"\s*(?:'((?:[^']|'')*)'(?::[*A-D]+)?|(<\d+>|<->)|([&|!()]))"
+)
+
+
+class UnsupportedQuery(ValueError):
+    """Raised for queries the in-memory index cannot answer exactly (phrase searches)"""
+
+
+def parse_tsquery(text: str) -> tuple | None:
+    """Parse the text form of a PostgreSQL ``tsquery`` into a tree
+
+    Nodes are ``("lexeme", str)``, ``("not", node)``, ``("and", node, node)``,
+    ``("or", node, node)``, and ``("phrase", node, node)``. Operators bind as in
+    PostgreSQL: ``!`` tightest, then ``<->``, then ``&``, then ``|``.
+
+    Parameters
+    ----------
+    text : str
+        A ``tsquery`` cast to ``text``, such as ``'comedi' & !'chase'``
+
+    Returns
+    -------
+    tree : tuple
+        The root node, or ``None`` for a query without lexemes
+    """
+    tokens: list[tuple[str, str]] = []
+    position: int = 0
+    text = text.rstrip()
+    while position < len(text):
+        match: re.Match = _TSQUERY_TOKEN.match(text, position)
+        if not match:
+            raise ValueError(f"Malformed tsquery: {text}")
+
+        if match.group(1) is not None:
+            tokens.append(("lexeme", match.group(1).replace("''", "'")))
+        elif match.group(2) is not None:
+            tokens.append(("phrase", match.group(2)))
+        else:
+            tokens.append((match.group(3), match.group(3)))
+        position = match.end()
+
+    if not tokens:
+        return None
+
+    def parse_or(i: int) -> tuple[tuple, int]:
+        node, i = parse_and(i)
+        while i < len(tokens) and tokens[i][0] == "|":
+            right, i = parse_and(i + 1)
+            node = ("or", node, right)
+        return node, i
+
+    def parse_and(i: int) -> tuple[tuple, int]:
+        node, i = parse_phrase(i)
+        while i < len(tokens) and tokens[i][0] == "&":
+            right, i = parse_phrase(i + 1)
+            node = ("and", node, right)
+        return node, i
+
+    def parse_phrase(i: int) -> tuple[tuple, int]:
+        node, i = parse_not(i)
+        while i < len(tokens) and tokens[i][0] == "phrase":
+            right, i = parse_not(i + 1)
+            node = ("phrase", node, right)
+        return node, i
+
+    def parse_not(i: int) -> tuple[tuple, int]:
+        if tokens[i][0] == "!":
+            node, i = parse_not(i + 1)
+            return ("not", node), i
+        if tokens[i][0] == "(":
+            node, i = parse_or(i + 1)
+            return node, i + 1
+        return tokens[i], i + 1
+
+    tree, end = parse_or(0)
+    if end != len(tokens):
+        raise ValueError(f"Malformed tsquery: {text}")
+
+    return tree
+
+
+class InvertedIndex:
+    """
+    An immutable, in-memory inverted index of every searchable document
+
+    Documents are numbered by their position in the sorted `ids`. Each posting list is a
+    NumPy array of document numbers (with a parallel array of term frequencies), and every
+    filter of a `Query` is a NumPy column, so a search is a handful of vectorized
+    operations.
+
+    Parameters
+    ----------
+    documents: list[tuple], default = ()
+        `(id, copyright_year, reel_count, studio, uploaded_time)` of every document with a
+        search vector
+
+    postings: dict[str, tuple[list[str], list[int]]], default = None
+        The ids of the documents containing each lexeme, and how often it occurs in each
+
+    actors: dict[str, list[str]], default = None
+        The ids of the documents each actor appears in
+
+    genres: dict[str, list[str]], default = None
+        The ids of the documents with each genre
+
+    generation: int, default = None
+        The data generation the index was read from
+
+    Attributes
+    ----------
+    ids: numpy.ndarray
+        The sorted ids of every document
+
+    generation: int
+        The data generation the index was read from
+
+    Methods
+    -------
+    search(query: Query, tsquery: tuple = None)
+        Returns the numbers and BM25 scores of every matching document, best first
+    """
+
+    # the Okapi BM25 parameters, as in `bm25_score` in `functionDefinitions.sql`
+    K1: float = 1.2
+    B: float = 0.75
+
+    generation: int = None
+
+    def __init__(
+        self,
+        documents: list[tuple] = (),
+        postings: dict[str, tuple[list[str], list[int]]] = None,
+        actors: dict[str, list[str]] = None,
+        genres: dict[str, list[str]] = None,
+        generation: int = None,
+    ):
+        self.generation = generation
+
+        documents = sorted(documents, key=lambda document: document[0])
+        self.ids: np.ndarray = np.array([row[0] for row in documents], dtype=str)
+
+        # missing values never pass a filter, as with SQL's NULL
+        self._years: np.ndarray = np.array(
+            [np.nan if row[1] is None else row[1] for row in documents], dtype=float
+        )
+        self._reels: np.ndarray = np.array(
+            [np.nan if row[2] is None else row[2] for row in documents], dtype=float
+        )
+        self._studios: dict[str, int] = {}
+        self._studio_codes: np.ndarray = np.array(
+            [
+                (
+                    -1
+                    if row[3] is None
+                    else self._studios.setdefault(row[3], len(self._studios))
+                )
+                for row in documents
+            ],
+            dtype=np.int32,
+        )
+        self._uploaded: np.ndarray = np.array(
+            [
+                (
+                    np.datetime64("NaT", "us")
+                    if row[4] is None
+                    else np.datetime64(_naive(row[4]))
+                )
+                for row in documents
+            ],
+            dtype="datetime64[us]",
+        )
+
+        self._postings: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        self._lengths: np.ndarray = np.zeros(len(self.ids), dtype=float)
+        for lexeme, (doc_ids, frequencies) in (postings or {}).items():
+            numbers: np.ndarray = self._numbers(doc_ids)
+            found: np.ndarray = numbers >= 0
+            counts: np.ndarray = np.asarray(frequencies, dtype=float)[found]
+
+            self._postings[lexeme] = (numbers[found], counts)
+            np.add.at(self._lengths, numbers[found], counts)
+
+        self._actors: dict[str, np.ndarray] = {
+            name: self._numbers(doc_ids) for name, doc_ids in (actors or {}).items()
+        }
+        self._genres: dict[str, np.ndarray] = {
+            genre: self._numbers(doc_ids) for genre, doc_ids in (genres or {}).items()
+        }
+
+        self._average_length: float = (
+            max(self._lengths.mean(), 1) if len(self._lengths) else 1
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _numbers(self, doc_ids: list[str]) -> np.ndarray:
+        """The numbers of some document ids, or -1 for ids not in the index"""
+        doc_ids = np.asarray(doc_ids, dtype=str)
+        if not len(self.ids) or not len(doc_ids):
+            return np.full(len(doc_ids), -1, dtype=np.int64)
+
+        numbers: np.ndarray = np.searchsorted(self.ids, doc_ids)
+        clipped: np.ndarray = np.minimum(numbers, len(self.ids) - 1)
+        return np.where(self.ids[clipped] == doc_ids, clipped, -1)
+
+    def _mask(self, numbers: np.ndarray) -> np.ndarray:
+        """A boolean mask of every document, set for `numbers`"""
+        mask: np.ndarray = np.zeros(len(self.ids), dtype=bool)
+        mask[numbers[numbers >= 0]] = True
+        return mask
+
+    def _evaluate(self, node: tuple) -> np.ndarray:
+        """The mask of the documents matching a `parse_tsquery` tree"""
+        if node[0] == "lexeme":
+            return self._mask(self._postings.get(node[1], (np.empty(0, int), None))[0])
+        if node[0] == "not":
+            return ~self._evaluate(node[1])
+        if node[0] == "and":
+            return self._evaluate(node[1]) & self._evaluate(node[2])
+        if node[0] == "or":
+            return self._evaluate(node[1]) | self._evaluate(node[2])
+
+        # term positions are not indexed
+        raise UnsupportedQuery("Phrase searches are not supported")
+
+    def _score(self, node: tuple, mask: np.ndarray) -> np.ndarray:
+        """The BM25 score of every document for the lexemes of a tree outside a `!`"""
+        lexemes: set[str] = set()
+        pending: list[tuple] = [node]
+        while pending:
+            current: tuple = pending.pop()
+            if current[0] == "lexeme":
+                lexemes.add(current[1])
+            elif current[0] != "not":
+                pending.extend(current[1:])
+
+        scores: np.ndarray = np.zeros(len(self.ids), dtype=np.float32)
+        for lexeme in lexemes:
+            if lexeme not in self._postings:
+                continue
+
+            numbers, frequencies = self._postings[lexeme]
+            idf: float = np.log(
+                1 + (len(self.ids) - len(numbers) + 0.5) / (len(numbers) + 0.5)
+            )
+            norms: np.ndarray = self.K1 * (
+                1 - self.B + self.B * self._lengths[numbers] / self._average_length
+            )
+            scores[numbers] += idf * frequencies * (self.K1 + 1) / (frequencies + norms)
+
+        scores[~mask] = 0
+        return scores
+
+    def search(
+        self, query: Query, tsquery: tuple | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the numbers and BM25 scores of every matching document, best first
+
+        The same documents match as in ``db_utils.compose_document_query``, and they are
+        scored as by ``bm25_score`` in ``functionDefinitions.sql``. Ties (and all
+        documents, without keywords) are ordered by id.
+
+        Parameters
+        ----------
+        query : :obj:`Query`
+            The filters every match must pass
+        tsquery : tuple, default = None
+            ``parse_tsquery`` of ``websearch_to_tsquery`` of ``query``'s keywords (only used
+            when ``query`` has keywords)
+
+        Returns
+        -------
+        numbers : numpy.ndarray
+            The numbers of the matching documents (see ``ids``), in rank order
+        scores : numpy.ndarray
+            The ``float32`` score of each of them
+
+        Raises
+        ------
+        UnsupportedQuery
+            If ``tsquery`` contains a phrase
+        """
+        mask: np.ndarray = np.ones(len(self.ids), dtype=bool)
+
+        if query.keywords:
+            # as with `@@`, a query of only stop words matches nothing
+            mask &= self._evaluate(tsquery) if tsquery else False
+
+        with np.errstate(invalid="ignore"):
+            if query.copyright_year_range[0] is not None:
+                mask &= self._years >= query.copyright_year_range[0]
+            if query.copyright_year_range[1] is not None:
+                mask &= self._years <= query.copyright_year_range[1]
+            if query.reel_range[0] is not None:
+                mask &= self._reels >= query.reel_range[0]
+            if query.reel_range[1] is not None:
+                mask &= self._reels <= query.reel_range[1]
+
+        if query.studio:
+            mask &= self._studio_codes == self._studios.get(query.studio, -2)
+
+        if query.query_time:
+            mask &= self._uploaded <= np.datetime64(_naive(query.query_time), "us")
+
+        for actor in set(query.actors):
+            mask &= self._mask(self._actors.get(actor, np.empty(0, int)))
+
+        for genre in set(query.genres):
+            mask &= self._mask(self._genres.get(genre, np.empty(0, int)))
+
+        numbers: np.ndarray = np.flatnonzero(mask)
+        if query.keywords and tsquery:
+            scores: np.ndarray = self._score(tsquery, mask)[numbers]
+            # `lexsort` sorts by its last key first; numbers are already in id order
+            order: np.ndarray = np.lexsort((numbers, -scores))
+            return numbers[order], scores[order]
+
+        return numbers, np.zeros(len(numbers), dtype=np.float32)
+
+
+def _naive(timestamp: datetime.datetime) -> datetime.datetime:
+    """`timestamp` in UTC without a timezone, since NumPy does not store them"""
+    if timestamp.tzinfo is None:
+        return timestamp
+
+    return timestamp.astimezone(datetime.timezone.utc).replace(tzinfo=None)
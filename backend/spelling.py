@@ -0,0 +1,188 @@
+"""An in-process spelling corrector for search keywords, using symmetric deletes."""
+
+import re
+from typing import Iterable
+
+# a keyword's leading operators (`-` and `"`), its word, and any closing quote
+_KEYWORD: re.Pattern = re.compile(r'^([-"]*)(.*?)("?)$')
+
+
+def _deletes(word: str, distance: int) -> set[str]:
+    """Every string made by deleting up to `distance` characters from `word`"""
+    variants: set[str] = {word}
+    frontier: set[str] = {word}
+    for _ in range(distance):
+        frontier = {
+            variant[: i - 1] + variant[i:]
+            for variant in frontier
+            for i in range(1, len(variant) + 1)
+        }
+        variants |= frontier
+
+    return variants
+
+
+def edit_distance(a: str, b: str) -> int:
+    """The optimal string alignment distance between two strings
+
+    Insertions, deletions, substitutions, and transpositions of adjacent characters each
+    count as one edit.
+    """
+    previous: list[int] = list(range(len(b) + 1))
+    before: list[int] = previous
+    for i in range(1, len(a) + 1):
+        current: list[int] = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (a[i - 1] != b[j - 1]),
+            )
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        before, previous = previous, current
+
+    return previous[-1]
+
+
+class SpellingIndex:
+    """
+    An immutable index of known words which finds the most frequent close spelling of a word
+
+    Following SymSpell, every word is stored under each string made by deleting up to
+    `max_distance` characters from its first `prefix_length` characters. A misspelling is
+    looked up by its own deletes, so only a few candidates are compared with
+    `edit_distance`, however many words are indexed.
+
+    Parameters
+    ----------
+    words: Iterable[tuple[str, int]], default = ()
+        Each known word and its frequency (the number of documents containing it)
+
+    max_distance: int, default = 2
+        The most edits a correction may be from the word it replaces
+
+    prefix_length: int, default = 7
+        The number of leading characters deletes are generated from
+
+    generation: int, default = None
+        The data generation the words were read from
+
+    min_count: int, default = 1
+        The lowest frequency of an indexed word; rarer words (mostly OCR noise) are neither
+        known nor suggested
+
+    Attributes
+    ----------
+    generation: int
+        The data generation the words were read from
+
+    Methods
+    -------
+    correct(word: str)
+        Returns the best known spelling of `word`, or `None` if there is none
+
+    suggest(keywords: list[str])
+        Returns the keywords with each misspelled word corrected, or `None` if none were
+    """
+
+    generation: int = None
+
+    def __init__(
+        self,
+        words: Iterable[tuple[str, int]] = (),
+        max_distance: int = 2,
+        prefix_length: int = 7,
+        generation: int = None,
+        min_count: int = 1,
+    ):
+        self.generation = generation
+        self._max_distance: int = max_distance
+        self._prefix_length: int = prefix_length
+
+        frequencies: dict[str, int] = {}
+        for word, frequency in words:
+            word = word.lower()
+            frequencies[word] = frequencies.get(word, 0) + frequency
+
+        self._frequencies: dict[str, int] = {
+            word: frequency
+            for word, frequency in frequencies.items()
+            if frequency >= min_count
+        }
+        self._deletes: dict[str, list[str]] = {}
+        for word in self._frequencies:
+            for variant in _deletes(word[:prefix_length], max_distance):
+                self._deletes.setdefault(variant, []).append(word)
+
+    def __len__(self) -> int:
+        return len(self._frequencies)
+
+    def _allowed_distance(self, word: str) -> int:
+        """Short words get fewer edits, so that they are not replaced by unrelated words"""
+        if len(word) < 3:
+            return 0
+
+        return min(self._max_distance, 1 if len(word) < 6 else 2)
+
+    def correct(self, word: str) -> str | None:
+        """Returns the best known spelling of `word`, or `None` if there is none
+
+        A known word is its own spelling. Otherwise the closest known word wins, and the
+        most frequent breaks ties.
+        """
+        word = word.lower()
+        if word in self._frequencies:
+            return word
+
+        distance: int = self._allowed_distance(word)
+        if not distance:
+            return None
+
+        best: tuple[int, int, str] | None = None
+        seen: set[str] = set()
+        for variant in _deletes(word[: self._prefix_length], distance):
+            for candidate in self._deletes.get(variant, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+
+                # deletes from the prefixes only bound the distance of the prefixes
+                if abs(len(candidate) - len(word)) > distance:
+                    continue
+
+                candidateDistance: int = edit_distance(word, candidate)
+                if candidateDistance > distance:
+                    continue
+
+                key: tuple[int, int, str] = (
+                    candidateDistance,
+                    -self._frequencies[candidate],
+                    candidate,
+                )
+                if best is None or key < best:
+                    best = key
+
+        return best[2] if best else None
+
+    def suggest(self, keywords: list[str]) -> list[str] | None:
+        """Returns the keywords with each misspelled word corrected, or `None` if none were
+
+        The search syntax of ``websearch_to_tsquery`` (``or``, a leading ``-``, and quotes)
+        is kept, and words without a known spelling are left as they are.
+        """
+        suggestion: list[str] = []
+        changed: bool = False
+        for keyword in keywords:
+            operators, word, closing = _KEYWORD.match(keyword).groups()
+            corrected: str | None = (
+                self.correct(word) if word.isalpha() and word.lower() != "or" else None
+            )
+
+            if corrected and corrected != word.lower():
+                suggestion.append(operators + corrected + closing)
+                changed = True
+            else:
+                suggestion.append(keyword)
+
+        return suggestion if changed else None
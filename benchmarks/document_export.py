@@ -0,0 +1,106 @@
+"""A CLI program that compares the peak memory of building and streaming a documents csv.
+
+``db_utils.get_documents_as_csv`` is checked to produce the same csv as
+``db_utils.iter_documents_as_csv``, then each is measured with ``tracemalloc``. Run from
+the repository root against the database specified in ``.env``::
+
+    python -m benchmarks.document_export --sizes 20 500 --itersize 50
+"""
+
+import argparse
+import hashlib
+import io
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable, Iterable
+
+from dotenv import load_dotenv
+
+import psycopg2
+import psycopg2.extensions
+
+from backend import db_utils
+
+parser = argparse.ArgumentParser(
+    prog="document_export.py",
+    description="A program that compares building and streaming a documents csv",
+)
+
+parser.add_argument("-s", "--sizes", nargs="+", default=[20, 500], type=int)
+parser.add_argument("-i", "--itersize", required=False, default=100, type=int)
+
+
+def _measure(produce: Callable[[], Iterable[str]]) -> tuple[int, float, float]:
+    """An order-independent digest of the lines `produce` returns, with the peak MiB
+    allocated and the ms taken
+
+    Each line is dropped once it is digested, as a streamed response drops it once sent.
+    """
+    tracemalloc.start()
+    start: float = time.perf_counter()
+
+    digest: int = 0
+    for line in produce():
+        digest ^= int.from_bytes(hashlib.md5(line.encode("utf-8")).digest())
+
+    elapsed: float = (time.perf_counter() - start) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return digest, peak / (1 << 20), elapsed
+
+
+def main(argv=None):
+    """Print whether both exports agree, and the peak memory and latency of each."""
+    args = parser.parse_args(argv)
+    load_dotenv()
+
+    db_connection: psycopg2.extensions.connection = psycopg2.connect(
+        host=os.environ["SQL_HOST"],
+        port=os.environ["SQL_PORT"],
+        dbname=os.environ["SQL_DBNAME"],
+        user=os.environ["SQL_USER"],
+        password=os.environ["SQL_PASSWORD"],
+    )
+
+    with db_connection.cursor() as cur:
+        cur.execute("SELECT id FROM documents ORDER BY id LIMIT %s;", [max(args.sizes)])
+        all_ids: list[str] = [doc_id for (doc_id,) in cur.fetchall()]
+    db_connection.commit()
+
+    mismatches: int = 0
+
+    print(
+        f"{'ids':>5} {'same':>5} {'built MiB':>10} {'built ms':>9} "
+        f"{'streamed MiB':>13} {'streamed ms':>12}"
+    )
+    for size in args.sizes:
+        doc_ids: list[str] = all_ids[:size]
+
+        built, built_mib, built_ms = _measure(
+            lambda: io.StringIO(db_utils.get_documents_as_csv(db_connection, doc_ids))
+        )
+        streamed, streamed_mib, streamed_ms = _measure(
+            lambda: db_utils.iter_documents_as_csv(
+                db_connection, doc_ids, itersize=args.itersize
+            )
+        )
+
+        same: bool = built == streamed
+        mismatches += not same
+
+        print(
+            f"{len(doc_ids):>5} {str(same):>5} {built_mib:>10.2f} {built_ms:>9.1f} "
+            f"{streamed_mib:>13.2f} {streamed_ms:>12.1f}"
+        )
+
+    db_connection.close()
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""A CLI program that compares the hydration modes of ``db_utils.get_documents``.
+
+Each mode is checked to build the same ``Document``s, then timed with its round trips counted.
+Run from the repository root against the database specified in ``.env``::
+
+    python -m benchmarks.document_hydration --sizes 1 20 500
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from dotenv import load_dotenv
+
+import psycopg2
+import psycopg2.extensions
+
+from backend import db_utils
+from backend.datatypes import Document
+
+parser = argparse.ArgumentParser(
+    prog="document_hydration.py",
+    description="A program that compares the ways get_documents reads related rows",
+)
+
+parser.add_argument("-s", "--sizes", nargs="+", default=[1, 20, 500], type=int)
+parser.add_argument("-r", "--repeat", required=False, default=5, type=int)
+
+
+class CountingCursor(psycopg2.extensions.cursor):
+    """A ``cursor`` which counts every statement sent to the server."""
+
+    executions: int = 0
+
+    def execute(self, query, vars=None):
+        CountingCursor.executions += 1
+        return super().execute(query, vars)
+
+
+def _snapshot(documents: list[Document]) -> list[tuple]:
+    """The attributes of some ``Document``s, in a comparable form"""
+    return sorted(
+        (
+            doc.id,
+            doc.copyright_year,
+            doc.studio,
+            doc.title,
+            doc.reel_count,
+            doc.document_type,
+            doc.uploaded_by,
+            str(doc.uploaded_time),
+            tuple(doc.transcripts),
+            sorted(str(actor) for actor in doc.actors),
+            sorted(doc.genres),
+            sorted(str(location) for location in doc.locations),
+            sorted(
+                (flag.reporterName, flag.errorLocation, flag.errorDescription)
+                for flag in doc.flags
+            ),
+        )
+        for doc in documents
+    )
+
+
+def main(argv=None):
+    """Print whether both modes agree, and the round trips and latency of each."""
+    args = parser.parse_args(argv)
+    load_dotenv()
+
+    db_connection: psycopg2.extensions.connection = psycopg2.connect(
+        host=os.environ["SQL_HOST"],
+        port=os.environ["SQL_PORT"],
+        dbname=os.environ["SQL_DBNAME"],
+        user=os.environ["SQL_USER"],
+        password=os.environ["SQL_PASSWORD"],
+        cursor_factory=CountingCursor,
+    )
+
+    with db_connection.cursor() as cur:
+        cur.execute("SELECT id FROM documents ORDER BY id LIMIT %s;", [max(args.sizes)])
+        all_ids: list[str] = [doc_id for (doc_id,) in cur.fetchall()]
+    db_connection.commit()
+
+    mismatches: int = 0
+
+    print(
+        f"{'ids':>5} {'same':>5} "
+        + " ".join(
+            f"{mode + ' trips':>16} {mode + ' ms':>13}"
+            for mode in db_utils.HYDRATION_MODES
+        )
+    )
+    for size in args.sizes:
+        doc_ids: list[str] = all_ids[:size]
+
+        snapshots: list[list[tuple]] = []
+        columns: list[str] = []
+        for mode in db_utils.HYDRATION_MODES:
+            timings: list[float] = []
+            CountingCursor.executions = 0
+            for _ in range(args.repeat):
+                start: float = time.perf_counter()
+                documents: list[Document] = db_utils.get_documents(
+                    db_connection, doc_ids, hydration=mode, preload_transcripts=True
+                )
+                timings.append((time.perf_counter() - start) * 1000)
+
+            snapshots.append(_snapshot(documents))
+            columns.append(
+                f"{CountingCursor.executions / args.repeat:>16g} "
+                f"{statistics.median(timings):>13.2f}"
+            )
+
+        same: bool = all(snapshot == snapshots[0] for snapshot in snapshots)
+        mismatches += not same
+
+        print(f"{len(doc_ids):>5} {str(same):>5} " + " ".join(columns))
+
+    db_connection.close()
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""A CLI program that measures the memory held by hydrated ``Document``s.
+
+Rows shaped like those ``db_utils.get_documents`` decodes are generated in-process, so no
+database is needed. Run from the repository root::
+
+    python -m benchmarks.document_memory --count 10000
+"""
+
+import argparse
+import datetime
+import gc
+import tracemalloc
+
+from backend.datatypes import Document, Flag
+
+parser = argparse.ArgumentParser(
+    prog="document_memory.py",
+    description="A program that measures the memory overhead of Document objects",
+)
+
+parser.add_argument("-c", "--count", required=False, default=10000, type=int)
+parser.add_argument("-p", "--pages", required=False, default=3, type=int)
+
+
+def _rows(count: int, pages: int) -> list[tuple]:
+    """The field values of `count` documents, as `get_documents` receives them"""
+    uploaded: datetime.datetime = datetime.datetime(2024, 1, 1)
+    return [
+        (
+            f"s{i:04d}l{i:05d}",
+            1912 + i % 17,
+            f"Studio {i % 40}",
+            f"Title {i}",
+            1 + i % 8,
+            "synopsis",
+            "admin",
+            uploaded,
+            [(page, f"page {page} of document {i}") for page in range(1, pages + 1)],
+            [
+                {
+                    "actor_name": f"Actor {i}",
+                    "character_name": f"Character {i}",
+                    "character_description": None,
+                }
+            ],
+            ["comedy"],
+            [{"name": f"Location {i}", "description": None}],
+            [("userX", "title", "the title is incorrect.")] if i % 100 == 0 else [],
+        )
+        for i in range(count)
+    ]
+
+
+def _hydrate(rows: list[tuple]) -> list[Document]:
+    return [
+        Document(
+            id=row[0],
+            studio=row[2],
+            title=row[3],
+            document_type=row[5],
+            copyright_year=row[1],
+            reel_count=row[4],
+            uploaded_time=row[7],
+            uploaded_by=row[6],
+            transcripts=row[8],
+            actors=row[9],
+            genres=row[10],
+            locations=row[11],
+            flags=[Flag(*flag) for flag in row[12]],
+        )
+        for row in rows
+    ]
+
+
+def _allocated(build) -> tuple[object, int]:
+    """The result of `build()` and the bytes it still holds once built"""
+    gc.collect()
+    before: int = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    return result, tracemalloc.get_traced_memory()[0] - before
+
+
+def main(argv=None):
+    """Print the memory held by the field values, and by the objects wrapping them."""
+    args = parser.parse_args(argv)
+
+    tracemalloc.start()
+
+    rows, row_bytes = _allocated(lambda: _rows(args.count, args.pages))
+    documents, document_bytes = _allocated(lambda: _hydrate(rows))
+
+    tracemalloc.stop()
+
+    print(
+        f"{'documents':>10} {'values MiB':>11} {'objects MiB':>12} {'bytes/document':>15}"
+    )
+    print(
+        f"{len(documents):>10} {row_bytes / 2**20:>11.2f} {document_bytes / 2**20:>12.2f} "
+        f"{document_bytes / max(len(documents), 1):>15.1f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
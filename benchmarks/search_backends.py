@@ -0,0 +1,133 @@
+"""A CLI program that checks the in-memory search index against PostgreSQL and compares
+their latency.
+
+Each query's matching ids from ``db_utils.execute_document_query``, in the order of the
+``bm25`` rank mode (``bm25_score``, then id), are compared with those of the index built by
+``db_utils.build_search_index``. The memory backend passes keyword searches in any other
+rank mode to PostgreSQL. Run from the repository root against the database specified in
+``.env``::
+
+    python -m benchmarks.search_backends --keywords comedy "comedy -chase" "drama or war"
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from dotenv import load_dotenv
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.sql as sql
+
+from backend import db_utils
+from backend.datatypes import Query
+
+parser = argparse.ArgumentParser(
+    prog="search_backends.py",
+    description="A program that compares the postgres and memory search backends",
+)
+
+parser.add_argument("-k", "--keywords", nargs="+", default=["comedy"])
+parser.add_argument("-y", "--year-range", nargs=2, default=[1912, 1928], type=int)
+parser.add_argument("-r", "--repeat", required=False, default=5, type=int)
+
+
+def main(argv=None):
+    """Print whether both backends match the same ids in the same order, and how long each
+    takes."""
+    args = parser.parse_args(argv)
+    load_dotenv()
+
+    db_connection: psycopg2.extensions.connection = psycopg2.connect(
+        host=os.environ["SQL_HOST"],
+        port=os.environ["SQL_PORT"],
+        dbname=os.environ["SQL_DBNAME"],
+        user=os.environ["SQL_USER"],
+        password=os.environ["SQL_PASSWORD"],
+    )
+
+    start: float = time.perf_counter()
+    db_utils.build_search_index(db_connection)
+    print(
+        f"indexed {len(db_utils._search_index)} documents in "
+        f"{time.perf_counter() - start:.2f} s"
+    )
+    print()
+
+    mismatches: int = 0
+
+    print(
+        f"{'keywords':>24} {'matches':>8} {'same ids':>9} {'same order':>11} "
+        f"{'postgres ms':>12} {'memory ms':>10}"
+    )
+    for keywords in [""] + args.keywords:
+        query: Query = Query(
+            keywords=keywords.split(), copyright_year_range=tuple(args.year_range)
+        )
+
+        rank: sql.Composable = (
+            sql.SQL(
+                "bm25_score(text_search_index.text_vector, \
+                text_search_index.vector_length, {lexemes})"
+            ).format(lexemes=db_utils._QUERY_LEXEMES)
+            if query.keywords
+            else sql.SQL("0::real")
+        )
+
+        postgres_ms: list[float] = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            with db_connection.cursor() as cur:
+                db_utils.execute_document_query(
+                    cur,
+                    query,
+                    prefix=sql.SQL("SELECT id, {rank} AS rank").format(rank=rank),
+                    suffix=sql.SQL("ORDER BY rank DESC, id;"),
+                )
+                postgres_ids: list[str] = [doc_id for (doc_id, _) in cur.fetchall()]
+            db_connection.commit()
+            postgres_ms.append((time.perf_counter() - start) * 1000)
+
+        tsquery: tuple = (
+            db_utils._parse_keywords(db_connection, " ".join(query.keywords))
+            if query.keywords
+            else None
+        )
+
+        memory_ms: list[float] = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            try:
+                numbers, _ = db_utils._search_index.search(query, tsquery)
+            except db_utils.UnsupportedQuery:
+                numbers = None
+                break
+            memory_ms.append((time.perf_counter() - start) * 1000)
+
+        if numbers is None:
+            print(f"{keywords!r:>24} {len(postgres_ids):>8} {'phrase':>9}")
+            continue
+
+        memory_ids: list[str] = [
+            str(doc_id) for doc_id in db_utils._search_index.ids[numbers]
+        ]
+        same: bool = set(memory_ids) == set(postgres_ids)
+        same_order: bool = memory_ids == postgres_ids
+        mismatches += not same_order
+
+        print(
+            f"{keywords!r:>24} {len(postgres_ids):>8} {str(same):>9} {str(same_order):>11} "
+            f"{statistics.median(postgres_ms):>12.2f} {statistics.median(memory_ms):>10.2f}"
+        )
+
+    db_connection.close()
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
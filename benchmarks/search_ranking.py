@@ -0,0 +1,90 @@
+"""A CLI program that compares the ``ts_rank_cd`` and ``bm25`` ranking modes of
+``db_utils.search_page``.
+
+Run from the repository root against the database specified in ``.env``::
+
+    python -m benchmarks.search_ranking --keywords comedy chase
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+from dotenv import load_dotenv
+
+import psycopg2
+import psycopg2.extensions
+
+from backend import db_utils
+from backend.datatypes import Query, SearchPage
+
+parser = argparse.ArgumentParser(
+    prog="search_ranking.py",
+    description="A program that compares the latency and ordering of the ranking modes",
+)
+
+parser.add_argument("-k", "--keywords", nargs="+", required=True)
+parser.add_argument("-n", "--results-per-page", required=False, default=20, type=int)
+parser.add_argument("-c", "--candidates", required=False, default=1000, type=int)
+parser.add_argument("-r", "--repeat", required=False, default=5, type=int)
+
+
+def main(argv=None):
+    """Print the latency of each ranking mode and the overlap of their first pages."""
+    args = parser.parse_args(argv)
+    load_dotenv()
+
+    db_connection: psycopg2.extensions.connection = psycopg2.connect(
+        host=os.environ["SQL_HOST"],
+        port=os.environ["SQL_PORT"],
+        dbname=os.environ["SQL_DBNAME"],
+        user=os.environ["SQL_USER"],
+        password=os.environ["SQL_PASSWORD"],
+    )
+
+    # every repetition must reach the database
+    db_utils.configure_result_cache(maxsize=0)
+
+    query: Query = Query(keywords=args.keywords)
+    rankings: dict[str, list[str]] = {}
+
+    print(f"{'mode':>10} {'results':>8} {'mean ms':>10} {'median ms':>10}")
+    for rank_mode in db_utils.RANK_MODES:
+        timings: list[float] = []
+
+        for _ in range(args.repeat):
+            db_utils.headline_cache.clear()
+            start: float = time.perf_counter()
+
+            results: SearchPage = db_utils.search_page(
+                db_connection,
+                query,
+                resultsPerPage=args.results_per_page,
+                count_mode="capped",
+                rank_mode=rank_mode,
+                bm25_candidates=args.candidates,
+            )
+
+            timings.append((time.perf_counter() - start) * 1000)
+
+        rankings[rank_mode] = [document.id for document in results.documents]
+
+        print(
+            f"{rank_mode:>10} {len(results.documents):>8} "
+            f"{statistics.mean(timings):>10.2f} {statistics.median(timings):>10.2f}"
+        )
+
+    first, second = (rankings[rank_mode] for rank_mode in db_utils.RANK_MODES)
+    overlap: int = len(set(first) & set(second))
+    same_position: int = sum(a == b for a, b in zip(first, second))
+
+    print()
+    print(f"shared results on the first page: {overlap} of {len(first)}")
+    print(f"results at the same position:     {same_position}")
+
+    db_connection.close()
+
+
+if __name__ == "__main__":
+    main()
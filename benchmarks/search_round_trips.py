@@ -0,0 +1,83 @@
+"""A CLI program that measures database round trips made by ``db_utils.search_results``.
+
+Run from the repository root against the database specified in ``.env``::
+
+    python -m benchmarks.search_round_trips --keywords comedy
+"""
+
+import argparse
+import os
+import time
+
+from dotenv import load_dotenv
+
+import psycopg2
+import psycopg2.extensions
+
+from backend import db_utils
+from backend.datatypes import Query
+
+parser = argparse.ArgumentParser(
+    prog="search_round_trips.py",
+    description="A program that counts the queries issued for one page of search results",
+)
+
+parser.add_argument("-k", "--keywords", nargs="*", default=[])
+parser.add_argument(
+    "-p",
+    "--page-sizes",
+    nargs="+",
+    default=[1, 20, 50, 100],
+    type=int,
+)
+parser.add_argument("-r", "--repeat", required=False, default=5, type=int)
+
+
+class CountingCursor(psycopg2.extensions.cursor):
+    """A ``cursor`` which counts every statement sent to the server."""
+
+    executions: int = 0
+
+    def execute(self, query, vars=None):
+        CountingCursor.executions += 1
+        return super().execute(query, vars)
+
+
+def main(argv=None):
+    """Print round trips and latency of ``search_results`` for each page size."""
+    args = parser.parse_args(argv)
+    load_dotenv()
+
+    db_connection: psycopg2.extensions.connection = psycopg2.connect(
+        host=os.environ["SQL_HOST"],
+        port=os.environ["SQL_PORT"],
+        dbname=os.environ["SQL_DBNAME"],
+        user=os.environ["SQL_USER"],
+        password=os.environ["SQL_PASSWORD"],
+        cursor_factory=CountingCursor,
+    )
+
+    query: Query = Query(keywords=args.keywords)
+
+    print(f"{'page size':>10} {'results':>8} {'round trips':>12} {'mean ms':>10}")
+    for page_size in args.page_sizes:
+        CountingCursor.executions = 0
+        start: float = time.perf_counter()
+
+        for _ in range(args.repeat):
+            documents = db_utils.search_results(
+                db_connection, query, resultsPerPage=page_size
+            )
+
+        elapsed_ms: float = (time.perf_counter() - start) * 1000 / args.repeat
+        round_trips: float = CountingCursor.executions / args.repeat
+
+        print(
+            f"{page_size:>10} {len(documents):>8} {round_trips:>12g} {elapsed_ms:>10.2f}"
+        )
+
+    db_connection.close()
+
+
+if __name__ == "__main__":
+    main()
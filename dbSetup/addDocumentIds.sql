@@ -0,0 +1,37 @@
+-- Adds the `document_ids` table of tableDefinitions.sql to an older database.
+-- `uploadData.py --migrate` runs this after addFlagTime.sql. Tables partitioned before
+-- `document_ids` existed lost their `fk_document_id` foreign keys, which are restored here.
+
+CREATE TABLE IF NOT EXISTS document_ids (
+    id varchar(15) PRIMARY KEY
+);
+
+INSERT INTO document_ids (id) SELECT DISTINCT id FROM documents ON CONFLICT DO NOTHING;
+
+DO $$
+DECLARE
+    referencing text;
+BEGIN
+    IF NOT EXISTS (
+        SELECT FROM pg_constraint
+        WHERE conrelid = 'documents'::regclass AND conname = 'fk_id'
+    ) THEN
+        ALTER TABLE documents ADD CONSTRAINT fk_id FOREIGN KEY (id) REFERENCES document_ids(id);
+    END IF;
+
+    FOREACH referencing IN ARRAY ARRAY[
+        'flagged_by', 'view_history', 'has_character', 'has_location', 'has_genre'
+    ] LOOP
+        IF NOT EXISTS (
+            SELECT FROM pg_constraint
+            WHERE conrelid = referencing::regclass AND conname = 'fk_document_id'
+        ) THEN
+            EXECUTE format(
+                'ALTER TABLE %I ADD CONSTRAINT fk_document_id FOREIGN KEY (document_id) '
+                'REFERENCES document_ids(id)',
+                referencing
+            );
+        END IF;
+    END LOOP;
+END;
+$$;
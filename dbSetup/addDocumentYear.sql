@@ -0,0 +1,53 @@
+-- Brings a database created before `document_year` was added up to date with
+-- tableDefinitions.sql. `uploadData.py --migrate` runs this after addSearchTables.sql, and
+-- it can be run again on a database it has already updated.
+
+DO $$
+BEGIN
+    -- a partitioned `documents` has `unique_id_year` from `partition_by_copyright_year`
+    IF NOT EXISTS (
+        SELECT FROM pg_constraint
+        WHERE conrelid = 'documents'::regclass AND conname = 'unique_id_year'
+    ) THEN
+        ALTER TABLE documents ADD CONSTRAINT unique_id_year UNIQUE (id, copyright_year);
+    END IF;
+END;
+$$;
+
+ALTER TABLE transcripts ADD COLUMN IF NOT EXISTS document_year integer;
+ALTER TABLE document_text ADD COLUMN IF NOT EXISTS document_year integer;
+ALTER TABLE text_search_index ADD COLUMN IF NOT EXISTS document_year integer;
+
+UPDATE transcripts SET document_year = documents.copyright_year
+FROM documents WHERE documents.id = transcripts.document_id
+AND transcripts.document_year IS DISTINCT FROM documents.copyright_year;
+
+UPDATE document_text SET document_year = documents.copyright_year
+FROM documents WHERE documents.id = document_text.document_id
+AND document_text.document_year IS DISTINCT FROM documents.copyright_year;
+
+UPDATE text_search_index SET document_year = documents.copyright_year
+FROM documents WHERE documents.id = text_search_index.document_id
+AND text_search_index.document_year IS DISTINCT FROM documents.copyright_year;
+
+DO $$
+DECLARE
+    referencing text;
+BEGIN
+    FOREACH referencing IN ARRAY ARRAY[
+        'transcripts', 'document_text', 'text_search_index'
+    ] LOOP
+        IF NOT EXISTS (
+            SELECT FROM pg_constraint
+            WHERE conrelid = referencing::regclass AND conname = 'fk_document_year'
+        ) THEN
+            EXECUTE format(
+                'ALTER TABLE %I ADD CONSTRAINT fk_document_year '
+                'FOREIGN KEY (document_id, document_year) '
+                'REFERENCES documents(id, copyright_year) ON UPDATE CASCADE',
+                referencing
+            );
+        END IF;
+    END LOOP;
+END;
+$$;
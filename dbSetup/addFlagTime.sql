@@ -0,0 +1,5 @@
+-- Adds the flag times of tableDefinitions.sql to an older database.
+-- `uploadData.py --migrate` runs this after addTermDictionary.sql; flags that already exist
+-- are dated to the migration.
+
+ALTER TABLE flagged_by ADD COLUMN IF NOT EXISTS flagged_time timestamp NOT NULL DEFAULT now();
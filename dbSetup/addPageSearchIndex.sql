@@ -0,0 +1,5 @@
+-- Adds the page-level search index of tableDefinitions.sql to an older database.
+-- `uploadData.py --migrate` runs this after addDocumentYear.sql.
+
+CREATE INDEX IF NOT EXISTS idx_transcripts_text_index_col
+    ON transcripts USING GIN (text_index_col);
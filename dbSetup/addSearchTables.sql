@@ -0,0 +1,52 @@
+-- Brings a database created from the original schema (with `text_content_view` and
+-- `text_search_view`) up to the search tables of tableDefinitions.sql, as they were before
+-- `document_year` was added. `uploadData.py --migrate` runs this first, then
+-- addDocumentYear.sql; the new tables are filled by `reindex_documents` once
+-- functionDefinitions.sql is loaded.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- replaced by `document_text` and `text_search_index`
+DROP MATERIALIZED VIEW IF EXISTS text_search_view;
+DROP VIEW IF EXISTS text_content_view;
+
+CREATE TABLE IF NOT EXISTS document_text (
+    document_id varchar(15) PRIMARY KEY,
+    content text,
+    CONSTRAINT fk_document_id FOREIGN KEY (document_id) REFERENCES documents(id)
+);
+
+CREATE TABLE IF NOT EXISTS text_search_index (
+    document_id varchar(15) PRIMARY KEY,
+    text_vector tsvector,
+    vector_length integer,
+    CONSTRAINT fk_document_id FOREIGN KEY (document_id) REFERENCES documents(id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_text_search_index_text_vector
+    ON text_search_index USING GIN (text_vector);
+
+CREATE TABLE IF NOT EXISTS lexeme_stats (
+    lexeme text PRIMARY KEY,
+    document_count integer NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS corpus_stats (
+    id boolean PRIMARY KEY DEFAULT TRUE CHECK (id),
+    document_count bigint NOT NULL DEFAULT 0,
+    total_length bigint NOT NULL DEFAULT 0
+);
+
+INSERT INTO corpus_stats DEFAULT VALUES ON CONFLICT DO NOTHING;
+
+CREATE SEQUENCE IF NOT EXISTS data_generation;
+
+-- `idx_actor` gains `document_id`, so actor filters read only the index
+DROP INDEX IF EXISTS idx_actor;
+CREATE INDEX idx_actor ON has_character(actor_name, document_id);
+CREATE INDEX IF NOT EXISTS idx_has_genre_genre ON has_genre(genre, document_id);
+
+CREATE INDEX IF NOT EXISTS idx_actors_name_trgm ON actors USING GIN (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_genres_genre_trgm ON genres USING GIN (genre gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_studio_trgm ON documents USING GIN (studio gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_title_trgm ON documents USING GIN (title gin_trgm_ops);
@@ -0,0 +1,8 @@
+-- Adds the spelling dictionary of tableDefinitions.sql to an older database.
+-- `uploadData.py --migrate` runs this after addPageSearchIndex.sql; the dictionary is filled
+-- by `refresh_term_dictionary` at the end of every upload.
+
+CREATE TABLE IF NOT EXISTS term_dictionary (
+    word text PRIMARY KEY,
+    document_count integer NOT NULL
+);
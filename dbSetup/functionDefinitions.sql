@@ -0,0 +1,247 @@
+-- Functions used by ingestion and search. Every definition can be reloaded over an older one,
+-- so this file is run both after tableDefinitions.sql and by `uploadData.py --migrate`.
+
+-- the distinct `copyright_year`s of some documents (including NULL, if any has none)
+CREATE OR REPLACE FUNCTION document_years(ids text[]) RETURNS integer[] AS $$
+    SELECT array_agg(DISTINCT copyright_year) FROM documents WHERE id = ANY(ids);
+$$ LANGUAGE SQL STABLE;
+
+-- Each statement below also filters by `document_year`, so that partitioned tables only
+-- read the partitions of the given documents' years (NULL and out-of-range years are held
+-- by the DEFAULT partition).
+
+-- rebuild the complete transcript text of some documents from their pages
+CREATE OR REPLACE FUNCTION sync_document_text(ids text[]) RETURNS void AS $$
+    DELETE FROM document_text
+    WHERE document_id = ANY(ids)
+    AND (document_year = ANY(document_years(ids)) OR document_year IS NULL);
+
+    INSERT INTO document_text (document_id, document_year, content)
+    SELECT document_id, document_year, STRING_AGG(content, ' ' ORDER BY page_number)
+    FROM transcripts
+    WHERE document_id = ANY(ids)
+    AND (document_year = ANY(document_years(ids)) OR document_year IS NULL)
+    GROUP BY document_id, document_year;
+$$ LANGUAGE SQL;
+
+-- add (direction = 1) or remove (direction = -1) the indexed vectors of some documents
+-- to/from the BM25 statistics
+CREATE OR REPLACE FUNCTION update_search_stats(ids text[], direction integer)
+RETURNS void AS $$
+    INSERT INTO lexeme_stats (lexeme, document_count)
+    SELECT lexeme, direction * COUNT(*)
+    FROM text_search_index, unnest(text_vector)
+    WHERE document_id = ANY(ids)
+    AND (document_year = ANY(document_years(ids)) OR document_year IS NULL)
+    GROUP BY lexeme
+    ON CONFLICT (lexeme) DO UPDATE
+    SET document_count = lexeme_stats.document_count + EXCLUDED.document_count;
+
+    UPDATE corpus_stats SET
+        document_count = corpus_stats.document_count + direction * changed.document_count,
+        total_length = corpus_stats.total_length + direction * changed.total_length
+    FROM (
+        SELECT COUNT(*) AS document_count, COALESCE(SUM(vector_length), 0) AS total_length
+        FROM text_search_index
+        WHERE document_id = ANY(ids)
+        AND (document_year = ANY(document_years(ids)) OR document_year IS NULL)
+    ) AS changed;
+$$ LANGUAGE SQL;
+
+-- recompute the complete text, weighted search vector and BM25 statistics of some documents;
+-- the caller advances `data_generation` once the transaction is committed
+CREATE OR REPLACE FUNCTION reindex_documents(ids text[]) RETURNS void AS $$
+DECLARE
+    years integer[] := document_years(ids);
+BEGIN
+    PERFORM sync_document_text(ids);
+
+    PERFORM update_search_stats(ids, -1);
+
+    DELETE FROM text_search_index
+    WHERE document_id = ANY(ids)
+    AND (document_year = ANY(years) OR document_year IS NULL);
+
+    INSERT INTO text_search_index (document_id, document_year, text_vector, vector_length)
+    SELECT
+        id,
+        copyright_year,
+        vector,
+        (SELECT COALESCE(SUM(cardinality(positions)), 0) FROM unnest(vector))
+    FROM (
+        SELECT
+            documents.id,
+            documents.copyright_year,
+            setweight(to_tsvector(coalesce(title,'')), 'A') ||
+            setweight(to_tsvector(coalesce(document_text.content,'')), 'B') AS vector
+        FROM documents INNER JOIN document_text ON documents.id = document_text.document_id
+        WHERE documents.id = ANY(ids)
+        AND (documents.copyright_year = ANY(years) OR documents.copyright_year IS NULL)
+        AND (document_text.document_year = ANY(years) OR document_text.document_year IS NULL)
+    ) AS indexed;
+
+    PERFORM update_search_stats(ids, 1);
+END;
+$$ LANGUAGE plpgsql;
+
+-- the Okapi BM25 score (k1 = 1.2, b = 0.75) of an indexed document for some query lexemes
+CREATE OR REPLACE FUNCTION bm25_score(
+    vector tsvector, vector_length integer, query_lexemes text[]
+) RETURNS real AS $$
+    SELECT COALESCE(SUM(
+        ln(1 + (corpus.document_count - stats.document_count + 0.5)::float8
+            / (stats.document_count + 0.5))
+        * cardinality(terms.positions) * (1.2 + 1)
+        / (
+            cardinality(terms.positions)
+            + 1.2 * (
+                1 - 0.75 + 0.75 * vector_length
+                / GREATEST(corpus.total_length::float8 / GREATEST(corpus.document_count, 1), 1)
+            )
+        )
+    ), 0)::real
+    FROM unnest(vector) AS terms
+    INNER JOIN lexeme_stats AS stats ON stats.lexeme = terms.lexeme
+    CROSS JOIN corpus_stats AS corpus
+    WHERE terms.lexeme = ANY(query_lexemes);
+$$ LANGUAGE SQL STABLE;
+
+-- rebuild the spelling dictionary from the titles and transcripts of every document; the
+-- 'simple' configuration keeps words as they are written, where `text_vector` holds stems;
+-- the caller advances `data_generation` once the transaction is committed, so that the app
+-- reloads the dictionary
+CREATE OR REPLACE FUNCTION refresh_term_dictionary() RETURNS void AS $$
+    -- unlike TRUNCATE, DELETE does not block searches reading the old dictionary
+    DELETE FROM term_dictionary;
+
+    INSERT INTO term_dictionary (word, document_count)
+    SELECT word, ndoc
+    FROM ts_stat(
+        'SELECT to_tsvector(''simple'', coalesce(title, '''') || '' '' || coalesce(content, '''')) '
+        'FROM documents INNER JOIN document_text ON id = document_id'
+    )
+    WHERE word ~ '^[[:alpha:]]+$';
+$$ LANGUAGE SQL;
+
+-- Convert `documents` and its per-document text tables (`transcripts`, `document_text` and
+-- `text_search_index`) into tables range-partitioned by year, keeping their data. Partitions
+-- cover [boundaries[1], boundaries[2]), [boundaries[2], boundaries[3]), ..., and a DEFAULT
+-- partition holds every other year (including NULL).
+--
+-- Partitioned tables can only be unique on columns that include the year, so:
+-- * rows are unique on (id, year) instead of id (`NULLS NOT DISTINCT`, so PostgreSQL 15+
+--   is required); one row per id is still kept by `documents.id` referencing
+--   `document_ids`, which uploads claim each id in first
+-- * every `fk_document_id` foreign key to `documents(id)` is dropped: `transcripts`,
+--   `document_text` and `text_search_index` reference `documents(id, copyright_year)`
+--   instead, and `flagged_by`, `view_history`, `has_character`, `has_location` and
+--   `has_genre`, which have no year column, reference `document_ids(id)`
+--
+-- The caller advances `data_generation` once the transaction is committed.
+--
+-- e.g. SELECT partition_by_copyright_year(ARRAY[1912, 1916, 1920, 1924, 1929]);
+CREATE OR REPLACE FUNCTION partition_by_copyright_year(boundaries integer[])
+RETURNS void AS $$
+DECLARE
+    parent text;
+    referencing text;
+    i integer;
+BEGIN
+    IF EXISTS (SELECT FROM pg_partitioned_table WHERE partrelid = 'documents'::regclass) THEN
+        RAISE NOTICE 'documents is already partitioned';
+        RETURN;
+    END IF;
+
+    IF current_setting('server_version_num')::integer < 150000 THEN
+        RAISE EXCEPTION 'partition_by_copyright_year requires PostgreSQL 15 or later';
+    END IF;
+
+    -- unique constraints on `documents(id)` alone cannot exist any more
+    FOREACH referencing IN ARRAY ARRAY[
+        'transcripts', 'document_text', 'text_search_index'
+    ] LOOP
+        EXECUTE format('ALTER TABLE %I DROP CONSTRAINT fk_document_id', referencing);
+    END LOOP;
+
+    FOREACH referencing IN ARRAY ARRAY[
+        'flagged_by', 'view_history', 'has_character', 'has_location', 'has_genre'
+    ] LOOP
+        EXECUTE format(
+            'ALTER TABLE %I DROP CONSTRAINT fk_document_id, '
+            'ADD CONSTRAINT fk_document_id FOREIGN KEY (document_id) '
+            'REFERENCES document_ids(id)',
+            referencing
+        );
+    END LOOP;
+
+    ALTER TABLE documents RENAME TO documents_heap;
+    ALTER TABLE transcripts RENAME TO transcripts_heap;
+    ALTER TABLE document_text RENAME TO document_text_heap;
+    ALTER TABLE text_search_index RENAME TO text_search_index_heap;
+
+    CREATE TABLE documents (LIKE documents_heap INCLUDING DEFAULTS)
+        PARTITION BY RANGE (copyright_year);
+    CREATE TABLE transcripts (LIKE transcripts_heap INCLUDING DEFAULTS INCLUDING GENERATED)
+        PARTITION BY RANGE (document_year);
+    CREATE TABLE document_text (LIKE document_text_heap INCLUDING DEFAULTS)
+        PARTITION BY RANGE (document_year);
+    CREATE TABLE text_search_index (LIKE text_search_index_heap INCLUDING DEFAULTS)
+        PARTITION BY RANGE (document_year);
+
+    FOREACH parent IN ARRAY ARRAY[
+        'documents', 'transcripts', 'document_text', 'text_search_index'
+    ] LOOP
+        FOR i IN 1 .. cardinality(boundaries) - 1 LOOP
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%s) TO (%s)',
+                format('%s_%s_%s', parent, boundaries[i], boundaries[i + 1]),
+                parent,
+                boundaries[i],
+                boundaries[i + 1]
+            );
+        END LOOP;
+
+        EXECUTE format('CREATE TABLE %I PARTITION OF %I DEFAULT', parent || '_other', parent);
+    END LOOP;
+
+    INSERT INTO documents SELECT * FROM documents_heap;
+    INSERT INTO transcripts (document_id, page_number, content, document_year)
+    SELECT document_id, page_number, content, document_year FROM transcripts_heap;
+    INSERT INTO document_text SELECT * FROM document_text_heap;
+    INSERT INTO text_search_index SELECT * FROM text_search_index_heap;
+
+    -- the old tables' indexes are dropped with them, freeing their names
+    DROP TABLE transcripts_heap, document_text_heap, text_search_index_heap;
+    DROP TABLE documents_heap;
+
+    ALTER TABLE documents
+        ADD CONSTRAINT unique_id_year UNIQUE NULLS NOT DISTINCT (id, copyright_year),
+        ADD CONSTRAINT fk_uploaded_by FOREIGN KEY (uploaded_by) REFERENCES users(name),
+        ADD CONSTRAINT fk_id FOREIGN KEY (id) REFERENCES document_ids(id);
+    CREATE INDEX idx_studio ON documents(studio);
+    CREATE INDEX idx_copyright_year ON documents(copyright_year);
+    CREATE INDEX idx_title ON documents(title);
+    CREATE INDEX idx_studio_trgm ON documents USING GIN (studio gin_trgm_ops);
+    CREATE INDEX idx_title_trgm ON documents USING GIN (title gin_trgm_ops);
+
+    ALTER TABLE transcripts ADD CONSTRAINT unique_transcript_page
+        UNIQUE NULLS NOT DISTINCT (document_id, page_number, document_year);
+    CREATE INDEX idx_transcripts_text_index_col ON transcripts USING GIN (text_index_col);
+    ALTER TABLE document_text ADD CONSTRAINT unique_document_text
+        UNIQUE NULLS NOT DISTINCT (document_id, document_year);
+    ALTER TABLE text_search_index ADD CONSTRAINT unique_text_search_index
+        UNIQUE NULLS NOT DISTINCT (document_id, document_year);
+    CREATE INDEX idx_text_search_index_text_vector ON text_search_index USING GIN (text_vector);
+
+    FOREACH referencing IN ARRAY ARRAY[
+        'transcripts', 'document_text', 'text_search_index'
+    ] LOOP
+        EXECUTE format(
+            'ALTER TABLE %I ADD CONSTRAINT fk_document_year '
+            'FOREIGN KEY (document_id, document_year) '
+            'REFERENCES documents(id, copyright_year) ON UPDATE CASCADE',
+            referencing
+        );
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
@@ -1,4 +1,5 @@
 CREATE EXTENSION IF NOT EXISTS pgcrypto;
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
 -- ENTITY SETS
 
@@ -17,6 +18,12 @@ CREATE TABLE users (
     CONSTRAINT unique_email UNIQUE (email)
 );
 
+-- every document id, unique even once `documents` is partitioned by year (when the tables
+-- without a year column reference this instead; see `partition_by_copyright_year`)
+CREATE TABLE document_ids (
+    id varchar(15) PRIMARY KEY
+);
+
 CREATE TABLE documents (
     id varchar(15) PRIMARY KEY,
     copyright_year integer,
@@ -29,18 +36,40 @@ CREATE TABLE documents (
     document_type text,
     uploaded_by varchar(20),
     uploaded_time timestamp,
-    CONSTRAINT fk_uploaded_by FOREIGN KEY (uploaded_by) REFERENCES users(name)
+    CONSTRAINT fk_uploaded_by FOREIGN KEY (uploaded_by) REFERENCES users(name),
+    CONSTRAINT fk_id FOREIGN KEY (id) REFERENCES document_ids(id),
+    -- referenced by the tables that can be partitioned by year along with `documents`
+    CONSTRAINT unique_id_year UNIQUE (id, copyright_year)
 );
 
+-- `document_year` (in this and other per-document tables) is the `copyright_year` of the
+-- document, so that queries can skip other years once the tables are partitioned (see
+-- `partition_by_copyright_year` in functionDefinitions.sql)
 CREATE TABLE transcripts (
     document_id varchar(15),
     page_number integer,
     content text,
     text_index_col tsvector GENERATED ALWAYS AS (to_tsvector('english', content)) STORED,
+    document_year integer,
     CONSTRAINT fk_document_id FOREIGN KEY (document_id) REFERENCES documents(id),
+    CONSTRAINT fk_document_year FOREIGN KEY (document_id, document_year)
+        REFERENCES documents(id, copyright_year) ON UPDATE CASCADE,
     PRIMARY KEY (document_id, page_number)
 );
 
+-- page-level search (see `search_page_hits` in db_utils.py)
+CREATE INDEX idx_transcripts_text_index_col ON transcripts USING GIN (text_index_col);
+
+-- complete transcript text of each document, kept in sync by `sync_document_text`
+CREATE TABLE document_text (
+    document_id varchar(15) PRIMARY KEY,
+    content text,
+    document_year integer,
+    CONSTRAINT fk_document_id FOREIGN KEY (document_id) REFERENCES documents(id),
+    CONSTRAINT fk_document_year FOREIGN KEY (document_id, document_year)
+        REFERENCES documents(id, copyright_year) ON UPDATE CASCADE
+);
+
 CREATE TABLE search_history (
     id BIGSERIAL PRIMARY KEY,
     user_name varchar(20) NOT NULL,
@@ -69,6 +98,8 @@ CREATE TABLE flagged_by (
     user_name varchar(20) NOT NULL,
     error_location varchar(20) NOT NULL,
     error_description text,
+    -- when the document's page last changed, along with `documents.uploaded_time`
+    flagged_time timestamp NOT NULL DEFAULT now(),
     CONSTRAINT fk_document_id FOREIGN KEY (document_id) REFERENCES documents(id),
     CONSTRAINT fk_user_name FOREIGN KEY (user_name) REFERENCES users(name),
     CONSTRAINT fk_error_location FOREIGN KEY (error_location) REFERENCES error_locations(location)
@@ -117,27 +148,55 @@ CREATE TABLE has_genre (
 CREATE INDEX idx_studio ON documents(studio);
 CREATE INDEX idx_copyright_year ON documents(copyright_year);
 CREATE INDEX idx_title ON documents(title);
-CREATE INDEX idx_actor ON has_character(actor_name);
+-- (value, document_id) indexes let actor/genre filters read only the requested values
+CREATE INDEX idx_actor ON has_character(actor_name, document_id);
+CREATE INDEX idx_has_genre_genre ON has_genre(genre, document_id);
 CREATE INDEX idx_has_character_document_id ON has_character(document_id);
 CREATE INDEX idx_has_location_document_id ON has_location(document_id);
 CREATE INDEX idx_search_history_user_time ON search_history(user_name, "time" DESC);
 CREATE INDEX idx_view_history_user_time ON view_history(user_name, viewed_at DESC);
 CREATE INDEX idx_view_history_search_id ON view_history(search_id);
 
--- macro for complete transcript text
-CREATE VIEW text_content_view AS (
-    SELECT document_id, STRING_AGG(content, ' ') AS content
-    FROM transcripts
-    GROUP BY document_id
-);
-
--- index for text searching
-CREATE MATERIALIZED VIEW text_search_view AS (
-    SELECT
-        documents.id AS document_id,
-        setweight(to_tsvector(coalesce(title,'')), 'A') ||
-        setweight(to_tsvector(coalesce(text_content_view.content,'')), 'B') AS text_vector
-    FROM documents, text_content_view
-    WHERE documents.id = text_content_view.document_id
-    GROUP BY id, text_content_view.content
-) WITH NO DATA;
+-- trigram indexes for fuzzy autocomplete suggestions
+CREATE INDEX idx_actors_name_trgm ON actors USING GIN (name gin_trgm_ops);
+CREATE INDEX idx_genres_genre_trgm ON genres USING GIN (genre gin_trgm_ops);
+CREATE INDEX idx_studio_trgm ON documents USING GIN (studio gin_trgm_ops);
+CREATE INDEX idx_title_trgm ON documents USING GIN (title gin_trgm_ops);
+
+-- incremented by every ingestion so the app can invalidate cached results
+CREATE SEQUENCE data_generation;
+
+-- index for text searching, kept in sync by `reindex_documents`
+CREATE TABLE text_search_index (
+    document_id varchar(15) PRIMARY KEY,
+    text_vector tsvector,
+    vector_length integer, -- the number of lexeme occurrences in `text_vector`
+    document_year integer,
+    CONSTRAINT fk_document_id FOREIGN KEY (document_id) REFERENCES documents(id),
+    CONSTRAINT fk_document_year FOREIGN KEY (document_id, document_year)
+        REFERENCES documents(id, copyright_year) ON UPDATE CASCADE
+);
+
+CREATE INDEX idx_text_search_index_text_vector ON text_search_index USING GIN (text_vector);
+
+-- the number of indexed documents containing each lexeme, for BM25 ranking
+CREATE TABLE lexeme_stats (
+    lexeme text PRIMARY KEY,
+    document_count integer NOT NULL
+);
+
+-- totals over every indexed document, for BM25 ranking (always a single row)
+CREATE TABLE corpus_stats (
+    id boolean PRIMARY KEY DEFAULT TRUE CHECK (id),
+    document_count bigint NOT NULL DEFAULT 0,
+    total_length bigint NOT NULL DEFAULT 0
+);
+
+INSERT INTO corpus_stats DEFAULT VALUES;
+
+-- every word of the indexed text (unstemmed) and the number of documents containing it,
+-- for spelling suggestions; refreshed by `refresh_term_dictionary` after ingestion
+CREATE TABLE term_dictionary (
+    word text PRIMARY KEY,
+    document_count integer NOT NULL
+);
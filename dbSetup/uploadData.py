@@ -69,6 +69,20 @@ parser.add_argument(
     type=int,
 )
 parser.add_argument("--wipe", required=False, action="store_true")
+parser.add_argument(
+    "--migrate",
+    required=False,
+    action="store_true",
+    help="update a database created by an older tableDefinitions.sql, then reindex it",
+)
+parser.add_argument(
+    "--partition-years",
+    required=False,
+    nargs="+",
+    type=int,
+    help="partition the document tables by copyright year at these boundaries, \
+e.g. 1912 1916 1920 1924 1929",
+)
 
 progress_sem: Semaphore = Semaphore()
 
@@ -98,6 +112,91 @@ def create_tables(cursor: psycopg2.extensions.cursor):
     with open("dbSetup/tableDefinitions.sql", "r") as f:
         cursor.execute(f.read())
 
+    with open("dbSetup/functionDefinitions.sql", "r") as f:
+        cursor.execute(f.read())
+
+
+def migrate(cursor: psycopg2.extensions.cursor):
+    """Given a ``psycopg2`` cursor, update relations created by an older schema.
+
+    Parameters
+    ----------
+    cursor : psycopg2.extensions.cursor
+        The ``psycopg2`` ``cursor`` object with which the query is performed
+    """
+    print("Migrating relations in database")
+    # in the order the schema changed; each script expects the ones before it
+    with open("dbSetup/addSearchTables.sql", "r") as f:
+        cursor.execute(f.read())
+
+    with open("dbSetup/addDocumentYear.sql", "r") as f:
+        cursor.execute(f.read())
+
+    with open("dbSetup/addPageSearchIndex.sql", "r") as f:
+        cursor.execute(f.read())
+
+    with open("dbSetup/addTermDictionary.sql", "r") as f:
+        cursor.execute(f.read())
+
+    with open("dbSetup/addFlagTime.sql", "r") as f:
+        cursor.execute(f.read())
+
+    with open("dbSetup/addDocumentIds.sql", "r") as f:
+        cursor.execute(f.read())
+
+    # the functions read the year columns, so they can only be loaded after them
+    with open("dbSetup/functionDefinitions.sql", "r") as f:
+        cursor.execute(f.read())
+
+    # fill the search tables, which the original schema did not have, for every document
+    print("Reindexing documents")
+    cursor.execute("SELECT reindex_documents(ARRAY(SELECT id FROM documents));")
+    refresh_term_dictionary(cursor)
+
+
+def partition_tables(cursor: psycopg2.extensions.cursor, boundaries: list[int]):
+    """Given a ``psycopg2`` cursor, partition the document tables by copyright year.
+
+    Existing data is kept, and nothing happens if the tables are already partitioned.
+
+    Parameters
+    ----------
+    cursor : psycopg2.extensions.cursor
+        The ``psycopg2`` ``cursor`` object with which the query is performed
+
+    boundaries : list[int]
+        The first year of each partition, followed by the year after the last partition;
+        other years share a default partition
+    """
+    print("Partitioning relations by copyright year")
+    cursor.execute("SELECT partition_by_copyright_year(%s);", [sorted(boundaries)])
+
+
+def refresh_term_dictionary(cursor: psycopg2.extensions.cursor):
+    """Given a ``psycopg2`` cursor, rebuild the spelling dictionary from every document.
+
+    Parameters
+    ----------
+    cursor : psycopg2.extensions.cursor
+        The ``psycopg2`` ``cursor`` object with which the query is performed
+    """
+    print("Refreshing term dictionary")
+    cursor.execute("SELECT refresh_term_dictionary();")
+
+
+def advance_data_generation(cursor: psycopg2.extensions.cursor):
+    """Given a ``psycopg2`` cursor, invalidate everything the app has cached.
+
+    Sequences are not transactional, so this must only run once the changes are committed;
+    otherwise the app could cache the old data under the new generation and keep it.
+
+    Parameters
+    ----------
+    cursor : psycopg2.extensions.cursor
+        The ``psycopg2`` ``cursor`` object with which the query is performed
+    """
+    cursor.execute("SELECT nextval('data_generation');")
+
 
 def string_is_none(s: str | None) -> bool:
     # if s is not a string (i.e. dict, list, None) count it as None
@@ -250,6 +349,7 @@ def _process_ids(
     ids: list[AnyStr],
     transcripts: list[AnyStr],
     progress: tqdm,
+    uploaded_ids: list[str],
 ):
     for document_path in ids:
         document_id: str = Path(document_path).name
@@ -283,7 +383,9 @@ def _process_ids(
             page: int = int(fname[:-4].split("_p")[-1])
 
             with open(fname, "r") as transcript_file:
-                transcript_data.append((document_id, page, transcript_file.read()))
+                transcript_data.append(
+                    (document_id, page, transcript_file.read(), document_id)
+                )
 
         analysis: dict = None
         if analysis_file.exists():
@@ -296,9 +398,15 @@ def _process_ids(
             with open(args.outdir / "failed.txt", "a") as f:
                 f.write(document_id + "\n")
 
-        # insert document data
+        # insert document data, unless its id was already uploaded; `document_ids` is unique
+        # on id alone even once `documents` is partitioned by year
         cursor.execute(
-            "INSERT INTO documents ( \
+            "WITH claimed AS ( \
+                INSERT INTO document_ids (id) VALUES (%s) \
+                ON CONFLICT (id) DO NOTHING \
+                RETURNING id \
+            ) \
+            INSERT INTO documents ( \
                 id, \
                 copyright_year, \
                 studio, \
@@ -309,8 +417,8 @@ def _process_ids(
                 series, \
                 uploaded_by, \
                 uploaded_time \
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s) \
-            ON CONFLICT DO NOTHING;",
+            ) SELECT id, %s, %s, %s, %s, %s, %s, %s, %s, %s \
+            FROM claimed;",
             (
                 document_id,
                 metadata["date"],
@@ -407,19 +515,24 @@ def _process_ids(
                 ],
             )
 
-        # insert transcripts, if any are present
+        # insert transcripts, if any are present, under the year the document was first
+        # uploaded with
         if transcript_data:
             psycopg2.extras.execute_batch(
                 cursor,
                 "INSERT INTO transcripts ( \
                     document_id, \
                     page_number, \
-                    content \
-                ) VALUES (%s, %s, %s) \
+                    content, \
+                    document_year \
+                ) SELECT %s, %s, %s, copyright_year \
+                FROM documents WHERE id = %s \
                 ON CONFLICT DO NOTHING;",
                 transcript_data,
             )
 
+        uploaded_ids.append(document_id)
+
         with progress_sem:
             progress.update()
             progress.display()
@@ -458,6 +571,7 @@ def loadData(args: argparse.Namespace, cursor: psycopg2.extensions.cursor):
     threads: list[Thread] = []
     # iterate through every document id that contains metadata
 
+    uploaded_ids: list[str] = []
     progress_bar: tqdm = tqdm()
     progress_bar.total = len(ids)
     progress_bar.smoothing = 0
@@ -465,7 +579,7 @@ def loadData(args: argparse.Namespace, cursor: psycopg2.extensions.cursor):
     for i in range(args.thread_count):
         thread: Thread = Thread(
             target=_process_ids,
-            args=[args, cursor, id_pools[i], transcripts, progress_bar],
+            args=[args, cursor, id_pools[i], transcripts, progress_bar, uploaded_ids],
         )
         thread.start()
         threads.append(thread)
@@ -473,7 +587,9 @@ def loadData(args: argparse.Namespace, cursor: psycopg2.extensions.cursor):
     for thread in threads:
         thread.join()
 
-    cursor.execute("REFRESH MATERIALIZED VIEW text_search_view;")
+    # index only the uploaded documents rather than rebuilding the whole search index
+    print("Reindexing documents")
+    cursor.execute("SELECT reindex_documents(%s);", [uploaded_ids])
 
 
 def main(argv=None):
@@ -511,15 +627,39 @@ def main(argv=None):
             wipe(cursor)
             db_connection.commit()
 
-        try:
-            create_tables(cursor)
+        if args.migrate:
+            migrate(cursor)
+            db_connection.commit()
+            advance_data_generation(cursor)
+            db_connection.commit()
+        else:
+            try:
+                create_tables(cursor)
+                db_connection.commit()
+            except psycopg2.errors.DuplicateTable as e:
+                print(e)
+                print(
+                    "The tables already exist; if they were created by an older version, "
+                    "run again with --migrate to update them"
+                )
+                db_connection.rollback()
+
+        if args.partition_years:
+            partition_tables(cursor, args.partition_years)
+            db_connection.commit()
+            advance_data_generation(cursor)
             db_connection.commit()
-        except Exception as e:
-            print(e)
-            db_connection.rollback()
 
         loadData(args, cursor)
         db_connection.commit()
+        advance_data_generation(cursor)
+        db_connection.commit()
+
+        # once for the whole upload, like `reindex_documents`
+        refresh_term_dictionary(cursor)
+        db_connection.commit()
+        advance_data_generation(cursor)
+        db_connection.commit()
 
         if args.classifications_csv.exists():
             with open(args.classifications_csv, "r") as csv:
@@ -536,7 +676,10 @@ def main(argv=None):
                 WHERE id = %s;",
                 [(row[1], row[0]) for row in data],
             )
+            db_connection.commit()
 
+            # document types are shown on cached pages, which must be invalidated
+            advance_data_generation(cursor)
             db_connection.commit()
 
     db_connection.close()
@@ -63,6 +63,21 @@ def env_vars():
     )
 
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    from backend import db_utils
+
+    # caches are module-level, so entries would otherwise leak between tests
+    db_utils.headline_cache.clear()
+    db_utils.fragment_cache.clear()
+    db_utils.configure_result_cache()
+    db_utils._autocomplete_indexes = {}
+    db_utils._search_index = None
+    db_utils._spelling_index = None
+    db_utils._tsquery_cache.clear()
+    db_utils.configure_slow_query_log()
+
+
 @pytest.fixture
 def app():
     from backend.app import create_app
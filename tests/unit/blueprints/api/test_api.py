@@ -0,0 +1,94 @@
+import json
+
+from flask import testing
+
+from pytest_mock import MockerFixture, MockType
+
+from backend.datatypes import Document
+
+
+class TestAutocomplete:
+    def test_known_field_returns_suggestions(
+        self, mocker: MockerFixture, client: testing.FlaskClient, mock_psycopg2
+    ):
+        # Arrange
+        mock_autocomplete: MockType = mocker.patch("backend.db_utils.autocomplete")
+        mock_autocomplete.return_value = ["Charlie Chaplin"]
+
+        # Act
+        with client:
+            response: testing.TestResponse = client.get(
+                "/api/autocomplete?field=actor&q=chap&limit=500"
+            )
+
+        # Assert
+        assert response.status_code == 200
+        assert response.get_json() == {
+            "field": "actor",
+            "q": "chap",
+            "suggestions": ["Charlie Chaplin"],
+        }
+        assert mock_autocomplete.call_args.args[1:] == ("actor", "chap", 50)
+
+    def test_unknown_field_is_rejected(
+        self, mocker: MockerFixture, client: testing.FlaskClient, mock_psycopg2
+    ):
+        # Arrange
+        mock_autocomplete: MockType = mocker.patch("backend.db_utils.autocomplete")
+
+        # Act
+        with client:
+            response: testing.TestResponse = client.get(
+                "/api/autocomplete?field=has_character&q=a"
+            )
+
+        # Assert
+        assert response.status_code == 400
+        mock_autocomplete.assert_not_called()
+
+
+class TestSearch:
+    def test_results_streamed_as_ndjson(
+        self, mocker: MockerFixture, client: testing.FlaskClient, mock_psycopg2
+    ):
+        # Arrange
+        document: Document = Document(id="s1111m11111", title="Document 1")
+        document.actors = ["Charlie Chaplin"]
+        document.transcripts = [(1, "a comedy")]
+        mock_stream: MockType = mocker.patch(
+            "backend.db_utils.stream_search",
+            return_value=iter(
+                [
+                    ("count", 1),
+                    ("documents", [document]),
+                    ("headlines", {"s1111m11111": "a <b>comedy</b>"}),
+                ]
+            ),
+        )
+
+        # Act
+        with client:
+            response: testing.TestResponse = client.get(
+                "/api/search?search=comedy&year_min=1920&limit=5"
+            )
+            lines: list[dict] = [
+                json.loads(line)
+                for line in response.get_data(as_text=True).splitlines()
+            ]
+
+        # Assert
+        assert response.mimetype == "application/x-ndjson"
+        assert [line["type"] for line in lines] == ["count", "document", "headline"]
+        assert lines[0]["count"] == 1
+        assert lines[1]["document"]["transcripts"] == [
+            {"page": 1, "content": "a comedy"}
+        ]
+        assert lines[2] == {
+            "type": "headline",
+            "id": "s1111m11111",
+            "headline": "a <b>comedy</b>",
+        }
+        query = mock_stream.call_args.args[1]
+        assert query.keywords == ["comedy"]
+        assert query.copyright_year_range == (1920, 1928)
+        assert mock_stream.call_args.kwargs["limit"] == 5
@@ -88,6 +88,18 @@ class TestBoolString:
         assert result == expected_output
 
 
+@pytest.fixture
+def example_version(mocker: MockerFixture, example_document: Document) -> dict:
+    version: dict = {
+        "id": example_document.id,
+        "title": example_document.title,
+        "last_modified": datetime(2024, 1, 1),
+        "etag": "0123456789abcdef",
+    }
+    mocker.patch("backend.db_utils.get_document_version", return_value=version)
+    return version
+
+
 class TestDocumentDetail:
     def test_invalid_id_returns_to_index(
         self, client: testing.FlaskClient, mock_psycopg2
@@ -128,6 +140,7 @@ class TestDocumentDetail:
         client: testing.FlaskClient,
         mock_psycopg2: dict,
         example_document: Document,
+        example_version: dict,
     ):
         # Arrange
         doc_id: str = example_document.id
@@ -149,12 +162,40 @@ class TestDocumentDetail:
         for url in page_urls:
             assert url in response.text
 
+    def test_search_links_matching_pages(
+        self,
+        mocker: MockerFixture,
+        client: testing.FlaskClient,
+        mock_psycopg2: dict,
+        example_document: Document,
+        example_version: dict,
+    ):
+        # Arrange
+        doc_id: str = example_document.id
+
+        mocker.patch("backend.db_utils.get_document", return_value=example_document)
+        mock_hits: MockType = mocker.patch(
+            "backend.db_utils.search_page_hits", return_value=[(doc_id, 2, 0.5)]
+        )
+
+        # Act
+        with client:
+            response: testing.TestResponse = client.get(
+                f"/document/{doc_id}?search=body"
+            )
+
+        # Assert
+        assert mock_hits.call_args.kwargs["doc_ids"] == [doc_id]
+        assert 'href="#page-2"' in response.text
+        assert 'id="page-3"' in response.text
+
     def test_valid_id_displays_metadata(
         self,
         mocker: MockerFixture,
         client: testing.FlaskClient,
         mock_psycopg2: dict,
         example_document: Document,
+        example_version: dict,
     ):
         # Arrange
         doc_id: str = example_document.id
@@ -193,6 +234,7 @@ class TestDocumentDetail:
         client: testing.FlaskClient,
         mock_psycopg2: dict,
         example_document: Document,
+        example_version: dict,
     ):
         # Arrange
         doc_id: str = example_document.id
@@ -219,6 +261,7 @@ class TestDocumentDetail:
         client: testing.FlaskClient,
         mock_psycopg2: dict,
         example_document: Document,
+        example_version: dict,
     ):
         # Arrange
         doc_id: str = example_document.id
@@ -245,6 +288,7 @@ class TestDocumentDetail:
         client: testing.FlaskClient,
         mock_psycopg2: dict,
         example_document: Document,
+        example_version: dict,
     ):
         # Arrange
         doc_id: str = example_document.id
@@ -277,6 +321,7 @@ class TestDocumentDetail:
         client: testing.FlaskClient,
         mock_psycopg2: dict,
         example_document: Document,
+        example_version: dict,
     ):
         # Arrange
         doc_id: str = example_document.id
@@ -298,6 +343,127 @@ class TestDocumentDetail:
         assert mock_log_view.call_args.kwargs["document_id"] == doc_id
         assert mock_log_view.call_args.kwargs["search_id"] is None
 
+    def test_unchanged_document_not_modified(
+        self,
+        mocker: MockerFixture,
+        client: testing.FlaskClient,
+        mock_psycopg2: dict,
+        example_document: Document,
+        example_version: dict,
+    ):
+        # Arrange
+        doc_id: str = example_document.id
+        mock_get_document: MockType = mocker.patch(
+            "backend.db_utils.get_document", return_value=example_document
+        )
+
+        # Act
+        first: testing.TestResponse = client.get(f"/document/{doc_id}")
+        second: testing.TestResponse = client.get(
+            f"/document/{doc_id}", headers={"If-None-Match": first.headers["ETag"]}
+        )
+
+        # Assert
+        assert first.status_code == 200
+        assert "no-cache" in first.headers["Cache-Control"]
+        assert first.headers["Last-Modified"] == "Mon, 01 Jan 2024 00:00:00 GMT"
+        assert second.status_code == 304
+        assert second.data == b""
+        assert mock_get_document.call_count == 1
+
+    def test_changed_document_modified(
+        self,
+        mocker: MockerFixture,
+        client: testing.FlaskClient,
+        mock_psycopg2: dict,
+        example_document: Document,
+        example_version: dict,
+    ):
+        # Arrange
+        doc_id: str = example_document.id
+        mocker.patch("backend.db_utils.get_document", return_value=example_document)
+        first: testing.TestResponse = client.get(f"/document/{doc_id}")
+        example_version["etag"] = "fedcba9876543210"
+
+        # Act
+        second: testing.TestResponse = client.get(
+            f"/document/{doc_id}", headers={"If-None-Match": first.headers["ETag"]}
+        )
+
+        # Assert
+        assert second.status_code == 200
+        assert second.headers["ETag"] != first.headers["ETag"]
+
+    def test_if_modified_since_alone_not_trusted(
+        self,
+        mocker: MockerFixture,
+        client: testing.FlaskClient,
+        mock_psycopg2: dict,
+        example_document: Document,
+        example_version: dict,
+    ):
+        # Arrange
+        doc_id: str = example_document.id
+        mocker.patch("backend.db_utils.get_document", return_value=example_document)
+
+        # Act
+        response: testing.TestResponse = client.get(
+            f"/document/{doc_id}",
+            headers={"If-Modified-Since": "Tue, 02 Jan 2024 00:00:00 GMT"},
+        )
+
+        # Assert
+        assert response.status_code == 200
+
+    def test_logged_in_user_gets_own_etag(
+        self,
+        mocker: MockerFixture,
+        client: testing.FlaskClient,
+        mock_psycopg2: dict,
+        example_document: Document,
+        example_version: dict,
+    ):
+        # Arrange
+        doc_id: str = example_document.id
+        mocker.patch("backend.db_utils.get_document", return_value=example_document)
+        mocker.patch("backend.db_utils.log_view")
+        anonymous: testing.TestResponse = client.get(f"/document/{doc_id}")
+
+        # Act
+        with client.session_transaction() as session:
+            session["user"] = "example_user"
+        response: testing.TestResponse = client.get(
+            f"/document/{doc_id}",
+            headers={"If-None-Match": anonymous.headers["ETag"]},
+        )
+
+        # Assert
+        assert response.status_code == 200
+        assert "Your report will be saved under your account." in response.text
+
+    def test_fragment_rendered_once_per_version(
+        self,
+        mocker: MockerFixture,
+        client: testing.FlaskClient,
+        mock_psycopg2: dict,
+        example_document: Document,
+        example_version: dict,
+    ):
+        # Arrange
+        doc_id: str = example_document.id
+        mock_get_document: MockType = mocker.patch(
+            "backend.db_utils.get_document", return_value=example_document
+        )
+
+        # Act
+        first: testing.TestResponse = client.get(f"/document/{doc_id}")
+        second: testing.TestResponse = client.get(f"/document/{doc_id}?return_to=/")
+
+        # Assert
+        assert mock_get_document.call_count == 1
+        assert "document body" in first.text and "document body" in second.text
+        assert second.status_code == 200
+
 
 class TestDownloadPDF:
     def test_invalid_id_gives_404(self, client: testing.FlaskClient):
@@ -1,6 +1,7 @@
 from flask import testing
 
-from backend.datatypes import Document, Query
+from backend.datatypes import Document, Query, SearchPage
+from backend.db_utils import encode_search_cursor
 
 from pytest_mock import MockerFixture, MockType
 
@@ -12,11 +13,6 @@ class TestIndex:
         # Arrange
 
         # return 2 documents
-        mock_get_num_results: MockType = mocker.patch(
-            "backend.db_utils.get_num_results"
-        )
-        mock_get_num_results.return_value = 2
-
         mock_results: list[Document] = [
             Document(
                 id="s1111m11111",
@@ -32,10 +28,12 @@ class TestIndex:
             ),
         ]
 
-        mock_search_results: MockType = mocker.patch("backend.db_utils.search_results")
-        mock_search_results.return_value = mock_results
-
-        mocker.patch("backend.db_utils.get_headlines")
+        mock_search_results: MockType = mocker.patch("backend.db_utils.search_page")
+        mock_search_results.return_value = SearchPage(
+            num_results=2,
+            documents=mock_results,
+            headlines={doc.id: "" for doc in mock_results},
+        )
 
         # Act
         with client:
@@ -55,11 +53,11 @@ class TestIndex:
         # query assertions
         assert (
             mock_psycopg2["connection"] in search_args
-        ), "db_utils.search_results shall be called with the global connection object"
+        ), "db_utils.search_page shall be called with the global connection object"
 
         assert any(
             type(arg) is Query for arg in search_args
-        ), "db_utils.search_results shall be called with a `Query` object"
+        ), "db_utils.search_page shall be called with a `Query` object"
 
         # content assertions
         assert (
@@ -77,3 +75,162 @@ class TestIndex:
         assert (
             "s1111m11111.jpg" in text_data and "s2222m22222.jpg" in text_data
         ), "The website shall display the document thumbnails"
+
+    def test_capped_count_rendered_as_lower_bound(
+        self, mocker: MockerFixture, client: testing.FlaskClient, mock_psycopg2
+    ):
+        # Arrange
+        mock_search_page: MockType = mocker.patch("backend.db_utils.search_page")
+        mock_search_page.return_value = SearchPage(
+            num_results=10000, count_precision="capped"
+        )
+
+        # Act
+        with client:
+            text_data: str = client.get("/").get_data(as_text=True)
+
+        # Assert
+        assert "10,000+ documents found" in text_data
+        assert "Page 1 of" not in text_data
+
+    def test_facets_rendered_as_refinements(
+        self, mocker: MockerFixture, client: testing.FlaskClient, mock_psycopg2
+    ):
+        # Arrange
+        mocker.patch("backend.db_utils.search_page", return_value=SearchPage())
+        mocker.patch(
+            "backend.db_utils.get_facets",
+            return_value={
+                "genre": {"comedy": 2},
+                "studio": {"MGM": 3},
+                "copyright_year": {1920: 3},
+                "reel_count": {},
+            },
+        )
+
+        # Act
+        with client:
+            text_data: str = client.get("/?page=3").get_data(as_text=True)
+
+        # Assert
+        assert 'id="search-facets"' in text_data
+        assert "year_min=1920" in text_data and "year_max=1920" in text_data
+        assert "comedy" in text_data and "MGM" in text_data
+
+    def test_cursor_passed_to_search(
+        self, mocker: MockerFixture, client: testing.FlaskClient, mock_psycopg2
+    ):
+        # Arrange
+        mock_search_page: MockType = mocker.patch("backend.db_utils.search_page")
+        mock_search_page.return_value = SearchPage()
+        token: str = encode_search_cursor(0.5, "s1111m11111")
+
+        # Act
+        with client:
+            client.get(f"/?page=2&after={token}")
+
+        # Assert
+        assert mock_search_page.call_args.kwargs["after"] == (0.5, "s1111m11111")
+
+    def test_malformed_cursor_falls_back_to_page(
+        self, mocker: MockerFixture, client: testing.FlaskClient, mock_psycopg2
+    ):
+        # Arrange
+        mock_search_page: MockType = mocker.patch("backend.db_utils.search_page")
+        mock_search_page.return_value = SearchPage()
+
+        # Act
+        with client:
+            client.get("/?page=2&after=garbage")
+
+        # Assert
+        assert mock_search_page.call_args.kwargs["after"] is None
+        assert 2 in mock_search_page.call_args.args
+
+    def test_matching_pages_linked_from_results(
+        self, mocker: MockerFixture, client: testing.FlaskClient, mock_psycopg2
+    ):
+        # Arrange
+        document: Document = Document(id="s1111m11111", title="Document 1")
+        mocker.patch(
+            "backend.db_utils.search_page",
+            return_value=SearchPage(num_results=1, documents=[document]),
+        )
+        mock_hits: MockType = mocker.patch(
+            "backend.db_utils.search_page_hits",
+            return_value=[("s1111m11111", 4, 0.5), ("s1111m11111", 2, 0.1)],
+        )
+
+        # Act
+        with client:
+            text_data: str = client.get("/?search=comedy").get_data(as_text=True)
+
+        # Assert
+        assert mock_hits.call_args.kwargs["doc_ids"] == ["s1111m11111"]
+        assert "Matches on pages 4, 2" in text_data
+        assert "search=comedy#page-4" in text_data
+
+    def test_no_results_suggests_respelling(
+        self, mocker: MockerFixture, client: testing.FlaskClient, mock_psycopg2
+    ):
+        # Arrange
+        mocker.patch("backend.db_utils.search_page", return_value=SearchPage())
+        mock_suggest: MockType = mocker.patch(
+            "backend.db_utils.suggest_keywords", return_value=["comedy"]
+        )
+
+        # Act
+        with client:
+            text_data: str = client.get("/?search=comdy&page=2").get_data(as_text=True)
+
+        # Assert
+        assert mock_suggest.call_args.args[1].keywords == ["comdy"]
+        assert 'id="search-suggestion"' in text_data
+        assert "search=comedy" in text_data and "page=1" in text_data
+
+
+class TestDownloadQuery:
+    def test_csv_streamed_without_text(
+        self, mocker: MockerFixture, client: testing.FlaskClient, mock_psycopg2
+    ):
+        # Arrange
+        client.application.config["MAX_CSV_ROWS"] = 500
+        mocker.patch(
+            "backend.db_utils.get_search_result_ids", return_value=["s1111m11111"]
+        )
+        mock_iter_csv: MockType = mocker.patch(
+            "backend.db_utils.iter_documents_as_csv",
+            return_value=iter(["id\n", '"s1111m11111"\n']),
+        )
+
+        # Act
+        with client:
+            response = client.get("/download_query?search=comedy&text=false")
+
+        # Assert
+        assert response.is_streamed
+        assert response.mimetype == "text/csv"
+        assert "filename=query.csv" in response.headers["Content-Disposition"]
+        assert response.get_data(as_text=True) == 'id\n"s1111m11111"\n'
+        assert mock_iter_csv.call_args.args[1] == ["s1111m11111"]
+        assert mock_iter_csv.call_args.kwargs["include_text"] is False
+
+
+class TestPoolExhausted:
+    def test_exhausted_returns503(self, app, mock_psycopg2):
+        # Arrange
+        from backend import db_utils
+
+        app.config["DB_POOL_MAX"] = 1
+        app.config["DB_POOL_TIMEOUT"] = 0.05
+
+        # hold the only connection, as a concurrent request would
+        with app.app_context():
+            db_utils._get_db_pool().getconn()
+
+        # Act
+        response: testing.TestResponse = app.test_client().get("/")
+
+        # Assert
+        assert response.status_code == 503
+        assert "Retry-After" in response.headers
@@ -0,0 +1,176 @@
+from backend.cache import LRUCache, HeadlineCache, PrefixIndex, SQLiteCache
+from pytest_mock import MockerFixture
+
+
+class TestLRUCache:
+    def test_get_countsHitsAndMisses(self):
+        # Arrange
+        cache = LRUCache(maxsize=2)
+        cache.put("a", 1)
+
+        # Act
+        hit = cache.get("a")
+        miss = cache.get("b")
+
+        # Assert
+        assert hit == 1
+        assert miss is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_put_evictsLeastRecentlyUsed(self):
+        # Arrange
+        cache = LRUCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+
+        # Act
+        cache.put("c", 3)
+
+        # Assert
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+        assert cache.stats()["evictions"] == 1
+
+    def test_get_expiredEntry_returnsDefault(self, mocker: MockerFixture):
+        # Arrange
+        mock_monotonic = mocker.patch("backend.cache.time.monotonic")
+        mock_monotonic.return_value = 100
+        cache = LRUCache(ttl=10)
+        cache.put("a", 1)
+
+        # Act
+        mock_monotonic.return_value = 111
+        result = cache.get("a", "default")
+
+        # Assert
+        assert result == "default"
+        assert len(cache) == 0
+
+    def test_set_generation_clearsOnChange(self):
+        # Arrange
+        cache = LRUCache()
+        cache.set_generation(1)
+        cache.put("a", 1)
+
+        # Act
+        cache.set_generation(1)
+        unchanged = cache.get("a")
+        cache.set_generation(2)
+        changed = cache.get("a")
+
+        # Assert
+        assert unchanged == 1
+        assert changed is None
+
+
+class TestHeadlineCache:
+    def test_cached_ids_tracksQuery(self):
+        # Arrange
+        cache = HeadlineCache(maxsize=2)
+        cache.put(("s1111m11111", "comedy", 400), "one")
+        cache.put(("s2222m22222", "comedy", 400), "two")
+        cache.put(("s3333m33333", "drama", 400), "three")
+
+        # Act
+        comedy_ids = cache.cached_ids("comedy", 400)
+        drama_ids = cache.cached_ids("drama", 400)
+
+        # Assert
+        assert comedy_ids == {"s2222m22222"}
+        assert drama_ids == {"s3333m33333"}
+        assert cache.stats()["hits"] == 0
+
+
+class TestSQLiteCache:
+    def test_put_sharedBetweenInstances(self, tmp_path):
+        # Arrange
+        path = str(tmp_path / "cache.sqlite")
+        writer = SQLiteCache(path)
+        reader = SQLiteCache(path)
+
+        # Act
+        writer.put(("query", 1), {"ids": ["s1111m11111"]})
+
+        # Assert
+        assert reader.get(("query", 1)) == {"ids": ["s1111m11111"]}
+        assert reader.get(("query", 2)) is None
+
+    def test_put_evictsLeastRecentlyUsed(self, tmp_path, mocker: MockerFixture):
+        # Arrange
+        mocker.patch("backend.cache.time.time", side_effect=range(100, 200))
+        cache = SQLiteCache(str(tmp_path / "cache.sqlite"), maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+
+        # Act
+        cache.put("c", 3)
+
+        # Assert
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+        assert cache.stats()["evictions"] == 1
+
+    def test_set_generation_sharedBetweenInstances(self, tmp_path):
+        # Arrange
+        path = str(tmp_path / "cache.sqlite")
+        writer = SQLiteCache(path)
+        reader = SQLiteCache(path)
+        writer.set_generation(1)
+        writer.put("a", 1)
+
+        # Act
+        reader.set_generation(2)
+
+        # Assert
+        assert writer.generation == 2
+        assert writer.get("a") is None
+
+
+class TestPrefixIndex:
+    def test_search_matchesAnyWordIgnoringCase(self):
+        # Arrange
+        index = PrefixIndex(
+            ["Charlie Chaplin", "Chester Conklin", "Mabel Normand", None]
+        )
+
+        # Act
+        result = index.search("CH")
+
+        # Assert
+        assert result == ["Charlie Chaplin", "Chester Conklin"]
+        assert index.search("chap") == ["Charlie Chaplin"]
+        assert index.search("charlie  chap") == ["Charlie Chaplin"]
+        assert len(index) == 3
+
+    def test_search_prefersFirstWordMatches(self):
+        # Arrange
+        index = PrefixIndex(["Buster Keaton", "Keystone", "Roscoe Arbuckle"])
+
+        # Act
+        result = index.search("k", limit=2)
+
+        # Assert
+        assert result == ["Keystone", "Buster Keaton"]
+        assert index.search("") == []
+
+    def test_search_shortPrefix_matchesFullWalk(self):
+        # Arrange
+        values = [f"{first} {second}" for first in "abc" for second in "abcdefgh"]
+        index = PrefixIndex(values)
+        index.SHORT_PREFIX_RESULTS = 5
+
+        # Act
+        precomputed = [index.search(prefix, limit=5) for prefix in ["b", "b ", "b c"]]
+        walked = index.search("b", limit=6)
+
+        # Assert
+        assert precomputed[0] == ["b a", "b b", "b c", "b d", "b e"]
+        assert precomputed[1] == precomputed[0]
+        assert precomputed[2] == ["b c"]
+        assert walked == precomputed[0] + ["b f"]
+        assert index.search("zz") == []
@@ -1,4 +1,5 @@
 import datetime
+import pytest
 from backend.datatypes import Document, Flag, Query
 
 
@@ -123,6 +124,32 @@ class TestQuery:
         # Assert
         assert resultQuery.keywords == expectedQuery.keywords
 
+    def test_cache_key_ignoresOrderAndSpacing(self):
+        # Arrange
+        query = Query(actors=["B", "A"], keywords=["silent ", " film"])
+        equivalentQuery = Query(actors=["A", "B"], keywords=["silent", "film"])
+
+        # Act
+        key = query.cache_key()
+
+        # Assert
+        assert key == equivalentQuery.cache_key()
+        assert key != Query(actors=["A"], keywords=["silent", "film"]).cache_key()
+        assert hash(key) == hash(equivalentQuery.cache_key())
+
+    def test_cache_key_ignoresQueryTime(self):
+        # Arrange
+        query = Query(keywords=["silent", "film"])
+        laterQuery = Query(keywords=["silent", "film"])
+        query.query_time = datetime.datetime(2024, 1, 1)
+        laterQuery.query_time = datetime.datetime(2024, 1, 2)
+
+        # Act
+        key = query.cache_key()
+
+        # Assert
+        assert key == laterQuery.cache_key()
+
 
 class TestDocument:
 
@@ -321,6 +348,51 @@ class TestDocument:
         # Assert
         assert doc.content == expectedContent
 
+    def test_slotted(self):
+        # Act
+        doc = Document(id="s0000l11111")
+
+        # Assert
+        assert not hasattr(doc, "__dict__")
+        assert doc.metadata is doc
+        with pytest.raises(AttributeError):
+            doc.director = "D. W. Griffith"
+
+    def test_default_lists_not_shared(self):
+        # Arrange
+        first = Document()
+        second = Document()
+
+        # Act
+        first.actors.append("Charlie Chaplin")
+        first.transcripts.append((1, "page 1"))
+
+        # Assert
+        assert second.actors == []
+        assert second.transcripts == []
+
+    def test_transcript_loader(self):
+        # Arrange
+        calls = []
+
+        def loader(document):
+            calls.append(document.id)
+            document.transcripts = [(1, "page 1")]
+
+        doc = Document(id="s1111m11111", transcript_loader=loader)
+
+        # Act
+        loadedBefore = doc.transcripts_loaded
+        content = doc.content
+        transcripts = doc.transcripts
+
+        # Assert
+        assert not loadedBefore
+        assert doc.transcripts_loaded
+        assert content == "page 1"
+        assert transcripts == [(1, "page 1")]
+        assert calls == ["s1111m11111"]
+
 
 class TestFlag:
     def test_flag_creation(self):
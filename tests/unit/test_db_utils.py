@@ -1,9 +1,47 @@
 # relation_from_id_to_all_values SQL generation
 
+import datetime
+import pickle
+import threading
+import psycopg2.pool
 import psycopg2.sql as sql
+import pytest
 
-from backend.db_utils import relation_from_id_to_all_values, execute_document_query
-from backend.datatypes import Query
+from backend.db_utils import (
+    relation_from_id_to_all_values,
+    document_query_params,
+    compose_document_query,
+    execute_document_query,
+    search_page,
+    search_results,
+    encode_search_cursor,
+    decode_search_cursor,
+    get_headlines,
+    headline_cache,
+    configure_result_cache,
+    reindex_documents,
+    get_facets,
+    autocomplete,
+    memory_search_page,
+    search_page_hits,
+    stream_search,
+    suggest_keywords,
+    get_documents,
+    load_transcripts,
+    get_document_version,
+    iter_documents,
+    iter_documents_as_csv,
+    execute_prepared,
+    statement_stats,
+    query_shape,
+    PreparingConnection,
+    BlockingConnectionPool,
+    configure_slow_query_log,
+    slow_queries,
+)
+from backend import db_utils
+from backend.search_index import InvertedIndex
+from backend.datatypes import Document, Query, SearchPage
 from unittest.mock import MagicMock
 
 
@@ -13,47 +51,221 @@ class TestRelationFromIdToAllValues:
         inputIdColumn = "document_id"
         inputValueColumn = "genre"
         inputRelation = "has_genre"
-        inputValues = ["comedy", "drama"]
+        inputPlaceholder = "genres"
 
         # Act
         result = relation_from_id_to_all_values(
-            inputIdColumn, inputValueColumn, inputRelation, inputValues
+            inputIdColumn, inputValueColumn, inputRelation, inputPlaceholder
         )
 
         # Assert
         assert result is not None
         assert isinstance(result, sql.Composed)
 
-    def test_handles_single_value(self):
+    def test_binds_values_as_array(self):
         # Arrange
         inputIdColumn = "document_id"
         inputValueColumn = "actor_name"
-        inputRelation = "has_actor"
-        inputValues = ["Charlie Chaplin"]
+        inputRelation = "has_character"
+        inputPlaceholder = "actors"
 
         # Act
         result = relation_from_id_to_all_values(
-            inputIdColumn, inputValueColumn, inputRelation, inputValues
+            inputIdColumn, inputValueColumn, inputRelation, inputPlaceholder
         )
 
         # Assert
-        assert result is not None
-        assert isinstance(result, sql.Composed)
+        assert "= ANY(" in str(result)
+        assert "cardinality(" in str(result)
+        assert "Placeholder('actors')" in str(result)
+        assert " OR " not in str(result)
 
+
+class TestDocumentQueryParams:
     def test_deduplicates_values(self):
         # Arrange
-        inputIdColumn = "document_id"
-        inputValueColumn = "genre"
-        inputRelation = "has_genre"
-        inputValues = ["comedy", "comedy", "drama"]
+        inputQuery = Query(
+            actors=["Charlie Chaplin", "Charlie Chaplin"],
+            genres=["drama", "comedy", "comedy"],
+        )
 
         # Act
-        result = relation_from_id_to_all_values(
-            inputIdColumn, inputValueColumn, inputRelation, inputValues
+        result = document_query_params(inputQuery)
+
+        # Assert
+        assert result["actors"] == ["Charlie Chaplin"]
+        assert result["genres"] == ["comedy", "drama"]
+
+    def test_sameShape_composesSameSQL(self):
+        # Arrange
+        firstQuery = Query(actors=["Walter Goggins"], keywords=["comedy"])
+        secondQuery = Query(actors=["Ella Purnell", "A"], keywords=["100%"])
+
+        # Act
+        firstSQL = compose_document_query(firstQuery)
+        secondSQL = compose_document_query(secondQuery)
+
+        # Assert
+        assert str(firstSQL) == str(secondSQL)
+        assert "100%" not in str(secondSQL)
+
+
+class TestBlockingConnectionPool:
+    def test_exhausted_raisesAfterTimeout(self, mock_psycopg2):
+        # Arrange
+        pool = BlockingConnectionPool(0, 1, timeout=0.05)
+        pool.getconn()
+
+        # Act / Assert
+        with pytest.raises(psycopg2.pool.PoolError):
+            pool.getconn()
+
+    def test_exhausted_waitsForReturnedConnection(self, mock_psycopg2):
+        # Arrange
+        pool = BlockingConnectionPool(0, 1, timeout=5)
+        held = pool.getconn()
+        returner = threading.Timer(0.05, pool.putconn, [held])
+
+        # Act
+        returner.start()
+        result = pool.getconn()
+        returner.join()
+
+        # Assert
+        assert result is mock_psycopg2["connection"]
+
+    def test_repeatedOrUnknownPut_freesNoSlot(self, mock_psycopg2):
+        # Arrange
+        pool = BlockingConnectionPool(0, 1, timeout=0.05)
+        held = pool.getconn()
+        pool.putconn(held)
+
+        # Act
+        with pytest.raises(psycopg2.pool.PoolError):
+            pool.putconn(held)
+        with pytest.raises(psycopg2.pool.PoolError):
+            pool.putconn(MagicMock())
+        pool.getconn()
+
+        # Assert
+        with pytest.raises(psycopg2.pool.PoolError):
+            pool.getconn()
+
+    def test_failedConnect_freesSlot(self, mock_psycopg2):
+        # Arrange
+        pool = BlockingConnectionPool(0, 1, timeout=0.05)
+        mock_psycopg2["connect"].side_effect = [psycopg2.OperationalError, None]
+
+        # Act
+        with pytest.raises(psycopg2.OperationalError):
+            pool.getconn()
+        mock_psycopg2["connect"].side_effect = None
+        result = pool.getconn()
+
+        # Assert
+        assert result is mock_psycopg2["connection"]
+
+
+class TestQueryShape:
+    def test_presentFilters_named(self):
+        # Arrange
+        query = Query(keywords=["comedy"], actors=["Charlie Chaplin"])
+        untimedQuery = Query(keywords=["comedy"], actors=["Charlie Chaplin"])
+        untimedQuery.query_time = None
+
+        # Act
+        result = query_shape(query)
+
+        # Assert
+        assert result == "keywords+query_time+actors"
+        assert query_shape(untimedQuery) == "keywords+actors"
+
+    def test_noFilters_all(self):
+        # Arrange
+        query = Query()
+        query.query_time = None
+
+        # Act / Assert
+        assert query_shape(query) == "all"
+
+
+class TestExecutePrepared:
+    def test_plainConnection_executesDirectly(self):
+        # Arrange
+        mockCursor = MagicMock()
+        inputSQL = sql.SQL("SELECT {}").format(sql.Placeholder("x"))
+
+        # Act
+        execute_prepared(mockCursor, inputSQL, {"x": 1}, "test_plain")
+
+        # Assert
+        mockCursor.execute.assert_called_once_with(inputSQL, {"x": 1})
+        assert statement_stats()["test_plain"]["prepared"] is False
+
+    def test_preparingConnection_preparesOncePerShape(self):
+        # Arrange
+        mockCursor = MagicMock()
+        mockCursor.connection = MagicMock(spec=PreparingConnection)
+        mockCursor.connection.prepared_statements = {}
+        inputSQL = sql.SQL(
+            "SELECT {x} WHERE a = {y} OR b = {x} AND c LIKE '%%'"
+        ).format(x=sql.Placeholder("x"), y=sql.Placeholder("y"))
+
+        # Act
+        execute_prepared(mockCursor, inputSQL, {"x": 1, "y": 2}, "test_prepared")
+        execute_prepared(mockCursor, inputSQL, {"x": 3, "y": 4}, "test_prepared")
+        executed = [call[0] for call in mockCursor.execute.call_args_list]
+
+        # Assert
+        assert len(executed) == 3
+        assert executed[0][0].startswith("PREPARE stmt_")
+        assert executed[0][0].endswith(
+            "SELECT $1 WHERE a = $2 OR b = $1 AND c LIKE '%'"
         )
+        assert executed[2][0].startswith("EXECUTE stmt_")
+        assert executed[2][0].endswith(" (%(x)s, %(y)s);")
+        assert executed[2][1] == {"x": 3, "y": 4}
+        assert statement_stats()["test_prepared"]["prepares"] == 1
+        assert statement_stats()["test_prepared"]["executions"] == 2
+
+    def test_slowQuery_loggedWithPlan(self, tmp_path):
+        # Arrange
+        mockCursor = MagicMock()
+        explainCursor = mockCursor.connection.cursor.return_value.__enter__.return_value
+        explainCursor.fetchall.return_value = [
+            ("Seq Scan on documents",),
+            ("  Buffers",),
+        ]
+        inputSQL = sql.SQL("SELECT {}").format(sql.Placeholder("x"))
+        configure_slow_query_log(threshold_ms=0, path=str(tmp_path / "slow.log"))
+
+        # Act
+        execute_prepared(
+            mockCursor, inputSQL, {"x": datetime.date(1920, 1, 1)}, "test_slow"
+        )
+        entries = slow_queries()
 
         # Assert
-        assert result is not None
+        explainedSQL, explainedParams = explainCursor.execute.call_args[0]
+        assert "EXPLAIN (ANALYZE, BUFFERS)" in str(explainedSQL)
+        assert explainedParams == {"x": datetime.date(1920, 1, 1)}
+        assert len(entries) == 1
+        assert entries[0]["label"] == "test_slow"
+        assert entries[0]["sql"] == "SELECT %(x)s"
+        assert entries[0]["params"] == {"x": "1920-01-01"}
+        assert entries[0]["plan"] == "Seq Scan on documents\n  Buffers"
+
+    def test_fastQuery_notLogged(self, tmp_path):
+        # Arrange
+        mockCursor = MagicMock()
+        configure_slow_query_log(threshold_ms=60_000, path=str(tmp_path / "slow.log"))
+
+        # Act
+        execute_prepared(mockCursor, sql.SQL("SELECT 1"), {}, "test_fast")
+
+        # Assert
+        mockCursor.connection.cursor.assert_not_called()
+        assert slow_queries() == []
 
 
 class TestExecuteDocumentQuery:
@@ -76,20 +288,24 @@ class TestExecuteDocumentQuery:
 
         # Act
         execute_document_query(mockCursor, query=inputQuery)
-        executedQuery: sql.SQL = mockCursor.execute.call_args[0][0]
+        executedQuery, params = mockCursor.execute.call_args[0]
 
         # Assert
         expectedSegments = [
             "SELECT id, copyright_year, studio, title",
             "AND copyright_year >=",
-            "2024",
             "AND copyright_year <=",
-            "2026",
+            # repeated on the search index, so both can skip partitions of other years
+            "AND document_year >=",
+            "AND document_year <=",
         ]
 
         for segment in expectedSegments:
             assert segment in str(executedQuery)
 
+        assert params["year_min"] == 2024
+        assert params["year_max"] == 2026
+
     def test_studioInputQuery_executesStudioInputQuery(self):
         # Arrange
         inputQuery = Query(studio="Universal")
@@ -97,18 +313,19 @@ class TestExecuteDocumentQuery:
 
         # Act
         execute_document_query(mockCursor, query=inputQuery)
-        executedQuery: sql.SQL = mockCursor.execute.call_args[0][0]
+        executedQuery, params = mockCursor.execute.call_args[0]
 
         # Assert
         expectedSegments = [
             "SELECT id, copyright_year, studio, title",
             "AND studio =",
-            "Universal",
         ]
 
         for segment in expectedSegments:
             assert segment in str(executedQuery)
 
+        assert params["studio"] == "Universal"
+
     def test_actorsInputQuery_executesActorsInputQuery(self):
         # Arrange
         inputQuery = Query(actors=["Walter Goggins", "Ella Purnell"])
@@ -117,19 +334,20 @@ class TestExecuteDocumentQuery:
 
         # Act
         execute_document_query(mockCursor, query=inputQuery)
-        executedQuery: sql.SQL = mockCursor.execute.call_args[0][0]
+        executedQuery, params = mockCursor.execute.call_args[0]
 
         # Assert
         expectedSegments = [
             "SELECT id, copyright_year, studio, title",
             "actor_name",
-            "Walter Goggins",
-            "Ella Purnell",
+            "has_character",
         ]
 
         for segment in expectedSegments:
             assert segment in str(executedQuery)
 
+        assert params["actors"] == ["Ella Purnell", "Walter Goggins"]
+
     def test_genresInputQuery_executesGenresInputQuery(self):
         # Arrange
         inputQuery = Query(genres=["Horror", "Comedy"])
@@ -138,19 +356,20 @@ class TestExecuteDocumentQuery:
 
         # Act
         execute_document_query(mockCursor, query=inputQuery)
-        executedQuery: sql.SQL = mockCursor.execute.call_args[0][0]
+        executedQuery, params = mockCursor.execute.call_args[0]
 
         # Assert
         expectedSegments = [
             "SELECT id, copyright_year, studio, title",
             "AND id in ",
-            "Horror",
-            "Comedy",
+            "has_genre",
         ]
 
         for segment in expectedSegments:
             assert segment in str(executedQuery)
 
+        assert params["genres"] == ["Comedy", "Horror"]
+
     def test_allInputsQuery_executesAllInputsQuery(self):
         # Arrange
         inputQuery = Query(
@@ -164,23 +383,1096 @@ class TestExecuteDocumentQuery:
 
         # Act
         execute_document_query(mockCursor, query=inputQuery)
-        executedQuery: sql.SQL = mockCursor.execute.call_args[0][0]
+        executedQuery, params = mockCursor.execute.call_args[0]
 
         # Assert
         expectedSegments = [
             "SELECT id, copyright_year, studio, title",
             "AND copyright_year >=",
-            "2024",
             "AND copyright_year <=",
-            "2026",
             "AND studio =",
-            "Universal",
             "AND id in ",
-            "Walter Goggins",
-            "Ella Purnell",
-            "Horror",
-            "Comedy",
+            "has_character",
+            "has_genre",
         ]
 
         for segment in expectedSegments:
             assert segment in str(executedQuery)
+
+        assert params["year_min"] == 2024
+        assert params["year_max"] == 2026
+        assert params["studio"] == "Universal"
+        assert params["actors"] == ["Ella Purnell", "Walter Goggins"]
+        assert params["genres"] == ["Comedy", "Horror"]
+
+
+class TestSearchPage:
+    def test_keywordQuery_executesSingleStatement(self, mock_psycopg2):
+        # Arrange
+        inputQuery = Query(keywords=["comedy"])
+
+        # Act
+        search_page(mock_psycopg2["connection"], inputQuery)
+        executedQuery, params = mock_psycopg2["cursor"].execute.call_args[0]
+
+        # Assert
+        assert mock_psycopg2["cursor"].execute.call_count == 1
+        expectedSegments = [
+            "COUNT(*)",
+            "ts_rank_cd",
+            "ts_headline",
+            "document_text",
+            "has_character",
+        ]
+
+        for segment in expectedSegments:
+            assert segment in str(executedQuery)
+
+        assert params["title"] == "comedy"
+
+    def test_rows_returnsCountDocumentsAndHeadlines(self, mock_psycopg2):
+        # Arrange
+        inputQuery = Query(keywords=["comedy"])
+        mock_psycopg2["cursor"].fetchall.return_value = [
+            (
+                42,
+                "s1111m11111",
+                1920,
+                "MGM",
+                "Document 1",
+                "synopsis",
+                ["A"],
+                "one",
+                0.5,
+                1,
+            ),
+            (42, "s2222m22222", 1921, "Fox", "Document 2", None, [], None, 0.25, 1),
+        ]
+
+        # Act
+        result: SearchPage = search_page(mock_psycopg2["connection"], inputQuery)
+
+        # Assert
+        assert result.num_results == 42
+        assert [doc.id for doc in result.documents] == ["s1111m11111", "s2222m22222"]
+        assert result.documents[0].actors == ["A"]
+        assert result.headlines == {"s1111m11111": "one", "s2222m22222": ""}
+
+    def test_pastLastPage_returnsCountWithoutDocuments(self, mock_psycopg2):
+        # Arrange
+        inputQuery = Query()
+        mock_psycopg2["cursor"].fetchall.return_value = [
+            (3, None, None, None, None, None, None, None, None, 1)
+        ]
+
+        # Act
+        result: SearchPage = search_page(
+            mock_psycopg2["connection"], inputQuery, page=10
+        )
+
+        # Assert
+        assert result.num_results == 3
+        assert result.documents == []
+        assert result.headlines == {}
+        assert result.next_cursor is None
+
+    def test_extraRow_returnsCursorForLastResultOnPage(self, mock_psycopg2):
+        # Arrange
+        mock_psycopg2["cursor"].fetchall.return_value = [
+            (9, "s1111m11111", 1920, "MGM", "Document 1", None, [], "", 0.5, 1),
+            (9, "s2222m22222", 1921, "Fox", "Document 2", None, [], "", 0.25, 1),
+            (9, "s3333m33333", 1922, "Fox", "Document 3", None, [], "", 0.125, 1),
+        ]
+
+        # Act
+        result: SearchPage = search_page(
+            mock_psycopg2["connection"], Query(), resultsPerPage=2
+        )
+
+        # Assert
+        assert [doc.id for doc in result.documents] == ["s1111m11111", "s2222m22222"]
+        assert decode_search_cursor(result.next_cursor) == (0.25, "s2222m22222")
+
+    def test_fullLastPage_returnsNoCursor(self, mock_psycopg2):
+        # Arrange
+        mock_psycopg2["cursor"].fetchall.return_value = [
+            (2, "s1111m11111", 1920, "MGM", "Document 1", None, [], "", 0.5, 1),
+            (2, "s2222m22222", 1921, "Fox", "Document 2", None, [], "", 0.25, 1),
+        ]
+
+        # Act
+        result: SearchPage = search_page(
+            mock_psycopg2["connection"], Query(), resultsPerPage=2
+        )
+
+        # Assert
+        assert result.next_cursor is None
+
+    def test_cappedCount_stopsAtCap(self, mock_psycopg2):
+        # Arrange
+        mock_psycopg2["cursor"].fetchall.return_value = [
+            (101, "s1111m11111", 1920, "MGM", "Document 1", None, [], "", 0.5, 1),
+        ]
+
+        # Act
+        result: SearchPage = search_page(
+            mock_psycopg2["connection"], Query(), count_mode="capped", count_cap=100
+        )
+        executedQuery, params = mock_psycopg2["cursor"].execute.call_args[0]
+
+        # Assert
+        assert "Placeholder('count_limit')" in str(executedQuery)
+        assert params["count_limit"] == 101
+        assert "FROM matches)" not in str(executedQuery)
+        assert result.num_results == 100
+        assert result.count_precision == "capped"
+
+    def test_cappedCount_belowCapIsExact(self, mock_psycopg2):
+        # Arrange
+        mock_psycopg2["cursor"].fetchall.return_value = [
+            (1, "s1111m11111", 1920, "MGM", "Document 1", None, [], "", 0.5, 1),
+        ]
+
+        # Act
+        result: SearchPage = search_page(
+            mock_psycopg2["connection"], Query(), count_mode="capped", count_cap=100
+        )
+
+        # Assert
+        assert result.num_results == 1
+        assert result.count_precision == "exact"
+
+    def test_estimatedCount_unfilteredQueryUsesPlanner(self, mock_psycopg2):
+        # Arrange
+        mock_psycopg2["cursor"].fetchone.return_value = ([{"Plan": {"Plan Rows": 7}}],)
+        mock_psycopg2["cursor"].fetchall.return_value = [
+            (None, "s1111m11111", 1920, "MGM", "Document 1", None, [], "", 0.5, 1),
+        ]
+
+        # Act
+        result: SearchPage = search_page(
+            mock_psycopg2["connection"],
+            Query(copyright_year_range=(1912, 1928)),
+            count_mode="estimate",
+        )
+        explainQuery: sql.SQL = mock_psycopg2["cursor"].execute.call_args_list[0][0][0]
+
+        # Assert
+        assert "EXPLAIN" in str(explainQuery)
+        assert result.num_results == 7
+        assert result.count_precision == "estimated"
+
+    def test_estimatedCount_keywordQueryIsCapped(self, mock_psycopg2):
+        # Act
+        search_page(
+            mock_psycopg2["connection"],
+            Query(keywords=["comedy"]),
+            count_mode="estimate",
+            count_cap=100,
+        )
+
+        # Assert
+        assert mock_psycopg2["cursor"].execute.call_count == 1
+        assert mock_psycopg2["cursor"].execute.call_args[0][1]["count_limit"] == 101
+
+    def test_bm25_reranksTopCandidates(self, mock_psycopg2):
+        # Act
+        search_page(
+            mock_psycopg2["connection"],
+            Query(keywords=["comedy"]),
+            rank_mode="bm25",
+            bm25_candidates=50,
+        )
+        executedQuery, params = mock_psycopg2["cursor"].execute.call_args[0]
+
+        # Assert
+        assert "bm25_score(" in str(executedQuery)
+        assert "ts_rank(" in str(executedQuery)
+        assert "ts_rank_cd(" not in str(executedQuery)
+        assert params["bm25_candidates"] == 50
+        # the exact count is not limited to the candidates
+        assert "FROM matches)" not in str(executedQuery)
+
+    def test_bm25_scoresNonNegatedQueryLexemes(self, mock_psycopg2):
+        # Act
+        search_page(
+            mock_psycopg2["connection"],
+            Query(keywords=["comedy", "-chase"]),
+            rank_mode="bm25",
+        )
+        executedQuery, params = mock_psycopg2["cursor"].execute.call_args[0]
+
+        # Assert
+        assert "querytree(websearch_to_tsquery(" in str(executedQuery)
+        assert "to_tsvector(" not in str(executedQuery)
+        assert params["title"] == "comedy -chase"
+
+    def test_bm25_noKeywordsIsUnranked(self, mock_psycopg2):
+        # Act
+        search_page(mock_psycopg2["connection"], Query(), rank_mode="bm25")
+        executedQuery, params = mock_psycopg2["cursor"].execute.call_args[0]
+
+        # Assert
+        assert "bm25_score(" not in str(executedQuery)
+
+    def test_unknownRankMode_raises(self, mock_psycopg2):
+        # Act / Assert
+        with pytest.raises(ValueError):
+            search_page(mock_psycopg2["connection"], Query(), rank_mode="tf-idf")
+
+    def test_cursor_seeksInsteadOfOffsetting(self, mock_psycopg2):
+        # Arrange
+        inputQuery = Query(keywords=["comedy"])
+
+        # Act
+        search_page(
+            mock_psycopg2["connection"],
+            inputQuery,
+            page=500,
+            after=(0.125, "s1111m11111"),
+        )
+        executedQuery, params = mock_psycopg2["cursor"].execute.call_args[0]
+
+        # Assert
+        assert "OFFSET" not in str(executedQuery)
+        assert params["after_rank"] == 0.125
+        assert params["after_id"] == "s1111m11111"
+
+    def test_cachedHeadline_skippedByStatementAndServedFromCache(self, mock_psycopg2):
+        # Arrange
+        inputQuery = Query(keywords=["Comedy "])
+        headline_cache.set_generation(1)
+        headline_cache.put(("s1111m11111", "comedy", 400), "cached headline")
+        mock_psycopg2["cursor"].fetchall.return_value = [
+            (1, "s1111m11111", 1920, "MGM", "Document 1", None, [], None, 0.5, 1),
+        ]
+
+        # Act
+        result: SearchPage = search_page(mock_psycopg2["connection"], inputQuery)
+        executedQuery, params = mock_psycopg2["cursor"].execute.call_args[0]
+
+        # Assert
+        assert "<> ALL" in str(executedQuery)
+        assert params["cached_ids"] == ["s1111m11111"]
+        assert result.headlines == {"s1111m11111": "cached headline"}
+        assert mock_psycopg2["cursor"].execute.call_count == 1
+
+    def test_newGeneration_invalidatesCachedHeadlines(self, mock_psycopg2):
+        # Arrange
+        inputQuery = Query(keywords=["comedy"])
+        headline_cache.set_generation(1)
+        headline_cache.put(("s1111m11111", "comedy", 400), "stale headline")
+        mock_psycopg2["cursor"].fetchall.side_effect = [
+            [(1, "s1111m11111", 1920, "MGM", "Document 1", None, [], None, 0.5, 2)],
+            [("s1111m11111", "fresh headline")],
+        ]
+
+        # Act
+        result: SearchPage = search_page(mock_psycopg2["connection"], inputQuery)
+
+        # Assert
+        assert result.headlines == {"s1111m11111": "fresh headline"}
+        assert headline_cache.get(("s1111m11111", "comedy", 400)) == "fresh headline"
+
+    def test_repeatedSearch_servedFromCache(self, mock_psycopg2):
+        # Arrange
+        mock_psycopg2["cursor"].fetchall.return_value = [
+            (1, "s1111m11111", 1920, "MGM", "Document 1", None, [], "", 0.5, 1),
+        ]
+        search_page(mock_psycopg2["connection"], Query(actors=["A", "B"]))
+        db_utils._generation_checked = float("inf")
+
+        # Act
+        result: SearchPage = search_page(
+            mock_psycopg2["connection"], Query(actors=["B", "A"])
+        )
+
+        # Assert
+        assert mock_psycopg2["cursor"].execute.call_count == 1
+        assert [doc.id for doc in result.documents] == ["s1111m11111"]
+
+    def test_newGeneration_invalidatesCachedResults(self, mock_psycopg2):
+        # Arrange
+        mock_psycopg2["cursor"].fetchall.side_effect = [
+            [(1, "s1111m11111", 1920, "MGM", "Document 1", None, [], "", 0.5, 1)],
+            [(1, "s2222m22222", 1921, "Fox", "Document 2", None, [], "", 0.5, 2)],
+        ]
+        mock_psycopg2["cursor"].fetchone.return_value = (2,)
+        search_page(mock_psycopg2["connection"], Query())
+
+        # Act
+        result: SearchPage = search_page(mock_psycopg2["connection"], Query())
+
+        # Assert
+        assert [doc.id for doc in result.documents] == ["s2222m22222"]
+        assert db_utils.result_cache.generation == 2
+
+    def test_sqliteBackend_sharesResults(self, mock_psycopg2, tmp_path):
+        # Arrange
+        configure_result_cache(backend="sqlite", path=str(tmp_path / "cache.sqlite"))
+        mock_psycopg2["cursor"].fetchall.return_value = [
+            (1, "s1111m11111", 1920, "MGM", "Document 1", None, [], "", 0.5, 1),
+        ]
+        search_page(mock_psycopg2["connection"], Query())
+        configure_result_cache(
+            backend="sqlite", path=str(tmp_path / "cache.sqlite"), poll_interval=60
+        )
+        db_utils._generation_checked = float("inf")
+
+        # Act
+        result: SearchPage = search_page(mock_psycopg2["connection"], Query())
+
+        # Assert
+        assert mock_psycopg2["cursor"].execute.call_count == 1
+        assert [doc.id for doc in result.documents] == ["s1111m11111"]
+
+
+class TestGetFacets:
+    def test_rows_returnsHistogramPerFacet(self, mock_psycopg2):
+        # Arrange
+        mock_psycopg2["cursor"].fetchall.return_value = [
+            (7, "comedy", None, None, None, 2),
+            (7, None, None, None, None, 1),
+            (11, None, "MGM", None, None, 3),
+            (13, None, None, 1920, None, 3),
+            (14, None, None, None, 2, 3),
+        ]
+
+        # Act
+        result = get_facets(mock_psycopg2["connection"], Query(keywords=["comedy"]))
+        executedQuery, params = mock_psycopg2["cursor"].execute.call_args[0]
+
+        # Assert
+        assert mock_psycopg2["cursor"].execute.call_count == 1
+        assert "GROUPING SETS" in str(executedQuery)
+        assert params["title"] == "comedy"
+        assert result == {
+            "genre": {"comedy": 2},
+            "studio": {"MGM": 3},
+            "copyright_year": {1920: 3},
+            "reel_count": {2: 3},
+        }
+
+    def test_repeatedQuery_servedFromCache(self, mock_psycopg2):
+        # Arrange
+        get_facets(mock_psycopg2["connection"], Query(actors=["A", "B"]))
+        db_utils._generation_checked = float("inf")
+
+        # Act
+        get_facets(mock_psycopg2["connection"], Query(actors=["B", "A"]))
+
+        # Assert
+        assert mock_psycopg2["cursor"].execute.call_count == 1
+
+
+class TestAutocomplete:
+    def test_prefix_servedFromMemoryAfterFirstBuild(self, mock_psycopg2):
+        # Arrange
+        mock_psycopg2["cursor"].fetchall.side_effect = [
+            [("Charlie Chaplin",), ("Mabel Normand",)],
+            [("comedy",)],
+            [("Keystone",)],
+            [("The Kid",)],
+        ]
+        autocomplete(mock_psycopg2["connection"], "actor", "m")
+        db_utils._generation_checked = float("inf")
+        mock_psycopg2["cursor"].execute.reset_mock()
+
+        # Act
+        result = autocomplete(mock_psycopg2["connection"], "actor", "chap")
+
+        # Assert
+        assert result == ["Charlie Chaplin"]
+        mock_psycopg2["cursor"].execute.assert_not_called()
+
+    def test_noPrefixMatch_fallsBackToTrigrams(self, mock_psycopg2):
+        # Arrange
+        mock_psycopg2["cursor"].fetchall.side_effect = [
+            [("Charlie Chaplin",)],
+            [],
+            [],
+            [],
+            [("Charlie Chaplin",)],
+        ]
+        db_utils._generation_checked = float("inf")
+
+        # Act
+        result = autocomplete(mock_psycopg2["connection"], "actor", "chaplinn")
+        executedQuery, params = mock_psycopg2["cursor"].execute.call_args[0]
+
+        # Assert
+        assert result == ["Charlie Chaplin"]
+        assert "<%%" in str(executedQuery)
+        assert params == {"prefix": "chaplinn", "limit": 10}
+
+    def test_unknownField_raises(self, mock_psycopg2):
+        # Act / Assert
+        with pytest.raises(ValueError):
+            autocomplete(mock_psycopg2["connection"], "has_character", "a")
+
+
+class TestMemorySearchPage:
+    # documents uploaded after a query was made are not matched
+    UPLOADED = datetime.datetime(2024, 1, 1)
+
+    def test_keywords_searchedInMemoryAndPageHydrated(self, mock_psycopg2, mocker):
+        # Arrange
+        mock_psycopg2["cursor"].fetchone.side_effect = [None, None, ("'comedi'",)]
+        mock_psycopg2["cursor"].fetchall.side_effect = [
+            [
+                ("s1111m11111", 1920, 2, "MGM", self.UPLOADED),
+                ("s2222m22222", 1921, 3, "MGM", self.UPLOADED),
+            ],
+            [("comedi", ["s1111m11111", "s2222m22222"], [1, 5])],
+            [],
+            [],
+        ]
+        get_documents = mocker.patch.object(
+            db_utils, "get_documents", return_value=[Document(id="s2222m22222")]
+        )
+        mocker.patch.object(
+            db_utils, "get_headlines", return_value={"s2222m22222": "a"}
+        )
+
+        # Act
+        result: SearchPage = memory_search_page(
+            mock_psycopg2["connection"],
+            Query(keywords=["comedy"]),
+            resultsPerPage=1,
+            rank_mode="bm25",
+        )
+
+        # Assert
+        get_documents.assert_called_once_with(
+            mock_psycopg2["connection"], ["s2222m22222"]
+        )
+        assert [document.id for document in result.documents] == ["s2222m22222"]
+        assert result.num_results == 2
+        assert result.headlines == {"s2222m22222": "a"}
+        assert decode_search_cursor(result.next_cursor)[1] == "s2222m22222"
+
+    def test_cursor_seeksPastPreviousPage(self, mock_psycopg2, mocker):
+        # Arrange
+        db_utils._search_index = InvertedIndex(
+            [
+                ("s1111m11111", 1920, 2, "MGM", self.UPLOADED),
+                ("s2222m22222", 1921, 3, "MGM", self.UPLOADED),
+            ]
+        )
+        db_utils._generation_checked = float("inf")
+        get_documents = mocker.patch.object(db_utils, "get_documents", return_value=[])
+        mocker.patch.object(db_utils, "get_headlines", return_value={})
+
+        # Act
+        result: SearchPage = memory_search_page(
+            mock_psycopg2["connection"], Query(), after=(0.0, "s1111m11111")
+        )
+
+        # Assert
+        get_documents.assert_called_once_with(
+            mock_psycopg2["connection"], ["s2222m22222"]
+        )
+        assert result.next_cursor is None
+        mock_psycopg2["cursor"].execute.assert_not_called()
+
+    def test_phrase_fallsBackToPostgres(self, mock_psycopg2, mocker):
+        # Arrange
+        db_utils._search_index = InvertedIndex()
+        db_utils._generation_checked = float("inf")
+        mock_psycopg2["cursor"].fetchone.return_value = ("'comedi' <-> 'chase'",)
+        fallback = mocker.patch.object(db_utils, "search_page")
+
+        # Act
+        memory_search_page(
+            mock_psycopg2["connection"],
+            Query(keywords=['"comedy chase"']),
+            rank_mode="bm25",
+        )
+
+        # Assert
+        fallback.assert_called_once()
+
+    def test_otherRankMode_keywordsSearchedInPostgres(self, mock_psycopg2, mocker):
+        # Arrange
+        db_utils._search_index = InvertedIndex()
+        db_utils._generation_checked = float("inf")
+        fallback = mocker.patch.object(db_utils, "search_page")
+        query = Query(keywords=["comedy"])
+
+        # Act
+        result = memory_search_page(mock_psycopg2["connection"], query, page=2)
+
+        # Assert
+        fallback.assert_called_once_with(
+            mock_psycopg2["connection"], query, 2, 50, 400, None, rank_mode="ts_rank_cd"
+        )
+        assert result is fallback.return_value
+        mock_psycopg2["cursor"].execute.assert_not_called()
+
+
+class TestGetHeadlines:
+    def test_cachedHeadlines_notRequeried(self, mock_psycopg2):
+        # Arrange
+        inputQuery = Query(keywords=["comedy"])
+        documents = [Document(id="s1111m11111"), Document(id="s2222m22222")]
+        headline_cache.put(("s1111m11111", "comedy", 400), "cached headline")
+        mock_psycopg2["cursor"].fetchall.return_value = [
+            ("s2222m22222", "fresh headline")
+        ]
+
+        # Act
+        result = get_headlines(mock_psycopg2["connection"], documents, inputQuery)
+        queriedIds = mock_psycopg2["cursor"].execute.call_args[0][1][2]
+
+        # Assert
+        assert queriedIds == ("s2222m22222",)
+        assert result == {
+            "s1111m11111": "cached headline",
+            "s2222m22222": "fresh headline",
+        }
+
+    def test_knownYears_restrictHeadlineSource(self, mock_psycopg2):
+        # Arrange
+        inputQuery = Query(keywords=["comedy"])
+        documents = [
+            Document(id="s1111m11111", copyright_year=1920),
+            Document(id="s2222m22222", copyright_year=1925),
+        ]
+
+        # Act
+        get_headlines(mock_psycopg2["connection"], documents, inputQuery)
+        executedQuery, params = mock_psycopg2["cursor"].execute.call_args[0]
+
+        # Assert
+        assert "document_year = ANY" in executedQuery
+        assert params[3] == [1920, 1925]
+
+    def test_unknownYear_readsEveryYear(self, mock_psycopg2):
+        # Arrange
+        inputQuery = Query(keywords=["comedy"])
+        documents = [
+            Document(id="s1111m11111", copyright_year=1920),
+            Document(id="s2222m22222"),
+        ]
+
+        # Act
+        get_headlines(mock_psycopg2["connection"], documents, inputQuery)
+        executedQuery, params = mock_psycopg2["cursor"].execute.call_args[0]
+
+        # Assert
+        assert params[3] is None
+
+
+class TestStreamSearch:
+    def test_batches_fetchedFromNamedCursor(self, mock_psycopg2):
+        # Arrange
+        cursor = mock_psycopg2["cursor"]
+        cursor.fetchone.return_value = (3,)
+        cursor.fetchmany.side_effect = [
+            [("s1111m11111", 1920, "MGM", "Document 1", "script")],
+            [("s2222m22222", 1921, "Fox", "Document 2", "script")],
+            [],
+        ]
+
+        # Act
+        events = list(
+            stream_search(mock_psycopg2["connection"], Query(), limit=2, batch_size=1)
+        )
+
+        # Assert
+        mock_psycopg2["connection"].cursor.assert_any_call(name="stream_search")
+        assert [kind for kind, _ in events] == [
+            "count",
+            "documents",
+            "headlines",
+            "documents",
+            "headlines",
+        ]
+        assert events[0] == ("count", 3)
+        assert [doc.id for doc in events[3][1]] == ["s2222m22222"]
+        assert cursor.itersize == 1
+
+    def test_stoppedEarly_fetchesNoFurther(self, mock_psycopg2):
+        # Arrange
+        cursor = mock_psycopg2["cursor"]
+        cursor.fetchmany.return_value = [
+            ("s1111m11111", 1920, "MGM", "Document 1", "script")
+        ]
+
+        # Act
+        events = stream_search(mock_psycopg2["connection"], Query())
+        next(events)
+        next(events)
+        events.close()
+
+        # Assert
+        assert cursor.fetchmany.call_count == 1
+
+
+class TestSuggestKeywords:
+    def test_misspelledKeywords_respelledFromDictionary(self, mock_psycopg2):
+        # Arrange
+        mock_psycopg2["cursor"].fetchone.return_value = (3,)
+        mock_psycopg2["cursor"].fetchall.return_value = [("comedy", 4), ("chase", 2)]
+
+        # Act
+        result = suggest_keywords(
+            mock_psycopg2["connection"], Query(keywords=["comdy", "chase"])
+        )
+
+        # Assert
+        assert result == ["comedy", "chase"]
+        assert db_utils._spelling_index.generation == 3
+
+    def test_loadedIndex_noRoundTrips(self, mock_psycopg2):
+        # Arrange
+        mock_psycopg2["cursor"].fetchone.return_value = (3,)
+        mock_psycopg2["cursor"].fetchall.return_value = [("comedy", 4)]
+        suggest_keywords(mock_psycopg2["connection"], Query(keywords=["comdy"]))
+        db_utils.result_cache.set_generation(3)
+        mock_psycopg2["cursor"].execute.reset_mock()
+
+        # Act
+        result = suggest_keywords(
+            mock_psycopg2["connection"], Query(keywords=["comedu"])
+        )
+
+        # Assert
+        assert result == ["comedy"]
+        mock_psycopg2["cursor"].execute.assert_not_called()
+
+    def test_build_skipsRareWords(self, mock_psycopg2):
+        # Arrange
+        mock_psycopg2["cursor"].fetchone.return_value = (3,)
+
+        # Act
+        db_utils.build_spelling_index(mock_psycopg2["connection"], min_count=5)
+
+        # Assert
+        statement, params = mock_psycopg2["cursor"].execute.call_args[0]
+        assert "document_count >= %s" in statement
+        assert params == [5]
+
+
+class TestSearchPageHits:
+    def test_keywords_rankPagesOfMatchingDocuments(self, mock_psycopg2):
+        # Arrange
+        mock_psycopg2["cursor"].fetchall.return_value = [
+            ("s1111m11111", 3, 0.5),
+            ("s1111m11111", 1, 0.2),
+        ]
+
+        # Act
+        result = search_page_hits(
+            mock_psycopg2["connection"],
+            Query(keywords=["comedy"], copyright_year_range=(1915, None)),
+            doc_ids=["S1111M11111"],
+            per_document=2,
+        )
+        executedQuery, params = mock_psycopg2["cursor"].execute.call_args[0]
+
+        # Assert
+        assert "text_index_col @@ websearch_to_tsquery('english'" in str(executedQuery)
+        assert "document_year >= " in str(executedQuery)
+        assert "document_year <= " not in str(executedQuery)
+        assert params["title"] == "comedy"
+        assert params["doc_ids"] == ["s1111m11111"]
+        assert params["per_document"] == 2
+        assert "SELECT id" not in str(executedQuery)
+        assert result == [("s1111m11111", 3, 0.5), ("s1111m11111", 1, 0.2)]
+
+    def test_noIds_restrictedToMatchingDocuments(self, mock_psycopg2):
+        # Act
+        search_page_hits(mock_psycopg2["connection"], Query(keywords=["comedy"]))
+        executedQuery, _ = mock_psycopg2["cursor"].execute.call_args[0]
+
+        # Assert
+        assert "document_id IN (" in str(executedQuery)
+        assert "SELECT id" in str(executedQuery)
+
+    def test_repeatedHits_servedFromCache(self, mock_psycopg2):
+        # Arrange
+        mock_psycopg2["cursor"].fetchall.return_value = [("s1111m11111", 3, 0.5)]
+        query = Query(keywords=["comedy"])
+
+        # Act
+        first = search_page_hits(
+            mock_psycopg2["connection"], query, doc_ids=["s1111m11111"], per_document=3
+        )
+        second = search_page_hits(
+            mock_psycopg2["connection"], query, doc_ids=["S1111M11111"], per_document=3
+        )
+
+        # Assert
+        assert mock_psycopg2["cursor"].fetchall.call_count == 1
+        assert first == second == [("s1111m11111", 3, 0.5)]
+
+    def test_noKeywords_returnsNothing(self, mock_psycopg2):
+        # Act
+        result = search_page_hits(mock_psycopg2["connection"], Query())
+
+        # Assert
+        assert result == []
+        mock_psycopg2["cursor"].execute.assert_not_called()
+
+
+class TestReindexDocuments:
+    def test_ids_reindexedInOneStatement(self, mock_psycopg2):
+        # Act
+        reindex_documents(mock_psycopg2["connection"], ["s1111m11111", "s2222m22222"])
+        executedQuery, params = mock_psycopg2["cursor"].execute.call_args_list[0][0]
+
+        # Assert
+        assert "reindex_documents" in executedQuery
+        assert params == [["s1111m11111", "s2222m22222"]]
+
+    def test_generation_advancedAfterCommit(self, mock_psycopg2):
+        # Arrange
+        events: list[str] = []
+        mock_psycopg2["cursor"].execute.side_effect = (
+            lambda statement, *_: events.append(statement)
+        )
+        mock_psycopg2["connection"].commit.side_effect = lambda: events.append("COMMIT")
+
+        # Act
+        reindex_documents(mock_psycopg2["connection"], ["s1111m11111"])
+
+        # Assert
+        assert events == [
+            "SELECT reindex_documents(%s);",
+            "COMMIT",
+            "SELECT nextval('data_generation');",
+            "COMMIT",
+        ]
+
+    def test_noIds_notExecuted(self, mock_psycopg2):
+        # Act
+        reindex_documents(mock_psycopg2["connection"], [])
+
+        # Assert
+        mock_psycopg2["cursor"].execute.assert_not_called()
+
+
+class TestSearchCursor:
+    def test_roundTrip_returnsPosition(self):
+        # Act
+        token: str = encode_search_cursor(0.1, "s1234l56789")
+
+        # Assert
+        assert decode_search_cursor(token) == (0.1, "s1234l56789")
+
+    @pytest.mark.parametrize("token", ["", "not a token", "bnVsbA", "WzFd"])
+    def test_malformedToken_returnsNone(self, token: str):
+        # Act
+        result = decode_search_cursor(token)
+
+        # Assert
+        assert result is None
+
+
+class TestSearchResults:
+    @pytest.mark.parametrize("resultsPerPage", [1, 20, 50])
+    def test_roundTrips_doNotGrowWithPageSize(self, mock_psycopg2, resultsPerPage):
+        # Arrange
+        documentRows = [
+            (f"s{i:04d}m00000", 1920, "MGM", f"Document {i}", "synopsis")
+            for i in range(resultsPerPage)
+        ]
+        mock_psycopg2["cursor"].fetchall.side_effect = [documentRows, [], []]
+
+        # Act
+        documents = search_results(
+            mock_psycopg2["connection"], Query(), resultsPerPage=resultsPerPage
+        )
+
+        # Assert
+        assert len(documents) == resultsPerPage
+        assert mock_psycopg2["cursor"].execute.call_count == 3
+
+    def test_relatedRows_attachedToTheirDocuments(self, mock_psycopg2):
+        # Arrange
+        mock_psycopg2["cursor"].fetchall.side_effect = [
+            [
+                ("s1111m11111", 1920, "MGM", "Document 1", None),
+                ("s2222m22222", 1921, "Fox", "Document 2", None),
+            ],
+            [("s2222m22222", "Tom Scott"), ("s1111m11111", "Grace Mason")],
+            [("s1111m11111", 1, "page one"), ("s1111m11111", 2, "page two")],
+        ]
+
+        # Act
+        documents = search_results(mock_psycopg2["connection"], Query())
+
+        # Assert
+        assert documents[0].actors == ["Grace Mason"]
+        assert documents[1].actors == ["Tom Scott"]
+        assert documents[0].transcripts == [(1, "page one"), (2, "page two")]
+        assert documents[1].transcripts == []
+
+
+class TestGetDocuments:
+    def test_statementHydration_decodesRelationsInOneQuery(self, mock_psycopg2):
+        # Arrange
+        uploaded = datetime.datetime(2024, 1, 1)
+        mock_psycopg2["cursor"].fetchall.return_value = [
+            (
+                "s1111m11111",
+                1920,
+                "MGM",
+                "Document 1",
+                2,
+                "script",
+                "admin",
+                uploaded,
+                [[1, "page one"], [2, "page two"]],
+                [
+                    {
+                        "actor_name": "Charlie Chaplin",
+                        "character_name": "The Tramp",
+                        "character_description": None,
+                    }
+                ],
+                ["comedy"],
+                [{"name": "mansion", "description": None}],
+                [["userX", "title", "the title is incorrect."]],
+            )
+        ]
+
+        # Act
+        result = get_documents(
+            mock_psycopg2["connection"], ["S1111M11111"], preload_transcripts=True
+        )
+        executedQuery, params = mock_psycopg2["cursor"].execute.call_args[0]
+
+        # Assert
+        assert mock_psycopg2["cursor"].execute.call_count == 1
+        assert "json_agg" in executedQuery and "LATERAL" in executedQuery
+        assert params == {"ids": ("s1111m11111",), "transcripts": True}
+        assert len(result) == 1
+        assert result[0].copyright_year == 1920
+        assert result[0].uploaded_time == uploaded
+        assert result[0].transcripts == [(1, "page one"), (2, "page two")]
+        assert result[0].actors[0]["character_name"] == "The Tramp"
+        assert result[0].genres == ["comedy"]
+        assert result[0].locations == [{"name": "mansion", "description": None}]
+        assert result[0].flags[0].errorDescription == "the title is incorrect."
+
+    def test_queriesHydration_queriesEachRelation(self, mock_psycopg2):
+        # Act
+        result = get_documents(
+            mock_psycopg2["connection"], ["s1111m11111"], hydration="queries"
+        )
+
+        # Assert
+        assert mock_psycopg2["cursor"].execute.call_count == 5
+        assert result == []
+
+    def test_queriesHydration_preloadTranscripts_queriesTranscripts(
+        self, mock_psycopg2
+    ):
+        # Act
+        get_documents(
+            mock_psycopg2["connection"],
+            ["s1111m11111"],
+            hydration="queries",
+            preload_transcripts=True,
+        )
+
+        # Assert
+        assert mock_psycopg2["cursor"].execute.call_count == 6
+
+    def test_lazyTranscripts_loadedForEveryDocumentOnFirstAccess(self, mock_psycopg2):
+        # Arrange
+        row = ("s1111m11111", 1920, "MGM", "Document 1", 2, "script", "admin", None)
+        mock_psycopg2["cursor"].fetchall.return_value = [
+            row + ([], [], [], [], []),
+            ("s2222m22222",) + row[1:] + ([], [], [], [], []),
+        ]
+        documents = get_documents(
+            mock_psycopg2["connection"], ["s1111m11111", "s2222m22222"]
+        )
+        _, params = mock_psycopg2["cursor"].execute.call_args[0]
+        mock_psycopg2["cursor"].fetchall.return_value = [
+            ("s1111m11111", 1, "page one"),
+            ("s2222m22222", 1, "other page"),
+        ]
+
+        # Act
+        transcripts = documents[0].transcripts
+        others = documents[1].transcripts
+
+        # Assert
+        assert params["transcripts"] is False
+        assert mock_psycopg2["cursor"].execute.call_count == 2
+        assert transcripts == [(1, "page one")]
+        assert others == [(1, "other page")]
+
+    def test_lazyTranscripts_picklable(self, mock_psycopg2):
+        # Arrange
+        mock_psycopg2["cursor"].fetchall.return_value = [
+            ("s1111m11111", 1920, "MGM", "Document 1", 2, "script", "admin", None)
+            + ([], [], [], [], [])
+        ]
+        documents = get_documents(mock_psycopg2["connection"], ["s1111m11111"])
+
+        # Act
+        restored = pickle.loads(pickle.dumps(documents))
+
+        # Assert
+        assert not restored[0].transcripts_loaded
+        assert restored[0].title == "Document 1"
+
+
+def _hydrated_row(doc_id: str, pages: list) -> tuple:
+    return (doc_id, 1920, "MGM", "Document", 2, "script", "admin", None, pages) + (
+        [],
+        ["comedy"],
+        [],
+        [],
+    )
+
+
+class TestIterDocuments:
+    def test_chunks_fetchedFromNamedCursor(self, mock_psycopg2):
+        # Arrange
+        cursor = mock_psycopg2["cursor"]
+        cursor.fetchmany.side_effect = [
+            [_hydrated_row("s1111m11111", [[1, "page one"]])],
+            [_hydrated_row("s2222m22222", [])],
+            [],
+        ]
+
+        # Act
+        chunks = list(
+            iter_documents(
+                mock_psycopg2["connection"], ["S1111M11111", "s2222m22222"], itersize=1
+            )
+        )
+        executedQuery, params = cursor.execute.call_args[0]
+
+        # Assert
+        mock_psycopg2["connection"].cursor.assert_any_call(name="iter_documents")
+        assert cursor.itersize == 1
+        assert "ORDER BY id" in executedQuery
+        assert params == {"ids": ("s1111m11111", "s2222m22222"), "transcripts": True}
+        assert [[doc.id for doc in chunk] for chunk in chunks] == [
+            ["s1111m11111"],
+            ["s2222m22222"],
+        ]
+        assert chunks[0][0].transcripts == [(1, "page one")]
+        assert chunks[1][0].transcripts_loaded
+
+    def test_noIds_queriesNothing(self, mock_psycopg2):
+        # Act
+        chunks = list(iter_documents(mock_psycopg2["connection"], []))
+
+        # Assert
+        assert chunks == []
+        mock_psycopg2["cursor"].execute.assert_not_called()
+
+    def test_csv_lineForEachDocument(self, mock_psycopg2):
+        # Arrange
+        cursor = mock_psycopg2["cursor"]
+        cursor.fetchmany.side_effect = [
+            [_hydrated_row("s1111m11111", []), _hydrated_row("s2222m22222", [])],
+            [],
+        ]
+
+        # Act
+        lines = list(
+            iter_documents_as_csv(
+                mock_psycopg2["connection"],
+                ["s1111m11111", "s2222m22222"],
+                include_text=False,
+            )
+        )
+        _, params = cursor.execute.call_args[0]
+
+        # Assert
+        assert params["transcripts"] is False
+        assert len(lines) == 3
+        assert lines[0].startswith("id,copyright_year")
+        assert lines[1].startswith('"s1111m11111","1920"')
+        assert all(line.endswith("\n") for line in lines)
+
+
+class TestGetDocumentVersion:
+    def test_missingDocument_returnsNone(self, mock_psycopg2):
+        # Act
+        result = get_document_version(mock_psycopg2["connection"], "S1111M11111")
+        _, params = mock_psycopg2["cursor"].execute.call_args[0]
+
+        # Assert
+        assert result is None
+        assert params == ["s1111m11111"]
+
+    def test_newFlag_changesVersion(self, mock_psycopg2):
+        # Arrange
+        uploaded = datetime.datetime(2024, 1, 1)
+        flagged = datetime.datetime(2024, 2, 1)
+        mock_psycopg2["cursor"].fetchone.side_effect = [
+            ("s1111m11111", "Document 1", uploaded, 0, None, 7),
+            ("s1111m11111", "Document 1", uploaded, 1, flagged, 7),
+        ]
+
+        # Act
+        before = get_document_version(mock_psycopg2["connection"], "s1111m11111")
+        after = get_document_version(mock_psycopg2["connection"], "s1111m11111")
+
+        # Assert
+        assert before["title"] == "Document 1"
+        assert before["last_modified"] == uploaded
+        assert after["last_modified"] == flagged
+        assert before["etag"] != after["etag"]
+
+    def test_reindex_changesVersion(self, mock_psycopg2):
+        # Arrange
+        uploaded = datetime.datetime(2024, 1, 1)
+        mock_psycopg2["cursor"].fetchone.side_effect = [
+            ("s1111m11111", "Document 1", uploaded, 0, None, 7),
+            ("s1111m11111", "Document 1", uploaded, 0, None, 8),
+        ]
+
+        # Act
+        before = get_document_version(mock_psycopg2["connection"], "s1111m11111")
+        reindex_documents(mock_psycopg2["connection"], ["s1111m11111"])
+        after = get_document_version(mock_psycopg2["connection"], "s1111m11111")
+        executedQuery, _ = mock_psycopg2["cursor"].execute.call_args[0]
+
+        # Assert
+        assert "data_generation" in executedQuery
+        assert before["last_modified"] == after["last_modified"]
+        assert before["etag"] != after["etag"]
+
+
+class TestLoadTranscripts:
+    def test_setsTranscriptsOfUnloadedDocuments(self, mock_psycopg2):
+        # Arrange
+        loaded = Document(id="s1111m11111", transcripts=[(1, "kept")])
+        pending = Document(id="s2222m22222", transcript_loader=lambda document: None)
+        empty = Document(id="s3333m33333", transcript_loader=lambda document: None)
+        mock_psycopg2["cursor"].fetchall.return_value = [(pending.id, 1, "page one")]
+
+        # Act
+        load_transcripts(mock_psycopg2["connection"], [loaded, pending, empty])
+        executedQuery, params = mock_psycopg2["cursor"].execute.call_args[0]
+
+        # Assert
+        assert mock_psycopg2["cursor"].execute.call_count == 1
+        assert "ANY" in executedQuery
+        assert params == [["s2222m22222", "s3333m33333"]]
+        assert loaded.transcripts == [(1, "kept")]
+        assert pending.transcripts == [(1, "page one")]
+        assert empty.transcripts == []
+
+    def test_everyDocumentLoaded_noQuery(self, mock_psycopg2):
+        # Act
+        load_transcripts(mock_psycopg2["connection"], [Document(id="s1111m11111")])
+
+        # Assert
+        mock_psycopg2["cursor"].execute.assert_not_called()
+
+    def test_unknownHydration_raises(self, mock_psycopg2):
+        # Act / Assert
+        with pytest.raises(ValueError):
+            get_documents(mock_psycopg2["connection"], ["s1111m11111"], hydration="orm")
@@ -0,0 +1,237 @@
+import datetime
+import math
+import numpy as np
+import pytest
+
+from backend.datatypes import Query
+from backend.search_index import InvertedIndex, UnsupportedQuery, parse_tsquery
+
+
+# the rows `compose_document_query` would filter
+@pytest.fixture()
+def corpus() -> InvertedIndex:
+    return InvertedIndex(
+        documents=[
+            ("s3333l33333", 1925, 5, "Fox", datetime.datetime(2024, 1, 3)),
+            ("s1111l11111", 1915, 2, "MGM", datetime.datetime(2024, 1, 1)),
+            ("s2222l22222", 1920, None, "MGM", datetime.datetime(2024, 1, 2)),
+            ("s4444l44444", None, 1, None, datetime.datetime(2024, 1, 4)),
+        ],
+        postings={
+            "comedi": (["s1111l11111", "s2222l22222", "s3333l33333"], [1, 4, 1]),
+            "chase": (["s2222l22222", "s4444l44444"], [1, 2]),
+            "drama": (["s3333l33333", "s9999l99999"], [3, 1]),
+        },
+        actors={
+            "Charlie Chaplin": ["s1111l11111", "s2222l22222"],
+            "Mabel Normand": ["s2222l22222"],
+        },
+        genres={"comedy": ["s1111l11111", "s2222l22222", "s3333l33333"]},
+        generation=7,
+    )
+
+
+# the lexeme frequencies of each document's `text_search_index.text_vector`
+VECTORS: dict[str, dict[str, int]] = {
+    "s1111l11111": {"comedi": 1, "film": 6, "reel": 3},
+    "s2222l22222": {"comedi": 4, "chase": 1},
+    "s3333l33333": {"comedi": 1, "drama": 3, "film": 1},
+    "s4444l44444": {"chase": 2, "film": 2, "reel": 9},
+    "s5555l55555": {"drama": 1, "comedi": 2, "chase": 2, "film": 1},
+}
+
+
+def postgres_order(lexemes: list[str], matches) -> list[str]:
+    """The ids `search_page` orders by `bm25_score` (see functionDefinitions.sql) over the
+    `lexeme_stats` and `corpus_stats` of `VECTORS`, as `ORDER BY rank DESC, id`"""
+    lengths: dict[str, int] = {
+        doc_id: sum(vector.values()) for doc_id, vector in VECTORS.items()
+    }
+    average: float = max(sum(lengths.values()) / len(VECTORS), 1)
+
+    def bm25_score(doc_id: str) -> np.float32:
+        score: float = 0.0
+        for lexeme, frequency in VECTORS[doc_id].items():
+            if lexeme not in lexemes:
+                continue
+
+            containing: int = sum(lexeme in vector for vector in VECTORS.values())
+            score += (
+                math.log(1 + (len(VECTORS) - containing + 0.5) / (containing + 0.5))
+                * frequency
+                * (1.2 + 1)
+                / (frequency + 1.2 * (1 - 0.75 + 0.75 * lengths[doc_id] / average))
+            )
+
+        # `bm25_score` returns a `real`
+        return np.float32(score)
+
+    return sorted(
+        (doc_id for doc_id, vector in VECTORS.items() if matches(vector)),
+        key=lambda doc_id: (-bm25_score(doc_id), doc_id),
+    )
+
+
+def ids(index: InvertedIndex, numbers) -> list[str]:
+    return [str(doc_id) for doc_id in index.ids[numbers]]
+
+
+class TestParseTsquery:
+    def test_operators_bindLikePostgres(self):
+        # Act
+        result = parse_tsquery("'a' | 'b' & !'c'")
+
+        # Assert
+        assert result == (
+            "or",
+            ("lexeme", "a"),
+            ("and", ("lexeme", "b"), ("not", ("lexeme", "c"))),
+        )
+
+    def test_phraseAndParentheses_parsed(self):
+        # Act
+        result = parse_tsquery("( 'a' | 'b' ) & 'c' <-> 'd''s'")
+
+        # Assert
+        assert result == (
+            "and",
+            ("or", ("lexeme", "a"), ("lexeme", "b")),
+            ("phrase", ("lexeme", "c"), ("lexeme", "d's")),
+        )
+
+    def test_empty_returnsNone(self):
+        # Act / Assert
+        assert parse_tsquery("") is None
+
+
+class TestInvertedIndex:
+    def test_noKeywords_returnsFilteredIdsInIdOrder(self, corpus: InvertedIndex):
+        # Act
+        numbers, scores = corpus.search(Query(copyright_year_range=(1915, 1925)))
+
+        # Assert
+        assert ids(corpus, numbers) == ["s1111l11111", "s2222l22222", "s3333l33333"]
+        assert not scores.any()
+        assert len(corpus) == 4
+        assert corpus.generation == 7
+
+    def test_nullColumns_failFilters(self, corpus: InvertedIndex):
+        # Act
+        numbers, _ = corpus.search(Query(reel_range=(None, 10)))
+
+        # Assert
+        assert ids(corpus, numbers) == ["s1111l11111", "s3333l33333", "s4444l44444"]
+
+    def test_keywords_rankedByBm25(self, corpus: InvertedIndex):
+        # Act
+        numbers, scores = corpus.search(
+            Query(keywords=["comedy"]), parse_tsquery("'comedi'")
+        )
+
+        # Assert
+        assert ids(corpus, numbers) == ["s2222l22222", "s1111l11111", "s3333l33333"]
+        assert scores[0] > scores[1] > 0
+
+    def test_booleanKeywords_matchLikeWebsearch(self, corpus: InvertedIndex):
+        # Act
+        both, _ = corpus.search(
+            Query(keywords=["comedy", "chase"]), parse_tsquery("'comedi' & 'chase'")
+        )
+        either, _ = corpus.search(
+            Query(keywords=["drama", "or", "chase"]), parse_tsquery("'drama' | 'chase'")
+        )
+        without, _ = corpus.search(
+            Query(keywords=["comedy", "-chase"]), parse_tsquery("'comedi' & !'chase'")
+        )
+
+        # Assert
+        assert ids(corpus, both) == ["s2222l22222"]
+        assert sorted(ids(corpus, either)) == [
+            "s2222l22222",
+            "s3333l33333",
+            "s4444l44444",
+        ]
+        assert sorted(ids(corpus, without)) == ["s1111l11111", "s3333l33333"]
+
+    def test_stopWordsOnly_matchesNothing(self, corpus: InvertedIndex):
+        # Act
+        numbers, _ = corpus.search(Query(keywords=["the"]), None)
+
+        # Assert
+        assert len(numbers) == 0
+
+    def test_relationsAndStudio_mustAllMatch(self, corpus: InvertedIndex):
+        # Act
+        numbers, _ = corpus.search(
+            Query(actors=["Charlie Chaplin", "Mabel Normand"], genres=["comedy"])
+        )
+        studio, _ = corpus.search(Query(studio="MGM"))
+        unknown, _ = corpus.search(Query(actors=["Buster Keaton"]))
+
+        # Assert
+        assert ids(corpus, numbers) == ["s2222l22222"]
+        assert ids(corpus, studio) == ["s1111l11111", "s2222l22222"]
+        assert len(unknown) == 0
+
+    def test_queryTime_excludesLaterUploads(self, corpus: InvertedIndex):
+        # Arrange
+        query = Query()
+        query.query_time = datetime.datetime(2024, 1, 2)
+
+        # Act
+        numbers, _ = corpus.search(query)
+
+        # Assert
+        assert ids(corpus, numbers) == ["s1111l11111", "s2222l22222"]
+
+    @pytest.mark.parametrize(
+        "tsquery, lexemes, matches",
+        [
+            ("'comedi'", ["comedi"], lambda vector: "comedi" in vector),
+            (
+                "'comedi' & !'chase'",
+                ["comedi"],
+                lambda vector: "comedi" in vector and "chase" not in vector,
+            ),
+            (
+                "'drama' | 'chase' & 'film'",
+                ["drama", "chase", "film"],
+                lambda vector: "drama" in vector or {"chase", "film"} <= vector.keys(),
+            ),
+        ],
+    )
+    def test_keywords_orderedLikePostgresBm25(self, tsquery: str, lexemes, matches):
+        # Arrange
+        index = InvertedIndex(
+            documents=[
+                (doc_id, 1920, 1, "MGM", datetime.datetime(2024, 1, 1))
+                for doc_id in VECTORS
+            ],
+            postings={
+                lexeme: (
+                    [doc_id for doc_id in VECTORS if lexeme in VECTORS[doc_id]],
+                    [
+                        VECTORS[doc_id][lexeme]
+                        for doc_id in VECTORS
+                        if lexeme in VECTORS[doc_id]
+                    ],
+                )
+                for lexeme in {
+                    lexeme for vector in VECTORS.values() for lexeme in vector
+                }
+            },
+        )
+
+        # Act
+        numbers, _ = index.search(Query(keywords=["keywords"]), parse_tsquery(tsquery))
+
+        # Assert
+        assert ids(index, numbers) == postgres_order(lexemes, matches)
+
+    def test_phrase_raises(self, corpus: InvertedIndex):
+        # Act / Assert
+        with pytest.raises(UnsupportedQuery):
+            corpus.search(
+                Query(keywords=['"comedy', 'chase"']),
+                parse_tsquery("'comedi' <-> 'chase'"),
+            )
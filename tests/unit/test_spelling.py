@@ -0,0 +1,75 @@
+import pytest
+
+from backend.spelling import SpellingIndex, edit_distance
+
+
+@pytest.fixture()
+def dictionary() -> SpellingIndex:
+    return SpellingIndex(
+        [
+            ("comedy", 40),
+            ("comely", 2),
+            ("chaplin", 12),
+            ("western", 9),
+            ("the", 90),
+            ("cat", 3),
+        ],
+        generation=4,
+    )
+
+
+class TestEditDistance:
+    @pytest.mark.parametrize(
+        "a,b,expected",
+        [("comedy", "comedy", 0), ("comdy", "comedy", 1), ("cmoedy", "comedy", 1)],
+    )
+    def test_edits_counted(self, a: str, b: str, expected: int):
+        # Act / Assert
+        assert edit_distance(a, b) == expected
+
+    def test_empty_countsEveryCharacter(self):
+        # Act / Assert
+        assert edit_distance("", "abc") == 3
+
+
+class TestSpellingIndex:
+    def test_knownWord_isItsOwnSpelling(self, dictionary: SpellingIndex):
+        # Act / Assert
+        assert dictionary.correct("Comely") == "comely"
+        assert len(dictionary) == 6
+        assert dictionary.generation == 4
+
+    def test_closestThenMostFrequent_wins(self, dictionary: SpellingIndex):
+        # Act / Assert
+        assert dictionary.correct("comedu") == "comedy"
+        assert dictionary.correct("comey") == "comedy"
+        assert dictionary.correct("chpalin") == "chaplin"
+        assert dictionary.correct("westrn") == "western"
+
+    def test_distantOrShortWords_notCorrected(self, dictionary: SpellingIndex):
+        # Act / Assert
+        assert dictionary.correct("tragedy") is None
+        assert dictionary.correct("ct") is None
+
+    def test_suggest_keepsSearchSyntax(self, dictionary: SpellingIndex):
+        # Act
+        result = dictionary.suggest(['"chaplinn', 'comdy"', "or", "-westrn", "1920"])
+
+        # Assert
+        assert result == ['"chaplin', 'comedy"', "or", "-western", "1920"]
+
+    def test_suggest_knownWords_returnsNone(self, dictionary: SpellingIndex):
+        # Act / Assert
+        assert dictionary.suggest(["the", "Comedy"]) is None
+
+    def test_minCount_dropsRareWords(self):
+        # Arrange
+        words = [("comedy", 40), ("comedt", 1), ("Comedt", 1), ("comedz", 1)]
+
+        # Act
+        result = SpellingIndex(words, min_count=2)
+
+        # Assert
+        assert len(result) == 2
+        assert result.correct("comedz") == "comedy"
+        assert result.correct("comedt") == "comedt"